@@ -3,12 +3,12 @@ Chat AI Logic
 Handles Gemini AI integration for the chatbot
 """
 
-import google.generativeai as genai
-import os
 from datetime import datetime
+from app.llm import llm, CircuitOpenError
 
-# Configure Gemini
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+# Backend and model used by the chatbot
+CHAT_PROVIDER = 'gemini'
+CHAT_MODEL = 'gemini-2.5-flash'
 
 
 def build_system_prompt(user, family_profile, children):
@@ -94,48 +94,46 @@ def generate_chat_response(user, family_profile, children, conversation_history,
         # Build the system prompt with family context
         system_prompt = build_system_prompt(user, family_profile, children)
         
-        # Create the model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
         # Build conversation history for context
         chat_history = []
         
         # Add system prompt as first message
         chat_history.append({
             "role": "user",
-            "parts": [system_prompt]
+            "content": system_prompt
         })
         chat_history.append({
-            "role": "model",
-            "parts": ["I understand. I'm ready to assist this family with personalized health and parenting advice. I'll stay focused on early childhood topics and respect their cultural context."]
+            "role": "assistant",
+            "content": "I understand. I'm ready to assist this family with personalized health and parenting advice. I'll stay focused on early childhood topics and respect their cultural context."
         })
         
         # Add previous conversation messages
         for msg in conversation_history:
-            if msg['role'] == 'user':
-                chat_history.append({
-                    "role": "user",
-                    "parts": [msg['message_text']]
-                })
-            elif msg['role'] == 'assistant':
+            if msg['role'] in ('user', 'assistant'):
                 chat_history.append({
-                    "role": "model",
-                    "parts": [msg['message_text']]
+                    "role": msg['role'],
+                    "content": msg['message_text']
                 })
         
-        # Start chat with history
-        chat = model.start_chat(history=chat_history)
-        
         # Add language instruction if Arabic
         final_message = user_message
         if language == 'ar':
             final_message = f"[Please respond in Arabic] {user_message}"
+        chat_history.append({"role": "user", "content": final_message})
         
         # Generate response
-        response = chat.send_message(final_message)
+        response = llm.complete(messages=chat_history, provider=CHAT_PROVIDER, model=CHAT_MODEL, purpose='chat')
         
         return response.text
         
+    except CircuitOpenError as e:
+        # The AI provider is down: answer at once instead of waiting on it
+        print(f"Chat AI unavailable: {e}")
+        if language == 'ar':
+            return "المساعد مشغول قليلاً الآن. الرجاء المحاولة مرة أخرى بعد دقيقة."
+        else:
+            return "The assistant is taking a short break right now. Please try again in a minute."
+        
     except Exception as e:
         print(f"Error generating chat response: {e}")
         if language == 'ar':
@@ -157,14 +155,12 @@ def generate_conversation_title(first_message, language='en'):
     """
     
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
         if language == 'ar':
             prompt = f"قم بإنشاء عنوان قصير (3-5 كلمات) لمحادثة تبدأ بهذه الرسالة: '{first_message}'. أعط العنوان فقط، بدون علامات تنصيص."
         else:
             prompt = f"Generate a short title (3-5 words) for a conversation starting with this message: '{first_message}'. Give only the title, no quotes."
         
-        response = model.generate_content(prompt)
+        response = llm.complete(prompt=prompt, provider=CHAT_PROVIDER, model=CHAT_MODEL, purpose='title')
         title = response.text.strip().strip('"\'')
         
         # Limit to 50 characters
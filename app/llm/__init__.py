@@ -0,0 +1,10 @@
+"""
+LLM Module
+Shared, pooled LLM backends used by meals, chat and activity generation
+"""
+
+from app.llm.client import llm, LLMClient, LLMError, CircuitOpenError, DeadlineExceeded
+from app.llm.providers import LLMResponse, OpenAICompatibleProvider, GeminiProvider, StubProvider
+from app.llm.latency import LatencyHistogram
+from app.llm.resilience import CircuitBreaker, Deadline
+from app.llm.usage import usage_meter, usage_tags, usage_totals
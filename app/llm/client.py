@@ -0,0 +1,713 @@
+"""
+LLM Client
+The one entry point every LLM caller goes through: picks the backend,
+applies per-call timeouts and deadlines, fails fast while a backend's
+circuit breaker is open, retries transient failures with jittered backoff,
+records per-backend latency, meters tokens per feature and user, and
+optionally hedges slow calls
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+
+from app.llm.latency import LatencyHistogram
+from app.llm.resilience import (
+    DEFAULT_BREAKER_FAILURES,
+    DEFAULT_BREAKER_OPEN_SECONDS,
+    CircuitBreaker,
+    Deadline,
+    parse_deadlines
+)
+from app.llm.providers import (
+    DEFAULT_POOL_CONNECTIONS,
+    LLMResponse,
+    OpenAICompatibleProvider,
+    GeminiProvider,
+    StubProvider
+)
+from app.llm.usage import current_tags, profile_prompt, usage_meter
+
+
+# Call defaults
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_OPENAI_BASE_URL = "https://router.huggingface.co/v1"
+
+# Whole-call budget (all attempts and backoff), overall and per purpose;
+# LLM_DEADLINES overrides the per-purpose ones
+DEFAULT_DEADLINE_SECONDS = 90
+DEFAULT_DEADLINES = {
+    'meal': 60,
+    'regenerate': 45,
+    'chat': 30,
+    'title': 10,
+    'activity-batch': 180,
+}
+
+# Backoff: full jitter over base * 2^attempt, capped
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 20.0
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Hedging: wait this long for the primary until its histogram has enough
+# samples, then wait for its LLM_HEDGE_PERCENTILE latency
+DEFAULT_HEDGE_AFTER_SECONDS = 10.0
+DEFAULT_HEDGE_PERCENTILE = 90
+HEDGE_MIN_SAMPLES = 20
+
+
+class LLMError(Exception):
+    """An LLM call failed (after any retries)"""
+
+    def __init__(self, message, provider=None, status_code=None, retryable=False):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+class CircuitOpenError(LLMError):
+    """A backend's circuit breaker is open: the call was refused without being sent"""
+
+    def __init__(self, provider, retry_after):
+        super().__init__(
+            f"{provider} is unavailable right now (circuit open, retry in {retry_after:.0f}s)",
+            provider=provider,
+            retryable=True
+        )
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(LLMError):
+    """A call ran out of its deadline (across every attempt)"""
+
+    def __init__(self, provider, seconds):
+        super().__init__(f"{provider} call ran past its {seconds:g}s deadline", provider=provider, retryable=True)
+
+
+def error_status(error):
+    """HTTP status of an SDK error, if it carries one"""
+    for attribute in ('status_code', 'code'):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def is_retryable(error):
+    """
+    Check whether an error is transient (timeouts, dropped connections,
+    rate limits, 5xx) rather than a bad request
+
+    Args:
+        error: Exception raised by a backend
+
+    Returns:
+        bool
+    """
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+
+    # SDK exception names are stable across openai / google-genai / httpx
+    name = type(error).__name__
+    return any(word in name for word in ('Timeout', 'Connection', 'Transport', 'RemoteProtocol'))
+
+
+def parse_hedge_targets(spec):
+    """
+    Parse LLM_HEDGE_TO, e.g. "openai=gemini:gemini-2.5-flash,gemini=backup:my-model"
+    (primary backend = secondary backend : model; the model may contain colons)
+
+    Returns:
+        dict: primary backend name -> (secondary backend name, model)
+    """
+    targets = {}
+    for entry in (spec or '').split(','):
+        primary, _, target = entry.partition('=')
+        backend, _, model = target.partition(':')
+        if primary.strip() and backend.strip() and model.strip():
+            targets[primary.strip()] = (backend.strip(), model.strip())
+    return targets
+
+
+def backoff_delay(attempt):
+    """
+    Seconds to wait before retry number `attempt` (0-based), full jitter
+
+    Returns:
+        float
+    """
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * (2 ** attempt)))
+
+
+class LLMClient:
+    """
+    Shared registry of long-lived LLM backends
+
+    Backends are created on first use and kept for the life of the process,
+    so their connection pools (and TLS sessions) are reused by every call.
+    Settings come from the environment, or from the Flask config once
+    init_app runs; scripts can use the module-level `llm` without an app.
+
+    Setting LLM_BACKEND=stub sends every call to the local stub backend.
+
+    Every call to a backend (each retry, each side of a hedge) is metered:
+    tokens, wall time and prompt sections go to `usage_meter`, tagged with
+    the call's purpose and the user (see usage.usage_tags).
+
+    Every call has a deadline covering all of its attempts and backoff
+    (by purpose, see DEFAULT_DEADLINES), and each backend has a circuit
+    breaker: after LLM_BREAKER_FAILURES transient failures in a row calls
+    fail at once with CircuitOpenError for LLM_BREAKER_OPEN_SECONDS.
+
+    Hedging (off unless LLM_HEDGE_TO names a secondary for the primary):
+    complete(hedge=True) sends the prompt to the secondary too if the
+    primary has not answered within its p90 latency, returns the first
+    response that passes `validate`, and cancels the other call.
+    """
+
+    def __init__(self):
+        self.timeout = float(os.getenv('LLM_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS))
+        self.max_retries = int(os.getenv('LLM_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+        self.pool_connections = int(os.getenv('LLM_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS))
+        self.openai_base_url = os.getenv('LLM_OPENAI_BASE_URL', DEFAULT_OPENAI_BASE_URL)
+        self.backend_override = os.getenv('LLM_BACKEND') or None
+        self.backup_base_url = os.getenv('LLM_BACKUP_BASE_URL') or None
+        self.hedge_targets = parse_hedge_targets(os.getenv('LLM_HEDGE_TO'))
+        self.hedge_after = float(os.getenv('LLM_HEDGE_AFTER_SECONDS', DEFAULT_HEDGE_AFTER_SECONDS))
+        self.hedge_percentile = float(os.getenv('LLM_HEDGE_PERCENTILE', DEFAULT_HEDGE_PERCENTILE))
+        self.default_deadline = float(os.getenv('LLM_DEADLINE_SECONDS', DEFAULT_DEADLINE_SECONDS))
+        self.deadlines = {**DEFAULT_DEADLINES, **parse_deadlines(os.getenv('LLM_DEADLINES'))}
+        self.breaker_failures = int(os.getenv('LLM_BREAKER_FAILURES', DEFAULT_BREAKER_FAILURES))
+        self.breaker_open_seconds = float(os.getenv('LLM_BREAKER_OPEN_SECONDS', DEFAULT_BREAKER_OPEN_SECONDS))
+        self._factories = {
+            'openai': self._build_openai,
+            'gemini': self._build_gemini,
+            'backup': self._build_backup,
+            'stub': StubProvider,
+        }
+        self._providers = {}
+        self._latency = {}  # backend name -> LatencyHistogram
+        self._breakers = {}  # backend name -> CircuitBreaker
+        self.hedge_stats = {'hedged_calls': 0, 'hedges_sent': 0, 'secondary_wins': 0}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Read LLM settings from the app config
+
+        Args:
+            app: Flask application instance
+        """
+        self.timeout = app.config.get('LLM_TIMEOUT_SECONDS', self.timeout)
+        self.max_retries = app.config.get('LLM_MAX_RETRIES', self.max_retries)
+        self.pool_connections = app.config.get('LLM_POOL_CONNECTIONS', self.pool_connections)
+        self.openai_base_url = app.config.get('LLM_OPENAI_BASE_URL', self.openai_base_url)
+        self.backend_override = app.config.get('LLM_BACKEND', self.backend_override) or None
+        self.backup_base_url = app.config.get('LLM_BACKUP_BASE_URL', self.backup_base_url) or None
+        if 'LLM_HEDGE_TO' in app.config:
+            self.hedge_targets = parse_hedge_targets(app.config['LLM_HEDGE_TO'])
+        self.hedge_after = app.config.get('LLM_HEDGE_AFTER_SECONDS', self.hedge_after)
+        self.hedge_percentile = app.config.get('LLM_HEDGE_PERCENTILE', self.hedge_percentile)
+        self.default_deadline = app.config.get('LLM_DEADLINE_SECONDS', self.default_deadline)
+        if 'LLM_DEADLINES' in app.config:
+            self.deadlines = {**DEFAULT_DEADLINES, **parse_deadlines(app.config['LLM_DEADLINES'])}
+        self.breaker_failures = app.config.get('LLM_BREAKER_FAILURES', self.breaker_failures)
+        self.breaker_open_seconds = app.config.get('LLM_BREAKER_OPEN_SECONDS', self.breaker_open_seconds)
+        app.extensions['llm'] = self
+
+    # ============================================
+    # BACKENDS
+    # ============================================
+
+    def _build_openai(self):
+        return OpenAICompatibleProvider(
+            base_url=self.openai_base_url,
+            api_key=os.getenv('HF_TOKEN'),
+            timeout=self.timeout,
+            pool_connections=self.pool_connections
+        )
+
+    def _build_gemini(self):
+        return GeminiProvider(
+            api_key=os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY'),
+            timeout=self.timeout,
+            pool_connections=self.pool_connections
+        )
+
+    def _build_backup(self):
+        # Second OpenAI-compatible endpoint, e.g. another router or a local server
+        if not self.backup_base_url:
+            raise LLMError("LLM_BACKUP_BASE_URL is not set", provider='backup')
+        return OpenAICompatibleProvider(
+            base_url=self.backup_base_url,
+            api_key=os.getenv('LLM_BACKUP_API_KEY') or os.getenv('HF_TOKEN') or 'none',
+            timeout=self.timeout,
+            pool_connections=self.pool_connections
+        )
+
+    def register_provider(self, name, provider):
+        """
+        Plug in a backend (an object with complete(), stream(..., usage=dict)
+        and close()), replacing any existing one with that name
+
+        Args:
+            name: Backend name used in complete(provider=...)
+            provider: Backend instance
+        """
+        with self._lock:
+            previous = self._providers.pop(name, None)
+            self._providers[name] = provider
+        if previous is not None and previous is not provider:
+            previous.close()
+
+    def provider(self, name):
+        """
+        Get a backend, creating it on first use
+
+        Args:
+            name: 'openai', 'gemini', 'stub' or a registered name
+
+        Returns:
+            Backend instance
+        """
+        name = self._resolve(name)
+        provider = self._providers.get(name)
+        if provider is not None:
+            return provider
+
+        with self._lock:
+            provider = self._providers.get(name)
+            if provider is None:
+                factory = self._factories.get(name)
+                if factory is None:
+                    raise LLMError(f"Unknown LLM backend: {name}", provider=name)
+                provider = self._providers[name] = factory()
+        return provider
+
+    def _resolve(self, name):
+        return self.backend_override or name
+
+    def close(self):
+        """Close every backend's connection pool"""
+        with self._lock:
+            providers, self._providers = list(self._providers.values()), {}
+        for provider in providers:
+            provider.close()
+
+    # ============================================
+    # CALLS
+    # ============================================
+
+    def complete(self, prompt=None, messages=None, provider='gemini', model=None,
+                 temperature=None, json_mode=False, timeout=None, retries=None,
+                 hedge=False, validate=None, purpose=None, deadline=None):
+        """
+        Run a completion, retrying transient failures (or hedging, see below)
+
+        Args:
+            prompt: Single user message (shortcut for messages)
+            messages: list of {"role": "system" | "user" | "assistant", "content": str}
+            provider: Backend name
+            model: Model name
+            temperature: Sampling temperature (None: provider default)
+            json_mode: Ask for a JSON response
+            timeout: Seconds per attempt (default: LLM_TIMEOUT_SECONDS)
+            retries: Retries after the first attempt (default: LLM_MAX_RETRIES)
+            hedge: Race a secondary backend if the primary is slow (only when
+                   LLM_HEDGE_TO names one for this provider; replaces retries)
+            validate: callable(LLMResponse) that raises if a hedged response
+                      is unusable, so the other backend's answer is taken
+            purpose: What the call is for ('meal', 'chat', ...); picks the
+                     deadline and is the feature its usage is metered under
+            deadline: Seconds for the whole call, retries included
+                      (default: the purpose's, else LLM_DEADLINE_SECONDS)
+
+        Returns:
+            LLMResponse
+
+        Raises:
+            CircuitOpenError: if the backend's circuit is open (nothing was sent)
+            DeadlineExceeded: if the deadline ran out
+            LLMError: if every attempt failed, or the failure was not transient
+        """
+        if messages is None:
+            messages = [{'role': 'user', 'content': prompt}]
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.max_retries if retries is None else retries
+        deadline = Deadline(self.deadline_for(purpose, deadline))
+        metering = (purpose, current_tags(), profile_prompt(messages))
+
+        if hedge and self.can_hedge(provider):
+            return self._complete_hedged(messages, provider, model, temperature, json_mode, timeout,
+                                         validate, deadline, metering)
+
+        name = self._resolve(provider)
+        backend = self.provider(provider)
+        histogram = self.latency(name)
+        attempt = 0
+        while True:
+            self._admit(name)
+            started = time.monotonic()
+            try:
+                response = backend.complete(messages, model, temperature=temperature,
+                                            json_mode=json_mode, timeout=deadline.clamp(timeout))
+                elapsed = time.monotonic() - started
+                histogram.record(elapsed)
+                self._record(name)
+                usage_meter.record(*metering, name, model, response.text, elapsed,
+                                   response.input_tokens, response.output_tokens)
+                return response
+            except Exception as e:
+                histogram.record_failure()
+                self._record(name, e)
+                usage_meter.record(*metering, name, model, '', time.monotonic() - started, error=e)
+                self._before_retry(backend, e, attempt, retries, can_retry=True, deadline=deadline)
+                attempt += 1
+
+    def stream(self, prompt=None, messages=None, provider='gemini', model=None,
+               temperature=None, json_mode=False, timeout=None, retries=None,
+               purpose=None, deadline=None):
+        """
+        Run a completion, yielding text as the model produces it
+
+        Failures before the first chunk are retried like complete(); once
+        text has been yielded a failure is raised straight away, since the
+        caller may already have shown it. The deadline covers the whole
+        stream. Arguments as in complete().
+
+        Yields:
+            str chunks
+
+        Raises:
+            CircuitOpenError: if the backend's circuit is open (nothing was sent)
+            DeadlineExceeded: if the stream ran past its deadline
+            LLMError: if the stream could not be started or broke off
+        """
+        if messages is None:
+            messages = [{'role': 'user', 'content': prompt}]
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.max_retries if retries is None else retries
+        deadline = Deadline(self.deadline_for(purpose, deadline))
+
+        # Tags are taken now: the generator body runs when the caller first reads
+        metering = (purpose, current_tags(), profile_prompt(messages))
+        return self._stream(messages, provider, model, temperature, json_mode, timeout, retries, deadline, metering)
+
+    def _stream(self, messages, provider, model, temperature, json_mode, timeout, retries, deadline, metering):
+        """Generator behind stream()"""
+        name = self._resolve(provider)
+        backend = self.provider(provider)
+        histogram = self.latency(name)
+        attempt = 0
+        while True:
+            self._admit(name)
+            started = False
+            settled = False
+            error = None
+            parts, usage = [], {}
+            began = time.monotonic()
+            chunks = backend.stream(messages, model, temperature=temperature,
+                                    json_mode=json_mode, timeout=deadline.clamp(timeout), usage=usage)
+            try:
+                for chunk in chunks:
+                    if deadline.expired:
+                        raise DeadlineExceeded(name, deadline.seconds)
+                    started = True
+                    parts.append(chunk)
+                    yield chunk
+                histogram.record(time.monotonic() - began)
+                self._record(name)
+                settled = True
+                return
+            except DeadlineExceeded as e:
+                histogram.record_failure()
+                self.breaker(name).record_failure()
+                settled, error = True, e
+                raise
+            except Exception as e:
+                histogram.record_failure()
+                self._record(name, e)
+                settled, error = True, e
+                self._before_retry(backend, e, attempt, retries, can_retry=not started, deadline=deadline)
+                attempt += 1
+            finally:
+                chunks.close()
+                if not settled:
+                    # The caller stopped reading: no verdict on the backend
+                    self.breaker(name).release()
+                usage_meter.record(*metering, name, model, ''.join(parts), time.monotonic() - began,
+                                   usage.get('input_tokens'), usage.get('output_tokens'),
+                                   error=error if settled else 'abandoned')
+
+    # ============================================
+    # HEDGING
+    # ============================================
+
+    def can_hedge(self, provider):
+        """Check whether calls to a backend have a hedge target configured"""
+        return self._resolve(provider) in self.hedge_targets
+
+    def hedge_budget(self, provider):
+        """
+        Seconds to wait for a backend before hedging: its LLM_HEDGE_PERCENTILE
+        latency once HEDGE_MIN_SAMPLES calls are recorded, LLM_HEDGE_AFTER_SECONDS before
+
+        Returns:
+            float
+        """
+        histogram = self.latency(self._resolve(provider))
+        if histogram.count >= HEDGE_MIN_SAMPLES:
+            return histogram.percentile(self.hedge_percentile)
+        return self.hedge_after
+
+    def _complete_hedged(self, messages, provider, model, temperature, json_mode, timeout, validate, deadline, metering):
+        """
+        Race the primary against its hedge target (see complete)
+
+        Both calls stream, so the losing one is cancelled by closing its
+        response at the next chunk. A primary that fails before the budget
+        is hedged straight away; one whose circuit is open is skipped.
+        """
+        primary = self._resolve(provider)
+        secondary, secondary_model = self.hedge_targets[primary]
+        options = {'temperature': temperature, 'json_mode': json_mode, 'timeout': timeout}
+        cancel = threading.Event()
+        results = queue.Queue()
+
+        def start(name, name_model):
+            threading.Thread(
+                target=self._race,
+                args=(name, name_model, messages, dict(options, timeout=deadline.clamp(timeout)),
+                      validate, cancel, results, metering),
+                name=f'llm-hedge-{name}',
+                daemon=True
+            ).start()
+
+        with self._lock:
+            self.hedge_stats['hedged_calls'] += 1
+
+        if self.breaker(primary).allow():
+            start(primary, model)
+            hedged = False
+        elif self.breaker(secondary).allow():
+            print(f"⚡ {primary} circuit open, sending the call straight to {secondary}")
+            start(secondary, secondary_model)
+            hedged = True
+        else:
+            raise CircuitOpenError(primary, self.breaker(primary).retry_after())
+
+        pending, errors = 1, []
+        wait = timeout * 2 if hedged else self.hedge_budget(primary)
+        while True:
+            try:
+                name, response, error = results.get(timeout=deadline.clamp(wait))
+            except queue.Empty:
+                if hedged or deadline.expired:
+                    cancel.set()
+                    raise DeadlineExceeded(primary, deadline.seconds)
+                error, name = None, None
+
+            if name is not None:
+                pending -= 1
+                if error is None:
+                    cancel.set()
+                    if name != primary:
+                        with self._lock:
+                            self.hedge_stats['secondary_wins'] += 1
+                    return response
+                errors.append(f"{name}: {error}")
+
+            if not hedged:
+                hedged, wait = True, timeout * 2
+                if not self.breaker(secondary).allow():
+                    print(f"⚡ Not hedging {primary} call: {secondary} circuit is open")
+                    if pending == 0:
+                        raise LLMError(f"Hedged call failed ({'; '.join(errors)})", provider=primary)
+                    continue
+                # Primary is slow (or failed): send the same prompt to the secondary
+                reason = 'failed' if errors else f'no answer in {self.hedge_budget(primary):.1f}s'
+                print(f"🏁 Hedging {primary} call to {secondary} ({reason})")
+                with self._lock:
+                    self.hedge_stats['hedges_sent'] += 1
+                start(secondary, secondary_model)
+                pending += 1
+            elif pending == 0:
+                raise LLMError(f"Hedged call failed ({'; '.join(errors)})", provider=primary)
+
+    def _race(self, name, model, messages, options, validate, cancel, results, metering):
+        """One side of a hedged call: stream the answer, validate it, report it"""
+        started = time.monotonic()
+        histogram = self.latency(name)
+        parts, usage, outcome = [], {}, None
+        try:
+            chunks = self.provider(name).stream(messages, model, usage=usage, **options)
+            try:
+                for chunk in chunks:
+                    if cancel.is_set():
+                        print(f"✂️ Cancelled losing {name} call after {time.monotonic() - started:.1f}s")
+                        # At least this slow: dropping it would pull the hedge budget down
+                        histogram.record(time.monotonic() - started)
+                        self.breaker(name).release()
+                        outcome = 'cancelled'
+                        return
+                    parts.append(chunk)
+            finally:
+                chunks.close()
+
+            response = LLMResponse(''.join(parts), provider=name, model=model,
+                                   input_tokens=usage.get('input_tokens'), output_tokens=usage.get('output_tokens'))
+            self._record(name)
+            if validate is not None:
+                validate(response)
+            histogram.record(time.monotonic() - started)
+            results.put((name, response, None))
+        except Exception as e:
+            histogram.record_failure()
+            self._record(name, e)
+            outcome = e
+            results.put((name, None, e))
+        finally:
+            usage_meter.record(*metering, name, model, ''.join(parts), time.monotonic() - started,
+                               usage.get('input_tokens'), usage.get('output_tokens'), error=outcome)
+
+    # ============================================
+    # DEADLINES AND CIRCUIT BREAKERS
+    # ============================================
+
+    def deadline_for(self, purpose, deadline=None):
+        """
+        Seconds a call may take in total
+
+        Args:
+            purpose: What the call is for (key of LLM_DEADLINES), or None
+            deadline: Explicit deadline, used as is when given
+
+        Returns:
+            float
+        """
+        if deadline is not None:
+            return deadline
+        return self.deadlines.get(purpose, self.default_deadline)
+
+    def breaker(self, provider):
+        """
+        Circuit breaker of one backend (created on first use)
+
+        Returns:
+            CircuitBreaker
+        """
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    provider, CircuitBreaker(provider, self.breaker_failures, self.breaker_open_seconds)
+                )
+        return breaker
+
+    def is_available(self, provider):
+        """
+        Check whether a call to a backend would be sent now (its circuit,
+        or its hedge target's, lets calls through)
+
+        Returns:
+            bool
+        """
+        name = self._resolve(provider)
+        if self.breaker(name).available():
+            return True
+        target = self.hedge_targets.get(name)
+        return target is not None and self.breaker(target[0]).available()
+
+    def _admit(self, name):
+        """Raise CircuitOpenError unless the backend's breaker lets a call through"""
+        breaker = self.breaker(name)
+        if not breaker.allow():
+            raise CircuitOpenError(name, breaker.retry_after())
+
+    def _record(self, name, error=None):
+        """Tell a backend's breaker how a call went (only transient failures count against it)"""
+        if error is None:
+            self.breaker(name).record_success()
+        elif is_retryable(error):
+            self.breaker(name).record_failure()
+        else:
+            self.breaker(name).release()
+
+    def resilience_report(self):
+        """
+        Circuit breaker states and deadlines, for monitoring
+
+        Returns:
+            dict
+        """
+        return {
+            'breakers': {name: breaker.to_dict() for name, breaker in sorted(self._breakers.items())},
+            'deadlines': {'default': self.default_deadline, **self.deadlines},
+            'breaker_failures': self.breaker_failures,
+            'breaker_open_seconds': self.breaker_open_seconds,
+        }
+
+    # ============================================
+    # LATENCY
+    # ============================================
+
+    def latency(self, provider):
+        """
+        Latency histogram of one backend (created on first use)
+
+        Returns:
+            LatencyHistogram
+        """
+        histogram = self._latency.get(provider)
+        if histogram is None:
+            with self._lock:
+                histogram = self._latency.setdefault(provider, LatencyHistogram())
+        return histogram
+
+    def latency_report(self):
+        """
+        Per-backend latency histograms and hedging counters, for tuning the budget
+
+        Returns:
+            dict
+        """
+        return {
+            'backends': {name: histogram.to_dict() for name, histogram in sorted(self._latency.items())},
+            'hedging': {
+                **self.hedge_stats,
+                'targets': {primary: f"{backend}:{model}" for primary, (backend, model) in self.hedge_targets.items()},
+                'budgets': {primary: round(self.hedge_budget(primary), 3) for primary in self.hedge_targets},
+            },
+        }
+
+    def _before_retry(self, backend, error, attempt, retries, can_retry, deadline):
+        """Raise LLMError unless the failed attempt may be retried within the deadline; otherwise back off"""
+        retryable = is_retryable(error)
+        if retryable and deadline.expired:
+            raise DeadlineExceeded(backend.name, deadline.seconds) from error
+        if not (retryable and can_retry) or attempt >= retries:
+            raise LLMError(
+                f"{backend.name} call failed: {error}",
+                provider=backend.name,
+                status_code=error_status(error),
+                retryable=retryable
+            ) from error
+
+        delay = backoff_delay(attempt)
+        remaining = deadline.remaining()
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceeded(backend.name, deadline.seconds) from error
+        print(f"🔄 {backend.name} call failed ({error}), retry {attempt + 1}/{retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+
+# Shared, process-level client
+llm = LLMClient()
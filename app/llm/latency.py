@@ -0,0 +1,103 @@
+"""
+LLM Latency Histograms
+Fixed, log-spaced latency buckets per backend; used to report tail
+latency and to pick the hedging budget
+"""
+
+import threading
+
+import numpy as np
+
+
+# Bucket upper edges: 50ms to 5 minutes, log-spaced (about 19% apart)
+BUCKET_EDGES = np.geomspace(0.05, 300, 50)
+
+
+class LatencyHistogram:
+    """
+    Counts of call durations in BUCKET_EDGES buckets
+
+    Percentiles are interpolated inside the bucket they fall in, so they
+    are accurate to the bucket width no matter how many calls are recorded.
+    """
+
+    def __init__(self, edges=BUCKET_EDGES):
+        self.edges = edges
+        self.counts = np.zeros(len(edges) + 1, dtype=np.int64)  # last bucket: above the top edge
+        self.failures = 0
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def record(self, seconds):
+        """Add one successful call's duration"""
+        with self._lock:
+            self.counts[np.searchsorted(self.edges, seconds)] += 1
+            self.total_seconds += seconds
+
+    def record_failure(self):
+        """Count a failed call (not part of the latency distribution)"""
+        with self._lock:
+            self.failures += 1
+
+    def percentile(self, q):
+        """
+        Estimated q-th percentile in seconds
+
+        Args:
+            q: Percentile, 0-100
+
+        Returns:
+            float, or None with no calls recorded
+        """
+        with self._lock:
+            counts = self.counts.copy()
+        total = counts.sum()
+        if total == 0:
+            return None
+
+        cumulative = np.cumsum(counts)
+        rank = q / 100 * total
+        bucket = int(np.searchsorted(cumulative, rank))
+        if bucket >= len(self.edges):
+            return float(self.edges[-1])
+
+        lower = self.edges[bucket - 1] if bucket > 0 else 0.0
+        upper = self.edges[bucket]
+        before = cumulative[bucket - 1] if bucket > 0 else 0
+        fraction = (rank - before) / counts[bucket] if counts[bucket] else 1.0
+        return float(lower + (upper - lower) * fraction)
+
+    def to_dict(self):
+        """
+        Summary for monitoring
+
+        Returns:
+            dict with count, failures, mean and p50/p90/p99 (seconds), and
+            the non-empty buckets as [upper_edge, count] pairs
+        """
+        count = self.count
+
+        def rounded(value):
+            return round(value, 3) if value is not None else None
+
+        with self._lock:
+            buckets = [
+                [round(float(edge), 3) if index < len(self.edges) else None, int(n)]
+                for index, (edge, n) in enumerate(zip(list(self.edges) + [None], self.counts))
+                if n
+            ]
+            mean = self.total_seconds / count if count else None
+
+        return {
+            'count': count,
+            'failures': self.failures,
+            'mean': rounded(mean),
+            'p50': rounded(self.percentile(50)),
+            'p90': rounded(self.percentile(90)),
+            'p99': rounded(self.percentile(99)),
+            'buckets': buckets,
+        }
@@ -0,0 +1,268 @@
+"""
+LLM Backends
+Each backend owns one long-lived SDK client on top of a pooled,
+keep-alive httpx connection pool; clients are built once and reused
+"""
+
+import httpx
+
+
+# Connection pool defaults (per backend)
+DEFAULT_POOL_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_SECONDS = 120
+
+
+def pooled_http_client(timeout, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                       keepalive_seconds=DEFAULT_KEEPALIVE_SECONDS):
+    """
+    Build an httpx client that keeps TLS connections open between calls
+
+    Args:
+        timeout: Default request timeout in seconds
+        pool_connections: Maximum open (and idle kept-alive) connections
+        keepalive_seconds: How long an idle connection is kept
+
+    Returns:
+        httpx.Client
+    """
+    return httpx.Client(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=pool_connections,
+            max_keepalive_connections=pool_connections,
+            keepalive_expiry=keepalive_seconds
+        )
+    )
+
+
+class LLMResponse:
+    """Text of one completion plus what it cost"""
+
+    def __init__(self, text, provider, model, input_tokens=0, output_tokens=0):
+        self.text = text
+        self.provider = provider
+        self.model = model
+        self.input_tokens = input_tokens or 0
+        self.output_tokens = output_tokens or 0
+
+    def __repr__(self):
+        return f'<LLMResponse {self.provider}/{self.model} {self.input_tokens}+{self.output_tokens} tokens>'
+
+
+class OpenAICompatibleProvider:
+    """
+    Any OpenAI-compatible chat completions API
+    (default: the Hugging Face inference router)
+    """
+
+    name = 'openai'
+
+    def __init__(self, base_url, api_key, timeout, pool_connections=DEFAULT_POOL_CONNECTIONS):
+        from openai import OpenAI
+
+        # Retries are done by LLMClient, with jitter, across every backend
+        self.client = OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=0,
+            http_client=pooled_http_client(timeout, pool_connections)
+        )
+
+    def complete(self, messages, model, temperature=None, json_mode=False, timeout=None):
+        """
+        Run one chat completion
+
+        Args:
+            messages: list of {"role": "system" | "user" | "assistant", "content": str}
+            model: Model name
+            temperature: Sampling temperature (None: provider default)
+            json_mode: Ask for a JSON object response
+            timeout: Seconds for this call (None: client default)
+
+        Returns:
+            LLMResponse
+        """
+        options = self._options(temperature, json_mode, timeout)
+        completion = self.client.chat.completions.create(model=model, messages=messages, **options)
+        usage = completion.usage
+        return LLMResponse(
+            completion.choices[0].message.content,
+            provider=self.name,
+            model=model,
+            input_tokens=usage.prompt_tokens if usage else 0,
+            output_tokens=usage.completion_tokens if usage else 0
+        )
+
+    def stream(self, messages, model, temperature=None, json_mode=False, timeout=None, usage=None):
+        """
+        Run one chat completion, yielding text as it is generated
+        (arguments as in complete)
+
+        Args:
+            usage: dict that receives input_tokens / output_tokens once the
+                   provider reports them (in the last chunk)
+
+        Yields:
+            str chunks
+        """
+        options = self._options(temperature, json_mode, timeout)
+        # Closing the stream (also when the caller stops early) drops the HTTP response
+        with self.client.chat.completions.create(model=model, messages=messages, stream=True,
+                                                 stream_options={'include_usage': True}, **options) as stream:
+            for chunk in stream:
+                if chunk.usage and usage is not None:
+                    usage['input_tokens'] = chunk.usage.prompt_tokens
+                    usage['output_tokens'] = chunk.usage.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    @staticmethod
+    def _options(temperature, json_mode, timeout):
+        options = {}
+        if temperature is not None:
+            options['temperature'] = temperature
+        if json_mode:
+            options['response_format'] = {'type': 'json_object'}
+        if timeout is not None:
+            options['timeout'] = timeout
+        return options
+
+    def close(self):
+        self.client.close()
+
+
+class GeminiProvider:
+    """Google Gemini through the google-genai SDK"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key, timeout, pool_connections=DEFAULT_POOL_CONNECTIONS):
+        from google import genai
+        from google.genai import types
+
+        self._types = types
+        self._http_client = pooled_http_client(timeout, pool_connections)
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(
+                timeout=int(timeout * 1000),
+                httpx_client=self._http_client
+            )
+        )
+
+    def complete(self, messages, model, temperature=None, json_mode=False, timeout=None):
+        """
+        Run one generate_content call (see OpenAICompatibleProvider.complete)
+
+        System messages become the system instruction; assistant turns
+        become "model" turns.
+
+        Returns:
+            LLMResponse
+        """
+        contents, config = self._request(messages, temperature, json_mode, timeout)
+        response = self.client.models.generate_content(model=model, contents=contents, config=config)
+        usage = response.usage_metadata
+        return LLMResponse(
+            response.text,
+            provider=self.name,
+            model=model,
+            input_tokens=usage.prompt_token_count if usage else 0,
+            output_tokens=usage.candidates_token_count if usage else 0
+        )
+
+    def stream(self, messages, model, temperature=None, json_mode=False, timeout=None, usage=None):
+        """
+        Run one generate_content call, yielding text as it is generated
+        (see OpenAICompatibleProvider.stream)
+
+        Yields:
+            str chunks
+        """
+        contents, config = self._request(messages, temperature, json_mode, timeout)
+        chunks = self.client.models.generate_content_stream(model=model, contents=contents, config=config)
+        try:
+            for chunk in chunks:
+                # Every chunk carries the running totals
+                if chunk.usage_metadata and usage is not None:
+                    usage['input_tokens'] = chunk.usage_metadata.prompt_token_count
+                    usage['output_tokens'] = chunk.usage_metadata.candidates_token_count
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            chunks.close()
+
+    def _request(self, messages, temperature, json_mode, timeout):
+        types = self._types
+        system = [message['content'] for message in messages if message['role'] == 'system']
+        contents = [
+            types.Content(
+                role='model' if message['role'] == 'assistant' else 'user',
+                parts=[types.Part(text=message['content'])]
+            )
+            for message in messages
+            if message['role'] != 'system'
+        ]
+
+        config = types.GenerateContentConfig(
+            system_instruction='\n\n'.join(system) if system else None,
+            temperature=temperature,
+            response_mime_type='application/json' if json_mode else None,
+            http_options=types.HttpOptions(timeout=int(timeout * 1000)) if timeout is not None else None
+        )
+        return contents, config
+
+    def close(self):
+        self._http_client.close()
+
+
+class StubProvider:
+    """
+    Local backend that never leaves the process (development and offline runs)
+
+    `reply` is a fixed string or a callable(messages, model, json_mode) -> str;
+    by default the last user message is echoed back.
+    """
+
+    name = 'stub'
+
+    # Characters per streamed chunk
+    chunk_size = 16
+
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.calls = 0
+
+    def complete(self, messages, model, temperature=None, json_mode=False, timeout=None):
+        """Answer without any network call (see OpenAICompatibleProvider.complete)"""
+        self.calls += 1
+        text = self._text(messages, model, json_mode)
+        prompt_words = sum(len(message['content'].split()) for message in messages)
+        return LLMResponse(text, provider=self.name, model=model,
+                           input_tokens=prompt_words, output_tokens=len(text.split()))
+
+    def stream(self, messages, model, temperature=None, json_mode=False, timeout=None, usage=None):
+        """Yield the stub answer in small chunks"""
+        self.calls += 1
+        text = self._text(messages, model, json_mode)
+        if usage is not None:
+            usage['input_tokens'] = sum(len(message['content'].split()) for message in messages)
+            usage['output_tokens'] = len(text.split())
+        for start in range(0, len(text), self.chunk_size):
+            yield text[start:start + self.chunk_size]
+
+    def _text(self, messages, model, json_mode):
+        if callable(self.reply):
+            text = self.reply(messages, model, json_mode)
+        elif self.reply is not None:
+            text = self.reply
+        elif json_mode:
+            text = '{}'
+        else:
+            last_user = next((message['content'] for message in reversed(messages) if message['role'] == 'user'), '')
+            text = f"[stub {model}] {last_user[:200]}"
+        return text
+
+    def close(self):
+        pass
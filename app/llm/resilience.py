@@ -0,0 +1,168 @@
+"""
+LLM Call Resilience
+Per-call deadlines and per-backend circuit breakers, so a provider
+brownout fails calls fast instead of tying up every worker on a socket
+"""
+
+import threading
+import time
+
+
+# Breaker defaults: open after this many transient failures in a row,
+# stay open this long, then let one trial call through (half-open)
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_OPEN_SECONDS = 30.0
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def parse_deadlines(spec):
+    """
+    Parse LLM_DEADLINES, e.g. "chat=20,title=8,meal=60"
+
+    Returns:
+        dict: purpose -> seconds
+    """
+    deadlines = {}
+    for entry in (spec or '').split(','):
+        purpose, _, seconds = entry.partition('=')
+        try:
+            deadlines[purpose.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return {purpose: seconds for purpose, seconds in deadlines.items() if purpose and seconds > 0}
+
+
+class Deadline:
+    """
+    Time budget for one logical call, shared by its retries and backoff
+
+    Args:
+        seconds: Budget (None: no deadline)
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started = time.monotonic()
+
+    def remaining(self):
+        """Seconds left (None without a deadline, never negative)"""
+        if self.seconds is None:
+            return None
+        return max(self.seconds - (time.monotonic() - self.started), 0.0)
+
+    @property
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def clamp(self, seconds):
+        """The smaller of `seconds` and the time left"""
+        remaining = self.remaining()
+        return seconds if remaining is None else min(seconds, remaining)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one backend
+
+    Closed: calls go through; `failures` transient failures in a row open it.
+    Open: calls are refused at once for `open_seconds`.
+    Half-open: one trial call goes through; success closes the breaker,
+    failure opens it again.
+
+    Only transient failures (timeouts, connection errors, 429/5xx) count;
+    a bad request says nothing about the provider's health.
+    """
+
+    def __init__(self, name, failures=DEFAULT_BREAKER_FAILURES, open_seconds=DEFAULT_BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.failure_threshold = failures
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.stats = {'opened': 0, 'rejected': 0, 'successes': 0, 'failures': 0}
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a call may go out now (claims the half-open trial)
+
+        Returns:
+            bool
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self.trial_in_flight = False
+                print(f"🟡 {self.name} circuit half-open: sending a trial call")
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+
+            self.stats['rejected'] += 1
+            return False
+
+    def available(self):
+        """Check whether a call would be let through, without claiming the trial"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.open_seconds
+            return self.state == CLOSED or not self.trial_in_flight
+
+    def retry_after(self):
+        """Seconds until the breaker lets a call through again (0 when it would now)"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(self.open_seconds - (time.monotonic() - self.opened_at), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self.stats['successes'] += 1
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                print(f"🟢 {self.name} circuit closed")
+            self.state = CLOSED
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats['opened'] += 1
+                    print(f"🔴 {self.name} circuit open for {self.open_seconds:g}s "
+                          f"({self.consecutive_failures} failures in a row)")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial that ended without a verdict (e.g. a bad request)"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def to_dict(self):
+        """
+        Breaker state for monitoring
+
+        Returns:
+            dict with state, failures in a row, seconds until retry and counters
+        """
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_after': round(retry_after, 1),
+                **self.stats,
+            }
@@ -0,0 +1,181 @@
+"""
+Local OpenAI-Compatible Stub Server
+A tiny chat completions endpoint with configurable latency, for trying
+hedging and timeouts without a real provider:
+
+    python -m app.llm.stub_server --port 9001 --delay 3
+    python -m app.llm.stub_server --port 9002 --delay 0.5
+
+    LLM_OPENAI_BASE_URL=http://127.0.0.1:9001/v1 \
+    LLM_BACKUP_BASE_URL=http://127.0.0.1:9002/v1 \
+    LLM_HEDGE_TO='openai=backup:stub-model' python main.py
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.llm.providers import StubProvider
+
+
+class StubCompletionsHandler(BaseHTTPRequestHandler):
+    """Answers POST .../chat/completions (plain or stream=true) after server.delay seconds"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        server.count('requests')
+
+        time.sleep(server.delay)
+        if server.status != 200:
+            self._send_json(server.status, {'error': {'message': 'stub failure', 'type': 'server_error'}})
+            return
+
+        model = request.get('model', 'stub-model')
+        json_mode = (request.get('response_format') or {}).get('type') == 'json_object'
+        text = server.stub._text(request.get('messages', []), model, json_mode)
+        prompt_tokens = sum(len(message.get('content', '').split()) for message in request.get('messages', []))
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(text.split()),
+                 'total_tokens': prompt_tokens + len(text.split())}
+
+        if request.get('stream'):
+            include_usage = (request.get('stream_options') or {}).get('include_usage')
+            self._stream(text, model, usage if include_usage else None)
+        else:
+            sent = self._send_json(200, {
+                'id': f'chatcmpl-{uuid.uuid4().hex}',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+            if sent:
+                server.count('completed')
+
+    def _stream(self, text, model, usage=None):
+        server = self.server
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        pieces = [text[i:i + server.stub.chunk_size] for i in range(0, len(text), server.stub.chunk_size)]
+        try:
+            for index, piece in enumerate(pieces + [None]):
+                if index:
+                    time.sleep(server.chunk_delay)
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'delta': {'content': piece} if piece is not None else {},
+                        'finish_reason': None if piece is not None else 'stop',
+                    }],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            if usage is not None:
+                # stream_options.include_usage: a last chunk with no choices, only usage
+                chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': model, 'choices': [], 'usage': usage}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk('')
+            server.count('completed')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client hung up (e.g. it was the losing side of a hedge)
+            server.count('cancelled')
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        payload = data.encode('utf-8')
+        self.wfile.write(f"{len(payload):X}\r\n".encode('ascii') + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+            return True
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting (timeout or deadline)
+            self.server.count('cancelled')
+            self.close_connection = True
+            return False
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    HTTP server behind StubCompletionsHandler
+
+    Args:
+        port: Port to listen on (0: any free port)
+        delay: Seconds before answering
+        chunk_delay: Seconds between streamed chunks
+        reply: Fixed reply text (default: echo, as StubProvider)
+        status: HTTP status to answer with (non-200 simulates an outage)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.0, chunk_delay=0.0, reply=None, status=200):
+        super().__init__(('127.0.0.1', port), StubCompletionsHandler)
+        self.delay = delay
+        self.chunk_delay = chunk_delay
+        self.status = status
+        self.stub = StubProvider(reply=reply)
+        self.stats = {'requests': 0, 'completed': 0, 'cancelled': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def start(self):
+        """Serve from a background thread; returns self"""
+        threading.Thread(target=self.serve_forever, name=f'llm-stub-{self.server_address[1]}', daemon=True).start()
+        return self
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible stub LLM server')
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds before answering')
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help='seconds between streamed chunks')
+    parser.add_argument('--reply-file', help='file whose text is returned for every request')
+    parser.add_argument('--status', type=int, default=200, help='HTTP status to answer with')
+    args = parser.parse_args()
+
+    reply = None
+    if args.reply_file:
+        with open(args.reply_file, encoding='utf-8') as f:
+            reply = f.read()
+
+    server = StubServer(args.port, args.delay, args.chunk_delay, reply, args.status)
+    print(f"🧪 Stub LLM server on {server.base_url} (delay {args.delay}s)")
+    server.serve_forever()
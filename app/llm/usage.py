@@ -0,0 +1,362 @@
+"""
+LLM Usage Metering
+Prompt and completion tokens, wall time and prompt size of every LLM call,
+tagged by feature and user. Totals are kept in memory for monitoring and
+each call is written behind to the llm_usage ledger, which
+utils/llm_usage_report.py reads (heaviest prompt sections included)
+"""
+
+import atexit
+import json
+import queue
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from flask import has_request_context, session
+from sqlalchemy import case, func, insert
+
+from db.models import db, LLMUsage
+
+
+# Write-behind defaults
+DEFAULT_FLUSH_SECONDS = 2.0
+DEFAULT_BATCH_SIZE = 200
+
+# Feature recorded for calls made without a purpose
+OTHER_FEATURE = 'other'
+
+# A prompt section starts with an upper-case label at the start of a line:
+# "FAMILY CONTEXT:", "DIETARY RESTRICTIONS (MUST AVOID):", "🎯 YOUR ROLE:"
+SECTION_HEADER = re.compile(r"^[^\w\n]*([A-Z][A-Z0-9 &/'-]+?)\s*(?:\([^)\n]*\))?:", re.MULTILINE)
+
+# Text before the first header of a sectioned message
+PREAMBLE = 'PREAMBLE'
+
+# Tags (user_id, ...) of the calls made in the current context
+_usage_tags = ContextVar('llm_usage_tags', default=None)
+
+
+def estimate_tokens(text):
+    """
+    Rough token count for text the provider did not count:
+    about 4 characters per token for ASCII, 2 for anything else (Arabic, emoji)
+
+    Returns:
+        int
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return max(1, round(ascii_chars / 4 + (len(text) - ascii_chars) / 2))
+
+
+def split_prompt_sections(messages):
+    """
+    Split a prompt into named sections with their estimated tokens
+
+    A message with at least two section headers is split at each header
+    (text before the first one is the preamble); any other message counts
+    towards "<role> messages".
+
+    Args:
+        messages: list of {"role", "content"} dicts
+
+    Returns:
+        dict: section name -> estimated tokens
+    """
+    sections = defaultdict(int)
+    for message in messages:
+        content = message.get('content') or ''
+        headers = list(SECTION_HEADER.finditer(content))
+        if len(headers) < 2:
+            sections[f"{message.get('role', 'user')} messages"] += estimate_tokens(content)
+            continue
+
+        sections[PREAMBLE] += estimate_tokens(content[:headers[0].start()].strip())
+        for header, following in zip(headers, headers[1:] + [None]):
+            end = following.start() if following else len(content)
+            sections[header.group(1).strip()] += estimate_tokens(content[header.start():end])
+    return {name: tokens for name, tokens in sections.items() if tokens}
+
+
+def profile_prompt(messages):
+    """
+    Size of a prompt, worked out once per logical call (retries share it)
+
+    Returns:
+        dict with chars, estimated tokens and sections
+    """
+    sections = split_prompt_sections(messages)
+    return {
+        'chars': sum(len(message.get('content') or '') for message in messages),
+        'tokens': sum(sections.values()),
+        'sections': sections,
+    }
+
+
+@contextmanager
+def usage_tags(**tags):
+    """
+    Tag the LLM calls made inside the block, e.g. usage_tags(user_id=3)
+    (inside a request the signed-in user is tagged without this)
+    """
+    token = _usage_tags.set({**(_usage_tags.get() or {}), **tags})
+    try:
+        yield
+    finally:
+        _usage_tags.reset(token)
+
+
+def current_tags():
+    """
+    Tags for a call made now: those set by usage_tags, else the signed-in user
+
+    Returns:
+        dict with at least user_id (None outside a request)
+    """
+    tags = dict(_usage_tags.get() or {})
+    if tags.get('user_id') is None:
+        tags['user_id'] = session.get('user_id') if has_request_context() else None
+    return tags
+
+
+def _error_name(error):
+    if error is None or isinstance(error, str):
+        return error
+    return type(error).__name__
+
+
+class UsageMeter:
+    """
+    Per-call usage records: in-memory totals plus a write-behind ledger
+
+    The totals (by feature, by provider and by prompt section) are always
+    kept. With LLM_USAGE_LEDGER on, a background thread also writes the
+    queued records to llm_usage every `flush_seconds`, one transaction per
+    batch; records still queued at exit are flushed by an atexit hook.
+    """
+
+    def __init__(self, flush_seconds=DEFAULT_FLUSH_SECONDS, batch_size=DEFAULT_BATCH_SIZE):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.ledger = False
+        self.written = 0
+        self._features = defaultdict(self._counters)
+        self._providers = defaultdict(self._counters)
+        self._sections = defaultdict(lambda: {'calls': 0, 'tokens': 0})
+        self._queue = queue.Queue()
+        self._app = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    @staticmethod
+    def _counters():
+        return {'calls': 0, 'failures': 0, 'input_tokens': 0, 'output_tokens': 0, 'estimated': 0, 'seconds': 0.0}
+
+    def init_app(self, app):
+        """
+        Turn on the ledger if the app config asks for it
+
+        Args:
+            app: Flask application instance
+        """
+        self._app = app
+        self.ledger = app.config.get('LLM_USAGE_LEDGER', False)
+        self.flush_seconds = app.config.get('LLM_USAGE_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        app.extensions['llm_usage'] = self
+
+        if self.ledger and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='llm-usage-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    # ============================================
+    # RECORDING
+    # ============================================
+
+    def record(self, purpose, tags, prompt, provider, model, text, seconds,
+               input_tokens=0, output_tokens=0, error=None):
+        """
+        Record one call to a backend
+
+        Args:
+            purpose: Feature the call was for (None: 'other')
+            tags: current_tags() at the time of the call
+            prompt: profile_prompt() of the messages sent
+            provider: Backend name
+            model: Model name
+            text: Text received (all of it, or as far as the call got)
+            seconds: Wall time
+            input_tokens: Prompt tokens reported by the provider (0: estimate)
+            output_tokens: Completion tokens reported by the provider (0: estimate)
+            error: Exception, or 'cancelled' / 'abandoned', if the call did not finish
+        """
+        estimated = False
+        if not input_tokens:
+            input_tokens, estimated = prompt['tokens'], True
+        if not output_tokens and text:
+            output_tokens, estimated = estimate_tokens(text), True
+        output_tokens = output_tokens or 0
+
+        feature = purpose or OTHER_FEATURE
+        with self._lock:
+            for counters in (self._features[feature], self._providers[provider]):
+                counters['calls'] += 1
+                counters['failures'] += error is not None
+                counters['input_tokens'] += input_tokens
+                counters['output_tokens'] += output_tokens
+                counters['estimated'] += estimated
+                counters['seconds'] += seconds
+            for section, tokens in prompt['sections'].items():
+                totals = self._sections[(feature, section)]
+                totals['calls'] += 1
+                totals['tokens'] += tokens
+
+        if self.ledger:
+            self._queue.put({
+                'created_at': datetime.utcnow(),
+                'user_id': tags.get('user_id'),
+                'feature': feature,
+                'provider': provider,
+                'model': model,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'estimated': estimated,
+                'duration_ms': round(seconds * 1000),
+                'success': error is None,
+                'error': _error_name(error),
+                'prompt_chars': prompt['chars'],
+                'prompt_sections': json.dumps(prompt['sections'], ensure_ascii=False),
+            })
+
+    def report(self, top_sections=10):
+        """
+        Totals since the process started, for monitoring
+
+        Args:
+            top_sections: How many of the heaviest prompt sections to list
+
+        Returns:
+            dict with per-feature and per-provider totals and the heaviest sections
+        """
+        def summary(counters):
+            calls = counters['calls']
+            return {
+                **{key: value for key, value in counters.items() if key != 'seconds'},
+                'avg_ms': round(counters['seconds'] * 1000 / calls) if calls else None,
+            }
+
+        with self._lock:
+            features = {name: summary(counters) for name, counters in sorted(self._features.items())}
+            providers = {name: summary(counters) for name, counters in sorted(self._providers.items())}
+            sections = sorted(self._sections.items(), key=lambda item: item[1]['tokens'], reverse=True)
+            heaviest = [
+                {'feature': feature, 'section': section, 'calls': totals['calls'],
+                 'tokens': totals['tokens'], 'avg_tokens': round(totals['tokens'] / totals['calls'])}
+                for (feature, section), totals in sections[:top_sections]
+            ]
+
+        return {
+            'features': features,
+            'providers': providers,
+            'heaviest_sections': heaviest,
+            'ledger': self.ledger,
+            'pending': self._queue.qsize(),
+            'written': self.written,
+        }
+
+    # ============================================
+    # LEDGER
+    # ============================================
+
+    def _drain(self):
+        rows = []
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows):
+        with self._app.app_context():
+            try:
+                db.session.execute(insert(LLMUsage.__table__), rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Failed to write {len(rows)} LLM usage records: {e}")
+                return 0
+        self.written += len(rows)
+        return len(rows)
+
+    def flush(self):
+        """
+        Write everything queued right now
+
+        Returns:
+            Number of records written
+        """
+        written = 0
+        with self._flush_lock:
+            rows = self._drain()
+            while rows:
+                written += self._write(rows)
+                rows = self._drain()
+        return written
+
+    def _run(self):
+        # Records stay queued until written, so the atexit flush sees every one
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+
+def usage_totals(group_by, since=None, user_id=None):
+    """
+    Ledger totals grouped by one or more llm_usage columns
+
+    Args:
+        group_by: Column names, e.g. ('feature',) or ('user_id', 'feature')
+        since: Only calls from this datetime on (None: all)
+        user_id: Only this user's calls (None: everyone's)
+
+    Returns:
+        list of dicts: the group columns plus calls, failures, input_tokens,
+        output_tokens, estimated and avg_ms, heaviest first
+    """
+    columns = [getattr(LLMUsage, name) for name in group_by]
+    input_tokens = func.sum(LLMUsage.input_tokens)
+    output_tokens = func.sum(LLMUsage.output_tokens)
+    query = db.session.query(
+        *columns,
+        func.count(LLMUsage.id),
+        func.sum(case((LLMUsage.success.is_(False), 1), else_=0)),
+        input_tokens,
+        output_tokens,
+        func.sum(case((LLMUsage.estimated.is_(True), 1), else_=0)),
+        func.avg(LLMUsage.duration_ms)
+    )
+    if since is not None:
+        query = query.filter(LLMUsage.created_at >= since)
+    if user_id is not None:
+        query = query.filter(LLMUsage.user_id == user_id)
+    rows = query.group_by(*columns).order_by((input_tokens + output_tokens).desc()).all()
+
+    keys = list(group_by) + ['calls', 'failures', 'input_tokens', 'output_tokens', 'estimated', 'avg_ms']
+    totals = []
+    for row in rows:
+        entry = dict(zip(keys, row))
+        entry['avg_ms'] = round(entry['avg_ms']) if entry['avg_ms'] is not None else None
+        totals.append(entry)
+    return totals
+
+
+# Shared, process-level usage meter
+usage_meter = UsageMeter()
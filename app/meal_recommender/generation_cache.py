@@ -0,0 +1,187 @@
+"""
+Meal Generation Cache
+Process-level LRU + TTL cache of generate_meal results, keyed on a
+canonical fingerprint of everything that shapes the prompt
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+# Generations kept, and for how long
+DEFAULT_CACHE_SIZE = 500
+DEFAULT_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+def _canonical_list(values):
+    """Trimmed, case-folded, de-duplicated and sorted strings"""
+    return sorted({str(value).strip().casefold() for value in values if value and str(value).strip()})
+
+
+def meal_fingerprint(selected_ingredients, meal_type, cuisine_type, child_profiles, dietary_restrictions, language='en'):
+    """
+    Build the cache key for a generation request
+
+    Ingredient order, case and repeats don't matter, and children are
+    reduced to their age buckets and special needs (names never reach the
+    prompt), so families asking for the same thing share one entry.
+
+    Args:
+        selected_ingredients: list of ingredient names
+        meal_type: breakfast, lunch, dinner, snack, dessert
+        cuisine_type: arabic or international
+        child_profiles: list of child profile dicts (from build_child_profiles)
+        dietary_restrictions: list of dietary restrictions
+        language: 'en' or 'ar'
+
+    Returns:
+        Hex digest string
+    """
+    canonical = {
+        'ingredients': _canonical_list(selected_ingredients),
+        'meal_type': meal_type,
+        'cuisine_type': cuisine_type,
+        'dietary_restrictions': _canonical_list(dietary_restrictions),
+        'age_buckets': sorted(child.get('age_range') or 'unknown' for child in child_profiles),
+        'special_needs': _canonical_list(child.get('special_needs') for child in child_profiles),
+        'language': language,
+    }
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MealGenerationCache:
+    """
+    Least-recently-used cache of generated meals
+
+    Holds at most `size` meals; entries older than `ttl_seconds` are treated
+    as misses and dropped. Callers get a deep copy, so editing a returned
+    meal never changes the cached one.
+
+    Kept in process memory; with several workers each one has its own cache.
+    """
+
+    def __init__(self, size=DEFAULT_CACHE_SIZE, ttl_seconds=DEFAULT_CACHE_TTL_SECONDS):
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (stored_at, meal_data)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Read cache limits from the app config
+
+        Args:
+            app: Flask application instance
+        """
+        self.size = app.config.get('MEAL_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        self.ttl_seconds = app.config.get('MEAL_CACHE_TTL_SECONDS', DEFAULT_CACHE_TTL_SECONDS)
+        self.enabled = self.size > 0
+        app.extensions['meal_generation_cache'] = self
+
+    def get(self, key):
+        """
+        Look up a cached meal (counts a hit or a miss)
+
+        Returns:
+            Copy of the meal dict, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, meal_data):
+        """Store a freshly generated meal, evicting the least recently used if full"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(meal_data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, key, force_fresh=False):
+        """
+        Look up a meal unless the caller wants a fresh one (counted as a miss)
+
+        Returns:
+            Copy of the meal dict, or None
+        """
+        if not self.enabled:
+            return None
+        if force_fresh:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self.get(key)
+
+    def get_or_generate(self, key, generate, force_fresh=False):
+        """
+        Return the cached meal for a key, or generate and cache it
+
+        Args:
+            key: Fingerprint from meal_fingerprint
+            generate: Zero-argument callable that produces the meal dict
+            force_fresh: Skip the lookup (the new meal still replaces the cached one)
+
+        Returns:
+            (meal_data, from_cache)
+        """
+        meal_data = self.lookup(key, force_fresh)
+        if meal_data is not None:
+            return meal_data, True
+
+        meal_data = generate()
+        self.put(key, meal_data)
+        return meal_data, False
+
+    def clear(self):
+        """Drop every cached meal"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Hit/miss counters for monitoring
+
+        Returns:
+            dict with size, capacity, hits, misses, evictions and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'capacity': self.size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared, process-level cache
+meal_cache = MealGenerationCache()
@@ -0,0 +1,416 @@
+"""
+Meal Generation Job Queue
+Generation requests are stored as meal_jobs rows and run by a bounded
+pool of background threads, so no request thread waits on the LLM
+"""
+
+import hashlib
+import os
+import queue
+import socket
+import threading
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from db.models import db, MealJob
+
+
+# Worker pool defaults
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUED = 100
+
+# A running job whose process has not finished it this long after it started
+# is taken over (must exceed the longest generation, LLM deadline included)
+DEFAULT_LEASE_SECONDS = 10 * 60
+
+# How often an idle worker looks for abandoned jobs
+RECOVER_INTERVAL_SECONDS = 60
+
+# Finished jobs kept for latency stats, and jobs whose progress events are kept in memory
+LATENCY_WINDOW = 500
+MAX_TRACKED_JOBS = 1000
+
+
+class QueueFull(Exception):
+    """Too many jobs are already waiting"""
+
+
+def scoped_idempotency_key(client_key, dedupe_key=None):
+    """
+    Bind a client's idempotency key to the request it was sent with
+
+    A page keeps its key across back/forward navigation, so the same key
+    with a different request must start a new job rather than replay the
+    old one.
+
+    Args:
+        client_key: Key from the Idempotency-Key header or form field
+        dedupe_key: Fingerprint of the request
+
+    Returns:
+        Hex digest string, or None without a client key
+    """
+    if not client_key:
+        return None
+    return hashlib.sha256(f"{client_key}:{dedupe_key or ''}".encode('utf-8')).hexdigest()
+
+
+class MealJobQueue:
+    """
+    SQLite-backed job queue with an in-process worker pool
+
+    submit() writes a queued meal_jobs row and hands its ID to one of
+    `workers` daemon threads; at most `max_queued` jobs wait at once.
+    Handlers can report progress events, which pollers read with
+    status(job_id, after=n).
+
+    The workers start with the first request this process serves (or the
+    first submit), so scripts that import the app never run jobs. Each
+    process stamps the jobs it accepts and runs with its owner ID. At
+    start-up, and then every RECOVER_INTERVAL_SECONDS, queued jobs nobody
+    runs are picked up again; a running job is only requeued once its
+    lease has expired (its process died), never while its owner may still
+    be working on it.
+
+    Duplicate submits get the existing job back: a repeated idempotency key
+    replays its job (unless that job failed), and a request identical to
+    one the family already has queued or running joins it.
+
+    The queue lives in this process; with several app processes each one
+    runs the jobs it accepted (any process can report a job's status).
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queued=DEFAULT_MAX_QUEUED,
+                 lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._app = None
+        self._started = False
+        self._queue = queue.Queue()
+        self._threads = []
+        self._handlers = {}
+        self._events = OrderedDict()  # job_id -> list of (event, field, value)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)  # (wait_seconds, run_seconds)
+        self._running = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        self._recover_lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Read pool limits from the app config; the workers start with the
+        first request (see start)
+
+        Args:
+            app: Flask application instance
+        """
+        self._app = app
+        self.workers = app.config.get('MEAL_JOB_WORKERS', DEFAULT_WORKERS)
+        self.max_queued = app.config.get('MEAL_JOB_MAX_QUEUED', DEFAULT_MAX_QUEUED)
+        self.lease_seconds = app.config.get('MEAL_JOB_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+        self.owner = app.config.get('MEAL_JOB_OWNER') or self.owner
+        app.extensions['meal_job_queue'] = self
+        app.before_request(self.start)
+
+    def start(self):
+        """
+        Pick up abandoned jobs and start the workers, once per process
+
+        Called before every request (cheap after the first), so only a
+        process that serves the app runs jobs: not scripts importing it,
+        and not the debug reloader's watcher process.
+        """
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        with self._app.app_context():
+            self._recover()
+
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f'meal-job-{len(self._threads) + 1}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def register(self, kind, handler):
+        """
+        Set the function that runs jobs of one kind
+
+        Args:
+            kind: Job kind, e.g. 'generate'
+            handler: callable(job, payload, report) -> meal ID; report(event, field, value)
+                     publishes a progress event. Runs inside an app context.
+        """
+        self._handlers[kind] = handler
+
+    def submit(self, family_profile_id, kind, payload, idempotency_key=None, dedupe_key=None):
+        """
+        Queue a job, or return the job this request duplicates
+
+        Args:
+            family_profile_id: Family the job belongs to
+            kind: Registered job kind
+            payload: JSON-serializable job input
+            idempotency_key: Client-supplied key; resubmits with it return the same job
+            dedupe_key: Fingerprint of the request; an identical queued or
+                        running job of the same family is returned instead
+
+        Returns:
+            MealJob (already committed)
+
+        Raises:
+            QueueFull: if max_queued jobs are already waiting
+        """
+        idempotency_key = scoped_idempotency_key(idempotency_key, dedupe_key)
+        existing = self._find_duplicate(family_profile_id, idempotency_key, dedupe_key)
+        if existing is not None:
+            return existing
+
+        if self._queue.qsize() >= self.max_queued:
+            raise QueueFull(f"{self._queue.qsize()} meal jobs already queued")
+        self.start()
+
+        job = MealJob(
+            id=uuid.uuid4().hex,
+            family_profile_id=family_profile_id,
+            kind=kind,
+            status=MealJob.QUEUED,
+            owner=self.owner,
+            idempotency_key=idempotency_key,
+            dedupe_key=dedupe_key
+        )
+        job.set_payload(payload)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent submit with the same key won the insert
+            db.session.rollback()
+            existing = self._find_duplicate(family_profile_id, idempotency_key, None)
+            if existing is None:
+                raise
+            return existing
+
+        self._track(job.id)
+        self._queue.put(job.id)
+        return job
+
+    def _find_duplicate(self, family_profile_id, idempotency_key, dedupe_key):
+        """Existing job for a repeated idempotency key or an identical in-flight request"""
+        job = None
+        if idempotency_key:
+            job = MealJob.query.filter_by(
+                family_profile_id=family_profile_id,
+                idempotency_key=idempotency_key
+            ).first()
+            if job is not None and job.status == MealJob.FAILED:
+                # Let the client retry a failure with the same key
+                job.idempotency_key = None
+                db.session.commit()
+                job = None
+
+        if job is None and dedupe_key:
+            job = MealJob.query.filter(
+                MealJob.family_profile_id == family_profile_id,
+                MealJob.dedupe_key == dedupe_key,
+                MealJob.status.in_([MealJob.QUEUED, MealJob.RUNNING])
+            ).order_by(MealJob.created_at.desc()).first()
+
+        if job is not None:
+            with self._lock:
+                self.deduplicated += 1
+            print(f"♻️ Duplicate meal request joined job {job.id} ({job.status})")
+        return job
+
+    def status(self, job, after=0):
+        """
+        Describe a job for pollers
+
+        Args:
+            job: MealJob
+            after: Number of progress events the caller already has
+
+        Returns:
+            dict: job fields, queue position, and the progress events after `after`
+        """
+        events = self._events.get(job.id, [])
+        data = job.to_dict()
+        data['events'] = [
+            {'event': event, 'field': field, 'value': value}
+            for event, field, value in events[after:]
+        ]
+        data['next'] = max(after, len(events))
+        if job.status == MealJob.QUEUED:
+            data['queue_position'] = MealJob.query.filter(
+                MealJob.status == MealJob.QUEUED,
+                MealJob.created_at <= job.created_at
+            ).count()
+        return data
+
+    def stats(self):
+        """
+        Queue depth and job latency for monitoring
+
+        Returns:
+            dict with queued, running, workers and wait/run/total latency percentiles
+        """
+        with self._lock:
+            latencies = np.array(self._latencies, dtype=float).reshape(-1, 2)
+            running = self._running
+
+        def percentiles(values):
+            if len(values) == 0:
+                return None
+            p50, p95 = np.percentile(values, [50, 95])
+            return {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'max': round(float(values.max()), 3)}
+
+        return {
+            'queued': self._queue.qsize(),
+            'running': running,
+            'workers': len(self._threads),
+            'max_queued': self.max_queued,
+            'deduplicated': self.deduplicated,
+            'finished_jobs_sampled': len(latencies),
+            'wait_seconds': percentiles(latencies[:, 0]),
+            'run_seconds': percentiles(latencies[:, 1]),
+            'total_seconds': percentiles(latencies.sum(axis=1)),
+        }
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    # ============================================
+    # WORKERS
+    # ============================================
+
+    def _recover(self, startup=True):
+        """
+        Requeue jobs that no live process will finish
+
+        Queued jobs are taken at start-up (afterwards only once they have
+        waited a whole lease, so a busy peer keeps its backlog); running
+        jobs once their lease has expired, or at start-up if they carry
+        this process's owner ID (a server restarted under the same
+        MEAL_JOB_OWNER). Claiming is atomic, so a job queued here and
+        elsewhere still runs once.
+
+        Returns:
+            Number of requeued jobs
+        """
+        if not self._recover_lock.acquire(blocking=False):
+            return 0
+        try:
+            expired = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+            queued = MealJob.status == MealJob.QUEUED
+            stale = or_(MealJob.started_at.is_(None), MealJob.started_at < expired)
+            if startup:
+                stale = or_(stale, MealJob.owner == self.owner)
+            else:
+                queued = and_(queued, MealJob.created_at < expired)
+            abandoned = and_(MealJob.status == MealJob.RUNNING, stale)
+            with self._lock:
+                tracked = set(self._events)
+            unfinished = [
+                job for job in MealJob.query.filter(or_(queued, abandoned)).order_by(MealJob.created_at)
+                if job.id not in tracked or job.status == MealJob.RUNNING
+            ]
+
+            for job in unfinished:
+                if job.status == MealJob.RUNNING:
+                    print(f"⏰ Meal job {job.id} held by {job.owner} since {job.started_at}, taking it over")
+                job.status = MealJob.QUEUED
+                job.started_at = None
+                job.owner = self.owner
+            db.session.commit()
+
+            for job in unfinished:
+                self._track(job.id)
+                self._queue.put(job.id)
+
+            if unfinished:
+                print(f"🔁 Requeued {len(unfinished)} unfinished meal jobs")
+            return len(unfinished)
+        finally:
+            self._recover_lock.release()
+
+    def _track(self, job_id):
+        with self._lock:
+            self._events[job_id] = []
+            while len(self._events) > MAX_TRACKED_JOBS:
+                self._events.popitem(last=False)
+
+    def _report(self, job_id):
+        def report(event, field, value):
+            with self._lock:
+                events = self._events.get(job_id)
+                if events is not None:
+                    events.append((event, field, value))
+        return report
+
+    def _run(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=RECOVER_INTERVAL_SECONDS)
+            except queue.Empty:
+                # Idle: look for jobs a dead process left behind
+                try:
+                    with self._app.app_context():
+                        self._recover(startup=False)
+                except Exception as e:
+                    print(f"❌ Meal job recovery error: {e}")
+                continue
+
+            with self._lock:
+                self._running += 1
+            try:
+                with self._app.app_context():
+                    self._execute(job_id)
+            except Exception as e:
+                print(f"❌ Meal job worker error ({job_id}): {e}")
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+    def _execute(self, job_id):
+        # Claim the job in one UPDATE, so a job requeued by two processes runs once
+        claimed = MealJob.query.filter_by(id=job_id, status=MealJob.QUEUED).update(
+            {'status': MealJob.RUNNING, 'started_at': datetime.utcnow(), 'owner': self.owner},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(MealJob, job_id)
+        try:
+            handler = self._handlers[job.kind]
+            meal_id = handler(job, job.get_payload(), self._report(job_id))
+            job.status = MealJob.DONE
+            job.meal_id = meal_id
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Meal job {job_id} ({job.kind}) failed: {e}")
+            job = db.session.get(MealJob, job_id)
+            job.status = MealJob.FAILED
+            job.error = str(e)[:500]
+
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+        with self._lock:
+            self._latencies.append((job.wait_seconds(), job.run_seconds()))
+        print(f"🧾 Meal job {job_id} {job.status} (waited {job.wait_seconds():.1f}s, ran {job.run_seconds():.1f}s)")
+
+
+# Shared, process-level job queue
+meal_jobs = MealJobQueue()
@@ -0,0 +1,859 @@
+"""
+Offline Meal Composer
+Deterministic, rule-based recipes built from a curated template library
+over INGREDIENTS and MEAL_TYPES. No network: used for instant "quick
+idea" meals and as the fallback when the AI is slow or down
+"""
+
+import hashlib
+import re
+import threading
+
+from app.meal_recommender.constants import INGREDIENTS
+
+
+# Recipe yield of every composed meal (family-sized, as the AI prompt asks)
+COMPOSED_SERVINGS = 4
+
+# Items the templates use that are not in INGREDIENTS
+PANTRY_ITEMS = {
+    "Water": {"name_ar": "ماء", "icon": "💧"},
+    "Saffron": {"name_ar": "زعفران", "icon": "🌼"},
+    "Flour": {"name_ar": "طحين", "icon": "🌾"},
+}
+
+# ============================================
+# DIETARY RESTRICTIONS
+# A restriction naming one of these (or an ingredient, singular or plural)
+# rules out the ingredients; anything else in it must be a RESTRICTION_WORDS
+# word, or the composer refuses rather than guess
+# ============================================
+
+MEATS = ["Chicken", "Beef", "Lamb"]
+SEAFOOD = ["Fish", "Shrimp"]
+DAIRY = ["Milk", "Yogurt (Laban)", "Cheese (White)", "Labneh", "Butter"]
+GLUTEN = ["Bread (Khubz)", "Pasta", "Bulgur", "Vermicelli", "Oats", "Flour"]
+WHEAT = ["Bread (Khubz)", "Pasta", "Bulgur", "Vermicelli", "Flour"]
+LEGUMES = ["Lentils", "Chickpeas", "Fava Beans", "Nuts (Mixed)"]  # mixed nuts may hold peanuts
+CITRUS = ["Orange", "Lemon", "Dried Lemon"]
+
+RESTRICTED_INGREDIENTS = {
+    "nut": ["Nuts (Mixed)"],
+    "tree nut": ["Nuts (Mixed)"],
+    "peanut": ["Nuts (Mixed)"],
+    "مكسرات": ["Nuts (Mixed)"],
+    "فول سوداني": ["Nuts (Mixed)"],
+    "sesame": ["Tahini"],
+    "سمسم": ["Tahini"],
+    "dairy": DAIRY,
+    "milk": DAIRY,
+    "lactose": DAIRY,
+    "ألبان": DAIRY,
+    "حليب": DAIRY,
+    "gluten": GLUTEN,
+    "wheat": WHEAT,
+    "غلوتين": GLUTEN,
+    "جلوتين": GLUTEN,
+    "قمح": WHEAT,
+    "egg": ["Eggs"],
+    "بيض": ["Eggs"],
+    "seafood": SEAFOOD,
+    "fish": ["Fish"],
+    "shellfish": ["Shrimp"],
+    "shrimp": ["Shrimp"],
+    "سمك": ["Fish"],
+    "روبيان": ["Shrimp"],
+    "بحرية": SEAFOOD,
+    "meat": MEATS,
+    "red meat": ["Beef", "Lamb"],
+    "لحوم": MEATS,
+    "لحم": MEATS,
+    "vegetarian": MEATS + SEAFOOD,
+    "نباتي": MEATS + SEAFOOD,
+    "vegan": MEATS + SEAFOOD + DAIRY + ["Eggs", "Honey"],
+    "نباتي صرف": MEATS + SEAFOOD + DAIRY + ["Eggs", "Honey"],
+    "legume": LEGUMES,
+    "pulse": LEGUMES,
+    "بقوليات": LEGUMES,
+    "bean": ["Fava Beans"],
+    "citrus": CITRUS,
+    "حمضيات": CITRUS,
+    "lemon": ["Lemon", "Dried Lemon"],
+    "rice": ["Rice (Basmati)", "Brown Rice"],
+    "أرز": ["Rice (Basmati)", "Brown Rice"],
+    # Nothing in the ingredient list contains these
+    "pork": [],
+    "halal": [],
+    "خنزير": [],
+    "حلال": [],
+}
+
+# Words a restriction may hold besides what it rules out ("severe peanut allergy")
+RESTRICTION_WORDS = {
+    "allergy", "allergies", "allergic", "intolerance", "intolerant", "sensitivity", "sensitive",
+    "free", "no", "non", "not", "avoid", "avoids", "without", "diet", "products", "product",
+    "food", "foods", "severe", "mild", "strict", "to", "and", "or", "of", "any", "all", "the", "a", "an",
+    "حساسية", "تحسس", "يتحسس", "من", "بدون", "لا", "عدم", "خالي", "خال", "نظام", "غذائي",
+    "حمية", "منتجات", "أي", "و", "ال", "وال", "بال", "لل",
+}
+
+
+class UnsupportedRestriction(ValueError):
+    """A dietary restriction the composer cannot map onto ingredients"""
+
+
+# ============================================
+# TEMPLATE LIBRARY
+#
+# Each slot lists interchangeable ingredients as (name, amount for
+# COMPOSED_SERVINGS). "fill" says what happens when the family did not
+# select any of them:
+#   required - use the first allowed option; no allowed option rules the template out
+#   default  - use the first allowed option; skip the slot if none is allowed
+#   selected - only ever use what the family selected
+# "pick" is how many selected options the slot may take.
+# Steps are (en, ar, role): a step whose role was skipped is left out.
+# {role} in names and steps becomes the slot's ingredient names.
+# ============================================
+
+MEAL_TEMPLATES = [
+    # ---------- Breakfast ----------
+    {
+        "key": "foul",
+        "meal_types": ["breakfast", "lunch"],
+        "cuisines": ["arabic"],
+        "name_en": "Foul Medames with {veg}",
+        "name_ar": "فول مدمس مع {veg}",
+        "prep_minutes": 10, "cook_minutes": 15,
+        "slots": [
+            {"role": "beans", "fill": "required", "options": [("Fava Beans", "400 g"), ("Chickpeas", "400 g")]},
+            {"role": "veg", "fill": "required", "pick": 2,
+             "options": [("Tomato", "200 g"), ("Cucumber", "150 g"), ("Parsley", "20 g"), ("Onion", "60 g")]},
+            {"role": "bread", "fill": "default", "options": [("Bread (Khubz)", "4 pieces")]},
+        ],
+        "pantry": [("Olive Oil", "2 tbsp"), ("Lemon", "1 piece"), ("Garlic", "2 cloves"), ("Cumin", "1 tsp"), ("Salt", "1/2 tsp")],
+        "steps": [
+            ("Say Bismillah and warm the {beans} in a pan with a splash of water", "قل بسم الله وسخّن {beans} في قدر مع قليل من الماء", None),
+            ("Mash half of the {beans} with crushed garlic, cumin, lemon juice and a pinch of salt", "اهرس نصف {beans} مع الثوم المهروس والكمون وعصير الليمون ورشة ملح", None),
+            ("Dice the {veg} into small, child-friendly pieces", "قطّع {veg} قطعاً صغيرة مناسبة للأطفال", None),
+            ("Spoon the beans into a bowl, top with the {veg} and drizzle with olive oil", "ضع الفول في طبق وزيّنه بـ{veg} ورشة زيت زيتون", None),
+            ("Serve warm with {bread} for scooping", "قدّمه دافئاً مع {bread}", "bread"),
+        ],
+    },
+    {
+        "key": "shakshuka",
+        "meal_types": ["breakfast", "dinner"],
+        "cuisines": ["arabic", "international"],
+        "name_en": "Shakshuka with {veg}",
+        "name_ar": "شكشوكة مع {veg}",
+        "prep_minutes": 10, "cook_minutes": 20,
+        "slots": [
+            {"role": "eggs", "fill": "required", "options": [("Eggs", "6 pieces")]},
+            {"role": "veg", "fill": "required", "pick": 2,
+             "options": [("Tomato", "400 g"), ("Bell Pepper", "150 g"), ("Spinach", "100 g"), ("Zucchini", "150 g")]},
+            {"role": "bread", "fill": "default", "options": [("Bread (Khubz)", "4 pieces")]},
+        ],
+        "pantry": [("Onion", "1 piece"), ("Olive Oil", "2 tbsp"), ("Cumin", "1 tsp"), ("Salt", "1/2 tsp")],
+        "steps": [
+            ("Say Bismillah and soften the chopped onion in olive oil", "قل بسم الله وقلّب البصل المفروم في زيت الزيتون حتى يذبل", None),
+            ("Add the chopped {veg} and cumin and cook for 10 minutes until saucy", "أضف {veg} المقطع والكمون واطبخ 10 دقائق حتى يصبح صلصة", None),
+            ("Make small wells and crack in the {eggs}", "اصنع حفراً صغيرة واكسر فيها {eggs}", None),
+            ("Cover and cook until the eggs are fully set (no runny yolks for little ones)", "غطِّ القدر واطبخ حتى ينضج البيض تماماً (بدون صفار سائل للصغار)", None),
+            ("Serve with warm {bread}", "قدّمها مع {bread} الدافئ", "bread"),
+        ],
+    },
+    {
+        "key": "porridge",
+        "meal_types": ["breakfast"],
+        "cuisines": ["arabic", "international"],
+        "name_en": "{fruit} Oat Porridge",
+        "name_ar": "عصيدة الشوفان مع {fruit}",
+        "prep_minutes": 5, "cook_minutes": 10,
+        "slots": [
+            {"role": "oats", "fill": "required", "options": [("Oats", "160 g")]},
+            {"role": "liquid", "fill": "required", "options": [("Milk", "600 ml"), ("Water", "600 ml")]},
+            {"role": "fruit", "fill": "required", "pick": 2,
+             "options": [("Banana", "2 pieces"), ("Apple", "1 piece"), ("Dates", "6 pieces"), ("Mango", "1 piece"), ("Strawberries", "150 g")]},
+        ],
+        "pantry": [("Cinnamon", "1/2 tsp")],
+        "steps": [
+            ("Say Bismillah and bring the {liquid} to a gentle simmer", "قل بسم الله وسخّن {liquid} على نار هادئة", None),
+            ("Stir in the {oats} and cook for 5 minutes, stirring often", "أضف {oats} واطبخ 5 دقائق مع التحريك", None),
+            ("Chop the {fruit} into small pieces", "قطّع {fruit} قطعاً صغيرة", None),
+            ("Serve topped with the {fruit} and a pinch of cinnamon", "قدّمها مزينة بـ{fruit} ورشة قرفة", None),
+        ],
+    },
+    {
+        "key": "omelette",
+        "meal_types": ["breakfast", "dinner"],
+        "cuisines": ["international"],
+        "name_en": "{veg} Omelette",
+        "name_ar": "أومليت {veg}",
+        "prep_minutes": 10, "cook_minutes": 10,
+        "slots": [
+            {"role": "eggs", "fill": "required", "options": [("Eggs", "6 pieces")]},
+            {"role": "veg", "fill": "required", "pick": 2,
+             "options": [("Spinach", "100 g"), ("Tomato", "150 g"), ("Bell Pepper", "120 g"), ("Zucchini", "120 g"), ("Onion", "60 g")]},
+            {"role": "cheese", "fill": "selected", "options": [("Cheese (White)", "60 g")]},
+        ],
+        "pantry": [("Olive Oil", "1 tbsp"), ("Black Pepper", "1/4 tsp"), ("Salt", "1/4 tsp")],
+        "steps": [
+            ("Say Bismillah and whisk the {eggs} with a pinch of salt and pepper", "قل بسم الله واخفق {eggs} مع رشة ملح وفلفل", None),
+            ("Finely chop the {veg} and cook in olive oil for 3 minutes", "افرم {veg} ناعماً وقلّبه في زيت الزيتون 3 دقائق", None),
+            ("Pour in the eggs and cook gently until set", "أضف البيض واطبخه على نار هادئة حتى يتماسك", None),
+            ("Sprinkle over the crumbled {cheese}", "وزّع {cheese} المفتتة على الوجه", "cheese"),
+            ("Fold, cut into wedges and serve", "اطوِ الأومليت وقطّعه مثلثات وقدّمه", None),
+        ],
+    },
+    {
+        "key": "labneh_plate",
+        "meal_types": ["breakfast", "snack"],
+        "cuisines": ["arabic"],
+        "name_en": "Labneh Plate with {veg}",
+        "name_ar": "صحن لبنة مع {veg}",
+        "prep_minutes": 10, "cook_minutes": 0,
+        "slots": [
+            {"role": "labneh", "fill": "required", "options": [("Labneh", "200 g")]},
+            {"role": "veg", "fill": "required", "pick": 2,
+             "options": [("Cucumber", "150 g"), ("Tomato", "150 g"), ("Carrot", "100 g"), ("Bell Pepper", "100 g")]},
+            {"role": "herb", "fill": "default", "options": [("Mint", "10 g"), ("Parsley", "10 g")]},
+            {"role": "bread", "fill": "default", "options": [("Bread (Khubz)", "4 pieces")]},
+        ],
+        "pantry": [("Olive Oil", "1 tbsp")],
+        "steps": [
+            ("Say Bismillah and spread the {labneh} on a plate", "قل بسم الله وافرد {labneh} في طبق", None),
+            ("Drizzle with olive oil and scatter chopped {herb}", "رش عليها زيت الزيتون و{herb} المفروم", "herb"),
+            ("Cut the {veg} into sticks for dipping", "قطّع {veg} أصابع للغمس", None),
+            ("Serve with warm {bread}", "قدّمها مع {bread} الدافئ", "bread"),
+        ],
+    },
+
+    # ---------- Lunch & dinner ----------
+    {
+        "key": "machboos",
+        "meal_types": ["lunch", "dinner"],
+        "cuisines": ["arabic"],
+        "name_en": "{protein} Machboos",
+        "name_ar": "مجبوس {protein}",
+        "prep_minutes": 20, "cook_minutes": 45,
+        "slots": [
+            {"role": "protein", "fill": "required",
+             "options": [("Chicken", "600 g"), ("Lamb", "500 g"), ("Beef", "500 g"), ("Fish", "600 g"), ("Shrimp", "500 g"), ("Chickpeas", "400 g")]},
+            {"role": "grain", "fill": "required", "options": [("Rice (Basmati)", "300 g"), ("Brown Rice", "300 g")]},
+            {"role": "veg", "fill": "required", "pick": 2, "options": [("Tomato", "200 g"), ("Carrot", "150 g"), ("Potato", "200 g")]},
+        ],
+        "pantry": [("Onion", "1 piece"), ("Dried Lemon", "2 pieces"), ("Turmeric", "1 tsp"), ("Cardamom", "3 pieces"),
+                   ("Cinnamon", "1 piece"), ("Vegetable Oil", "2 tbsp"), ("Salt", "1 tsp"), ("Water", "750 ml")],
+        "steps": [
+            ("Say Bismillah and wash the {grain}, then soak it for 20 minutes", "قل بسم الله واغسل {grain} وانقعه 20 دقيقة", None),
+            ("Brown the chopped onion in oil with turmeric, cardamom, cinnamon and the pierced dried lemons", "حمّر البصل المفروم في الزيت مع الكركم والهيل والقرفة واللومي المثقوب", None),
+            ("Add the {protein} and cook for 5 minutes, then add the {veg} and the water", "أضف {protein} وقلّبه 5 دقائق ثم أضف {veg} والماء", None),
+            ("Simmer until the {protein} is cooked through, then lift it out", "اترك القدر يغلي على نار هادئة حتى ينضج {protein} ثم ارفعه", None),
+            ("Cook the drained {grain} in the broth, covered, for 20 minutes", "اطبخ {grain} المصفّى في المرق مغطى لمدة 20 دقيقة", None),
+            ("Serve the rice on a large family platter topped with the {protein}", "قدّم الأرز في صينية عائلية كبيرة وفوقه {protein}", None),
+        ],
+    },
+    {
+        "key": "salona",
+        "meal_types": ["lunch", "dinner"],
+        "cuisines": ["arabic"],
+        "name_en": "{protein} Salona with {veg}",
+        "name_ar": "صالونة {protein} مع {veg}",
+        "prep_minutes": 15, "cook_minutes": 40,
+        "slots": [
+            {"role": "protein", "fill": "required",
+             "options": [("Chicken", "500 g"), ("Fish", "500 g"), ("Lamb", "450 g"), ("Beef", "450 g"), ("Chickpeas", "400 g"), ("Lentils", "200 g")]},
+            {"role": "veg", "fill": "required", "pick": 3,
+             "options": [("Potato", "250 g"), ("Carrot", "150 g"), ("Zucchini", "200 g"), ("Eggplant", "200 g"), ("Sweet Potato", "200 g"), ("Tomato", "200 g")]},
+            {"role": "side", "fill": "default", "options": [("Rice (Basmati)", "250 g"), ("Brown Rice", "250 g"), ("Bread (Khubz)", "4 pieces")]},
+        ],
+        "pantry": [("Onion", "1 piece"), ("Garlic", "3 cloves"), ("Tomato Paste", "2 tbsp"), ("Turmeric", "1 tsp"),
+                   ("Cumin", "1 tsp"), ("Dried Lemon", "1 piece"), ("Vegetable Oil", "2 tbsp"), ("Salt", "1 tsp"), ("Water", "600 ml")],
+        "steps": [
+            ("Say Bismillah and fry the chopped onion and garlic in oil until golden", "قل بسم الله واقلِ البصل والثوم المفرومين في الزيت حتى يذهبا", None),
+            ("Stir in the tomato paste, turmeric and cumin for one minute", "أضف معجون الطماطم والكركم والكمون وقلّب دقيقة", None),
+            ("Add the {protein} and coat it well in the spices", "أضف {protein} وقلّبه جيداً مع البهارات", None),
+            ("Add the cubed {veg}, the dried lemon and the water", "أضف {veg} المقطع مكعبات واللومي والماء", None),
+            ("Cover and simmer for 30 minutes until everything is tender", "غطِّ القدر واتركه 30 دقيقة على نار هادئة حتى ينضج كل شيء", None),
+            ("Serve hot with {side}", "قدّمها ساخنة مع {side}", "side"),
+        ],
+    },
+    {
+        "key": "adas",
+        "meal_types": ["lunch", "dinner"],
+        "cuisines": ["arabic"],
+        "name_en": "Lentil Soup with {veg}",
+        "name_ar": "شوربة عدس مع {veg}",
+        "prep_minutes": 10, "cook_minutes": 30,
+        "slots": [
+            {"role": "lentils", "fill": "required", "options": [("Lentils", "250 g")]},
+            {"role": "veg", "fill": "required", "pick": 2, "options": [("Carrot", "150 g"), ("Potato", "200 g"), ("Sweet Potato", "200 g"), ("Zucchini", "150 g")]},
+            {"role": "bread", "fill": "default", "options": [("Bread (Khubz)", "4 pieces")]},
+        ],
+        "pantry": [("Onion", "1 piece"), ("Garlic", "2 cloves"), ("Cumin", "1 tsp"), ("Olive Oil", "2 tbsp"),
+                   ("Lemon", "1 piece"), ("Salt", "1/2 tsp"), ("Water", "1200 ml")],
+        "steps": [
+            ("Say Bismillah and soften the chopped onion and garlic in olive oil", "قل بسم الله وقلّب البصل والثوم المفرومين في زيت الزيتون حتى يذبلا", None),
+            ("Add the rinsed {lentils}, the diced {veg}, cumin and water", "أضف {lentils} المغسول و{veg} المقطع والكمون والماء", None),
+            ("Simmer for 25 minutes until the lentils are soft", "اتركها تغلي 25 دقيقة على نار هادئة حتى ينضج العدس", None),
+            ("Blend until smooth and season with lemon juice and a little salt", "اخلطها حتى تصبح ناعمة وتبّلها بعصير الليمون وقليل من الملح", None),
+            ("Serve with toasted {bread}", "قدّمها مع {bread} المحمص", "bread"),
+        ],
+    },
+    {
+        "key": "mujaddara",
+        "meal_types": ["lunch", "dinner"],
+        "cuisines": ["arabic"],
+        "name_en": "Mujaddara with {topping}",
+        "name_ar": "مجدرة مع {topping}",
+        "prep_minutes": 10, "cook_minutes": 35,
+        "slots": [
+            {"role": "lentils", "fill": "required", "options": [("Lentils", "200 g")]},
+            {"role": "grain", "fill": "required", "options": [("Rice (Basmati)", "200 g"), ("Bulgur", "200 g"), ("Brown Rice", "200 g")]},
+            {"role": "topping", "fill": "required", "options": [("Yogurt (Laban)", "400 g"), ("Cucumber", "200 g"), ("Tomato", "200 g")]},
+        ],
+        "pantry": [("Onion", "2 pieces"), ("Cumin", "1 tsp"), ("Olive Oil", "3 tbsp"), ("Salt", "1 tsp"), ("Water", "900 ml")],
+        "steps": [
+            ("Say Bismillah and slowly cook the sliced onions in olive oil until deep golden", "قل بسم الله واطبخ البصل الشرائح ببطء في زيت الزيتون حتى يصبح ذهبياً غامقاً", None),
+            ("Boil the {lentils} in the water for 15 minutes", "اسلق {lentils} في الماء 15 دقيقة", None),
+            ("Add the {grain}, cumin, salt and half of the onions, cover and cook for 15 minutes", "أضف {grain} والكمون والملح ونصف البصل وغطِّ القدر واطبخ 15 دقيقة", None),
+            ("Serve topped with the remaining onions and {topping} on the side", "قدّمها مع باقي البصل على الوجه و{topping} جانباً", None),
+        ],
+    },
+    {
+        "key": "pasta",
+        "meal_types": ["lunch", "dinner"],
+        "cuisines": ["international"],
+        "name_en": "{protein} Pasta with {veg}",
+        "name_ar": "معكرونة {protein} مع {veg}",
+        "prep_minutes": 10, "cook_minutes": 20,
+        "slots": [
+            {"role": "pasta", "fill": "required", "options": [("Pasta", "350 g")]},
+            {"role": "protein", "fill": "required",
+             "options": [("Chicken", "400 g"), ("Beef", "400 g"), ("Shrimp", "350 g"), ("Chickpeas", "300 g"), ("Lentils", "150 g")]},
+            {"role": "veg", "fill": "required", "pick": 2,
+             "options": [("Tomato", "400 g"), ("Zucchini", "150 g"), ("Spinach", "100 g"), ("Bell Pepper", "150 g"), ("Carrot", "100 g")]},
+            {"role": "cheese", "fill": "selected", "options": [("Cheese (White)", "60 g")]},
+        ],
+        "pantry": [("Garlic", "2 cloves"), ("Olive Oil", "2 tbsp"), ("Salt", "1/2 tsp"), ("Black Pepper", "1/4 tsp")],
+        "steps": [
+            ("Say Bismillah and cook the {pasta} in salted water until tender", "قل بسم الله واسلق {pasta} في ماء مملح حتى تنضج", None),
+            ("Cook the {protein} in olive oil with the garlic until done", "اطبخ {protein} في زيت الزيتون مع الثوم حتى ينضج", None),
+            ("Add the chopped {veg} and cook for 8 minutes into a light sauce", "أضف {veg} المقطع واطبخه 8 دقائق حتى يصبح صلصة خفيفة", None),
+            ("Toss the drained pasta through the sauce", "اخلط المعكرونة المصفاة مع الصلصة", None),
+            ("Serve sprinkled with {cheese}", "قدّمها مع رشة من {cheese}", "cheese"),
+        ],
+    },
+    {
+        "key": "rice_bowl",
+        "meal_types": ["lunch", "dinner"],
+        "cuisines": ["international"],
+        "name_en": "{protein} & {veg} Rice Bowl",
+        "name_ar": "طبق أرز مع {protein} و{veg}",
+        "prep_minutes": 15, "cook_minutes": 20,
+        "slots": [
+            {"role": "protein", "fill": "required", "options": [("Chicken", "450 g"), ("Beef", "400 g"), ("Shrimp", "400 g"), ("Eggs", "4 pieces"), ("Chickpeas", "400 g")]},
+            {"role": "grain", "fill": "required", "options": [("Rice (Basmati)", "300 g"), ("Brown Rice", "300 g"), ("Bulgur", "300 g")]},
+            {"role": "veg", "fill": "required", "pick": 3,
+             "options": [("Carrot", "150 g"), ("Bell Pepper", "150 g"), ("Zucchini", "150 g"), ("Spinach", "100 g"), ("Onion", "80 g")]},
+        ],
+        "pantry": [("Garlic", "2 cloves"), ("Vegetable Oil", "2 tbsp"), ("Salt", "1/2 tsp"), ("Water", "600 ml")],
+        "steps": [
+            ("Say Bismillah and cook the {grain} in the water until fluffy", "قل بسم الله واطبخ {grain} في الماء حتى ينضج", None),
+            ("Stir-fry the {protein} in a hot pan with oil and garlic", "قلّب {protein} في مقلاة ساخنة مع الزيت والثوم", None),
+            ("Add the thinly sliced {veg} and stir-fry for 4 minutes, keeping some crunch", "أضف {veg} المقطع شرائح رفيعة وقلّبه 4 دقائق مع الحفاظ على قرمشته", None),
+            ("Spoon over the rice in bowls and serve", "وزّع الخليط فوق الأرز في أطباق وقدّمه", None),
+        ],
+    },
+    {
+        "key": "tray_bake",
+        "meal_types": ["lunch", "dinner"],
+        "cuisines": ["international", "arabic"],
+        "name_en": "Baked {protein} with Roasted {veg}",
+        "name_ar": "{protein} بالفرن مع {veg} المشوي",
+        "prep_minutes": 15, "cook_minutes": 35,
+        "slots": [
+            {"role": "protein", "fill": "required", "options": [("Fish", "600 g"), ("Chicken", "600 g"), ("Chickpeas", "400 g")]},
+            {"role": "veg", "fill": "required", "pick": 3,
+             "options": [("Potato", "400 g"), ("Sweet Potato", "400 g"), ("Carrot", "200 g"), ("Zucchini", "200 g"), ("Bell Pepper", "150 g"), ("Eggplant", "250 g")]},
+        ],
+        "pantry": [("Lemon", "1 piece"), ("Garlic", "3 cloves"), ("Olive Oil", "3 tbsp"), ("Cumin", "1 tsp"),
+                   ("Black Pepper", "1/4 tsp"), ("Salt", "1/2 tsp")],
+        "steps": [
+            ("Say Bismillah and heat the oven to 200°C", "قل بسم الله وسخّن الفرن على 200 درجة", None),
+            ("Toss the chunked {veg} with olive oil, cumin and salt and roast for 15 minutes", "اخلط {veg} المقطع مع زيت الزيتون والكمون والملح واشوه 15 دقيقة", None),
+            ("Rub the {protein} with lemon, garlic and pepper", "تبّل {protein} بالليمون والثوم والفلفل", None),
+            ("Add the {protein} to the tray and bake for 20 minutes until cooked through", "أضف {protein} إلى الصينية واخبزه 20 دقيقة حتى ينضج تماماً", None),
+            ("Serve straight from the tray, family style", "قدّمه من الصينية مباشرة للعائلة", None),
+        ],
+    },
+
+    # ---------- Snacks ----------
+    {
+        "key": "hummus",
+        "meal_types": ["snack", "lunch"],
+        "cuisines": ["arabic", "international"],
+        "name_en": "Hummus with {veg} Sticks",
+        "name_ar": "حمص مع أصابع {veg}",
+        "prep_minutes": 15, "cook_minutes": 0,
+        "slots": [
+            {"role": "chickpeas", "fill": "required", "options": [("Chickpeas", "400 g")]},
+            {"role": "tahini", "fill": "default", "options": [("Tahini", "60 g")]},
+            {"role": "veg", "fill": "required", "pick": 2, "options": [("Carrot", "200 g"), ("Cucumber", "200 g"), ("Bell Pepper", "150 g")]},
+            {"role": "bread", "fill": "selected", "options": [("Bread (Khubz)", "2 pieces")]},
+        ],
+        "pantry": [("Lemon", "1 piece"), ("Garlic", "1 clove"), ("Olive Oil", "2 tbsp"), ("Salt", "1/4 tsp"), ("Cumin", "1/2 tsp")],
+        "steps": [
+            ("Say Bismillah and blend the {chickpeas} with lemon juice, garlic, cumin and a little water", "قل بسم الله واخلط {chickpeas} مع عصير الليمون والثوم والكمون وقليل من الماء", None),
+            ("Blend in the {tahini} until creamy", "أضف {tahini} واخلط حتى يصبح كريمياً", "tahini"),
+            ("Swirl into a bowl and drizzle with olive oil", "ضعه في طبق ورش عليه زيت الزيتون", None),
+            ("Cut the {veg} into sticks for dipping", "قطّع {veg} أصابع للغمس", None),
+            ("Add triangles of {bread} on the side", "أضف مثلثات {bread} جانباً", "bread"),
+        ],
+    },
+    {
+        "key": "yogurt_cup",
+        "meal_types": ["snack", "breakfast", "dessert"],
+        "cuisines": ["arabic", "international"],
+        "name_en": "{fruit} Yogurt Cups",
+        "name_ar": "أكواب لبن مع {fruit}",
+        "prep_minutes": 5, "cook_minutes": 0,
+        "slots": [
+            {"role": "yogurt", "fill": "required", "options": [("Yogurt (Laban)", "400 g"), ("Labneh", "300 g")]},
+            {"role": "fruit", "fill": "required", "pick": 2,
+             "options": [("Strawberries", "150 g"), ("Mango", "1 piece"), ("Banana", "2 pieces"), ("Pomegranate", "1 piece"), ("Apple", "1 piece")]},
+            {"role": "crunch", "fill": "selected", "options": [("Oats", "40 g"), ("Nuts (Mixed)", "30 g")]},
+        ],
+        "pantry": [("Cinnamon", "1/4 tsp")],
+        "steps": [
+            ("Say Bismillah and spoon the {yogurt} into small cups", "قل بسم الله ووزّع {yogurt} في أكواب صغيرة", None),
+            ("Chop the {fruit} and layer it on top", "قطّع {fruit} ورتّبه فوق اللبن", None),
+            ("Sprinkle with {crunch} (ground fine for under-4s)", "رش عليها {crunch} (مطحوناً ناعماً لمن هم دون 4 سنوات)", "crunch"),
+            ("Dust with a little cinnamon and serve chilled", "رش قليلاً من القرفة وقدّمها باردة", None),
+        ],
+    },
+    {
+        "key": "fruit_salad",
+        "meal_types": ["snack", "dessert", "breakfast"],
+        "cuisines": ["arabic", "international"],
+        "name_en": "{fruit} Fruit Salad",
+        "name_ar": "سلطة فواكه {fruit}",
+        "prep_minutes": 10, "cook_minutes": 0,
+        "slots": [
+            {"role": "fruit", "fill": "required", "pick": 4,
+             "options": [("Apple", "1 piece"), ("Banana", "2 pieces"), ("Orange", "2 pieces"), ("Mango", "1 piece"), ("Strawberries", "150 g"),
+                         ("Grapes", "150 g"), ("Watermelon", "300 g"), ("Pomegranate", "1 piece"), ("Dates", "6 pieces")]},
+            {"role": "herb", "fill": "default", "options": [("Mint", "5 g")]},
+        ],
+        "pantry": [("Lemon", "1/2 piece")],
+        "steps": [
+            ("Say Bismillah and wash all the fruit well", "قل بسم الله واغسل الفواكه جيداً", None),
+            ("Cut the {fruit} into bite-sized pieces (quarter grapes for under-4s)", "قطّع {fruit} قطعاً صغيرة (قطّع العنب أرباعاً لمن هم دون 4 سنوات)", None),
+            ("Toss with a squeeze of lemon juice", "اخلطها مع قليل من عصير الليمون", None),
+            ("Scatter with torn {herb} leaves and serve", "زيّنها بأوراق {herb} وقدّمها", "herb"),
+        ],
+    },
+
+    # ---------- Desserts ----------
+    {
+        "key": "date_bites",
+        "meal_types": ["dessert", "snack"],
+        "cuisines": ["arabic"],
+        "name_en": "Date & {binder} Energy Bites",
+        "name_ar": "كرات التمر و{binder}",
+        "prep_minutes": 15, "cook_minutes": 0,
+        "slots": [
+            {"role": "dates", "fill": "required", "options": [("Dates", "200 g")]},
+            {"role": "binder", "fill": "required", "options": [("Oats", "100 g"), ("Tahini", "60 g"), ("Nuts (Mixed)", "80 g")]},
+        ],
+        "pantry": [("Cinnamon", "1/2 tsp"), ("Cardamom", "2 pieces")],
+        "steps": [
+            ("Say Bismillah and pit the {dates}", "قل بسم الله وانزع نوى {dates}", None),
+            ("Blend the dates with the {binder}, cinnamon and ground cardamom into a soft dough", "اخلط التمر مع {binder} والقرفة والهيل المطحون حتى تتكون عجينة طرية", None),
+            ("Roll into small balls (press flat for toddlers)", "شكّلها كرات صغيرة (افردها للأطفال الصغار)", None),
+            ("Chill for 10 minutes before serving", "بردها 10 دقائق قبل التقديم", None),
+        ],
+    },
+    {
+        "key": "baked_fruit",
+        "meal_types": ["dessert", "snack"],
+        "cuisines": ["international", "arabic"],
+        "name_en": "Cinnamon Baked {fruit}",
+        "name_ar": "{fruit} بالقرفة في الفرن",
+        "prep_minutes": 10, "cook_minutes": 20,
+        "slots": [
+            {"role": "fruit", "fill": "required", "options": [("Apple", "4 pieces"), ("Banana", "4 pieces"), ("Mango", "2 pieces")]},
+            {"role": "topping", "fill": "default", "options": [("Yogurt (Laban)", "200 g"), ("Labneh", "150 g")]},
+            {"role": "crunch", "fill": "selected", "options": [("Oats", "40 g"), ("Nuts (Mixed)", "30 g")]},
+        ],
+        "pantry": [("Cinnamon", "1 tsp"), ("Butter", "20 g")],
+        "steps": [
+            ("Say Bismillah and heat the oven to 180°C", "قل بسم الله وسخّن الفرن على 180 درجة", None),
+            ("Slice the {fruit} into a baking dish and dot with butter and cinnamon", "قطّع {fruit} في صينية وأضف عليه الزبدة والقرفة", None),
+            ("Scatter over the {crunch}", "وزّع {crunch} على الوجه", "crunch"),
+            ("Bake for 20 minutes until soft and golden", "اخبزه 20 دقيقة حتى يطرى ويتحمر", None),
+            ("Serve warm with a spoon of {topping}", "قدّمه دافئاً مع ملعقة من {topping}", "topping"),
+        ],
+    },
+    {
+        "key": "muhallabia",
+        "meal_types": ["dessert"],
+        "cuisines": ["arabic"],
+        "name_en": "Muhallabia with {fruit}",
+        "name_ar": "مهلبية مع {fruit}",
+        "prep_minutes": 10, "cook_minutes": 15,
+        "slots": [
+            {"role": "milk", "fill": "required", "options": [("Milk", "600 ml")]},
+            {"role": "fruit", "fill": "required", "options": [("Pomegranate", "1 piece"), ("Strawberries", "150 g"), ("Mango", "1 piece")]},
+        ],
+        "pantry": [("Flour", "50 g"), ("Cardamom", "2 pieces"), ("Saffron", "1 pinch")],
+        "steps": [
+            ("Say Bismillah and whisk the flour into the cold {milk}", "قل بسم الله واخفق الطحين في {milk} البارد", None),
+            ("Add the cardamom and saffron and stir over medium heat until it thickens", "أضف الهيل والزعفران وحرّك على نار متوسطة حتى تتماسك", None),
+            ("Pour into small bowls and chill for one hour", "صبّها في أوعية صغيرة وبرّدها ساعة", None),
+            ("Top with the {fruit} before serving", "زيّنها بـ{fruit} قبل التقديم", None),
+        ],
+    },
+]
+
+# Used when nothing fits the meal type (e.g. every template is ruled out)
+FALLBACK_TEMPLATE_KEYS = ["fruit_salad", "machboos", "tray_bake"]
+
+
+# ============================================
+# INGREDIENT LOOKUP
+# ============================================
+
+def _build_catalog():
+    """name_en -> {name_en, name_ar, icon} for INGREDIENTS and PANTRY_ITEMS"""
+    catalog = {}
+    for category_data in INGREDIENTS.values():
+        for item in category_data["items"]:
+            catalog[item["name_en"]] = dict(item)
+    for name, item in PANTRY_ITEMS.items():
+        catalog[name] = {"name_en": name, **item}
+    return catalog
+
+
+CATALOG = _build_catalog()
+
+
+def _short_name(name):
+    """Display name without the parenthesised note ("Rice (Basmati)" -> "Rice")"""
+    return name.split(' (')[0]
+
+
+def _join(names, language):
+    """"A, B and C" / "أ، ب و ج" """
+    if language == 'ar':
+        return names[0] if len(names) == 1 else '، '.join(names[:-1]) + ' و' + names[-1]
+    return names[0] if len(names) == 1 else ', '.join(names[:-1]) + ' and ' + names[-1]
+
+
+def _singular(word):
+    """English singular of a plural word ("strawberries" -> "strawberry")"""
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _phrase_pattern(phrase):
+    """
+    Regex for a restriction phrase: whole words for English, its last word
+    singular or plural (so "eggplant" is not "egg"); substring for Arabic,
+    each word with or without "ال"
+    """
+    if not phrase.isascii():
+        return re.compile(r'\s+'.join('(?:ال)?' + re.escape(word) for word in phrase.split()))
+    *head, last = phrase.split()
+    stem = _singular(last)
+    forms = {last, stem, stem + 's', stem + 'es'}
+    if stem.endswith('y'):
+        forms.add(stem[:-1] + 'ies')
+    if last.endswith('ves'):
+        forms.add(last[:-3] + 'f')
+    words = [re.escape(word) for word in head] + ['(?:' + '|'.join(sorted(map(re.escape, forms), key=len, reverse=True)) + ')']
+    return re.compile(r'\b' + r'\s+'.join(words) + r'\b')
+
+
+def _build_restriction_patterns():
+    """(pattern, ingredient names) for RESTRICTED_INGREDIENTS and every catalog name, longest phrase first"""
+    phrases = {}
+    for word, names in RESTRICTED_INGREDIENTS.items():
+        phrases.setdefault(word.casefold(), set()).update(names)
+    for name, item in CATALOG.items():
+        for phrase in (name.casefold(), _short_name(name).casefold(), item["name_ar"]):
+            phrases.setdefault(phrase, set()).add(name)
+    return [(_phrase_pattern(phrase), names)
+            for phrase, names in sorted(phrases.items(), key=lambda entry: -len(entry[0]))]
+
+
+RESTRICTION_PATTERNS = _build_restriction_patterns()
+
+
+def restricted_ingredients(dietary_restrictions):
+    """
+    Ingredients ruled out by the family's dietary restrictions
+
+    Args:
+        dietary_restrictions: list of restriction strings (checkbox values
+            like "nuts", or free text like "peanut allergy")
+
+    Returns:
+        set of ingredient names (name_en)
+
+    Raises:
+        UnsupportedRestriction: if a restriction holds anything not understood
+    """
+    excluded = set()
+    unknown = []
+    for restriction in dietary_restrictions or []:
+        text = str(restriction).strip().casefold()
+        if not text:
+            continue
+        matched = False
+        for pattern, names in RESTRICTION_PATTERNS:
+            text, found = pattern.subn(' ', text)
+            if found:
+                excluded.update(names)
+                matched = True
+        if not matched or any(word not in RESTRICTION_WORDS for word in re.findall(r'\w+', text)):
+            unknown.append(str(restriction).strip())
+    if unknown:
+        raise UnsupportedRestriction(f"Cannot tell what these restrictions rule out: {', '.join(unknown)}")
+    return excluded
+
+
+def _selected_names(selected_ingredients):
+    """Map the family's selections (English or Arabic) onto catalog names"""
+    wanted = {str(name).strip().casefold() for name in selected_ingredients if name and str(name).strip()}
+    return {
+        name for name, item in CATALOG.items()
+        if name.casefold() in wanted or _short_name(name).casefold() in wanted or item["name_ar"] in wanted
+    }
+
+
+# ============================================
+# COMPOSER
+# ============================================
+
+def _fill_slots(template, selected, excluded):
+    """
+    Choose ingredients for each slot of a template
+
+    Returns:
+        (fills {role: [(name, amount)]}, number of selected ingredients used,
+        number of slots filled with something the family must buy),
+        or None if a required slot cannot be filled or the steps use a
+        ruled-out pantry item
+    """
+    if any(name in excluded for name, _ in template["pantry"]):
+        return None
+
+    fills = {}
+    used = 0
+    to_buy = 0
+    for slot in template["slots"]:
+        allowed = [option for option in slot["options"] if option[0] not in excluded]
+        chosen = [option for option in allowed if option[0] in selected][:slot.get("pick", 1)]
+        used += len(chosen)
+        if not chosen and slot["fill"] != "selected" and allowed:
+            chosen = allowed[:1]
+            to_buy += 1
+        if not chosen:
+            if slot["fill"] == "required":
+                return None
+            continue
+        fills[slot["role"]] = chosen
+    return fills, used, to_buy
+
+
+def _tiebreak(template_key, request_key):
+    """Stable pseudo-random order, so equal templates rotate across requests"""
+    return hashlib.sha256(f"{template_key}|{request_key}".encode('utf-8')).hexdigest()
+
+
+def choose_template(selected_ingredients, meal_type, cuisine_type, dietary_restrictions):
+    """
+    Pick the template that uses the most selected ingredients, then the
+    one with the shortest shopping list
+
+    Args:
+        selected_ingredients: list of ingredient names
+        meal_type: breakfast, lunch, dinner, snack, dessert
+        cuisine_type: arabic or international
+        dietary_restrictions: list of dietary restrictions
+
+    Returns:
+        (template, fills)
+
+    Raises:
+        ValueError: if no template fits the restrictions
+            (UnsupportedRestriction if one is not understood)
+    """
+    selected = _selected_names(selected_ingredients)
+    excluded = restricted_ingredients(dietary_restrictions)
+    request_key = '|'.join([meal_type or '', cuisine_type or ''] + sorted(selected))
+
+    def candidates(templates):
+        ranked = []
+        for template in templates:
+            filled = _fill_slots(template, selected, excluded)
+            if filled is not None:
+                fills, used, to_buy = filled
+                ranked.append((-used, to_buy, _tiebreak(template["key"], request_key), template, fills))
+        ranked.sort(key=lambda entry: entry[:3])
+        return ranked
+
+    for_meal = [template for template in MEAL_TEMPLATES if meal_type in template["meal_types"]]
+    ranked = (
+        candidates([template for template in for_meal if cuisine_type in template["cuisines"]])
+        or candidates(for_meal)
+        or candidates([template for template in MEAL_TEMPLATES if template["key"] in FALLBACK_TEMPLATE_KEYS])
+    )
+    if not ranked:
+        raise ValueError("No recipe template fits these dietary restrictions")
+
+    template, fills = ranked[0][3:]
+    return template, fills
+
+
+def compose_meal(selected_ingredients, meal_type, cuisine_type, child_profiles, dietary_restrictions, language='en'):
+    """
+    Build a meal from the template library (same arguments and result
+    shape as meal_generator.generate_meal, without any network call)
+
+    Args:
+        selected_ingredients: list of ingredient names
+        meal_type: breakfast, lunch, dinner, snack, dessert
+        cuisine_type: arabic or international
+        child_profiles: list of child profile dicts (unused; kept for the shared signature)
+        dietary_restrictions: list of dietary restrictions
+        language: 'en' or 'ar'
+
+    Returns:
+        dict with meal data (bilingual), with "source": "composer"
+
+    Raises:
+        ValueError: if no template fits the restrictions
+            (UnsupportedRestriction if one is not understood)
+    """
+    template, fills = choose_template(selected_ingredients, meal_type, cuisine_type, dietary_restrictions)
+
+    ingredients = []
+    for role_items in fills.values():
+        ingredients.extend(role_items)
+    ingredients.extend(template["pantry"])
+
+    names = {
+        language_key: {
+            role: _join([
+                _short_name(name) if language_key == 'en' else CATALOG[name]["name_ar"]
+                for name, _ in items
+            ], language_key)
+            for role, items in fills.items()
+        }
+        for language_key in ('en', 'ar')
+    }
+    names['en_lower'] = {role: text.lower() for role, text in names['en'].items()}
+
+    steps = [step for step in template["steps"] if step[2] is None or step[2] in fills]
+    instructions_en = '\n'.join(
+        f"Step {number}: {en.format(**names['en_lower'])}" for number, (en, _, _) in enumerate(steps, 1)
+    )
+    instructions_ar = '\n'.join(
+        f"الخطوة {number}: {ar.format(**names['ar'])}" for number, (_, ar, _) in enumerate(steps, 1)
+    )
+
+    return {
+        'name_en': template["name_en"].format(**names['en']),
+        'name_ar': template["name_ar"].format(**names['ar']),
+        'ingredients': [
+            {
+                'name_en': name,
+                'name_ar': CATALOG[name]["name_ar"],
+                'amount': amount,
+                'icon': CATALOG[name]["icon"],
+            }
+            for name, amount in ingredients
+        ],
+        'instructions_en': instructions_en,
+        'instructions_ar': instructions_ar,
+        'prep_time': f"{template['prep_minutes']} minutes",
+        'cook_time': f"{template['cook_minutes']} minutes",
+        'servings': COMPOSED_SERVINGS,
+        'source': 'composer',
+    }
+
+
+class MealComposer:
+    """
+    Offline meal composer settings and counters
+
+    `fallback` turns on composing a meal when AI generation fails or runs
+    past `budget_seconds`; quick ideas are always composed.
+    """
+
+    def __init__(self):
+        self.fallback = True
+        self.budget_seconds = None
+        self.quick = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Read the fallback settings from the app config
+
+        Args:
+            app: Flask application (MEAL_COMPOSER_FALLBACK, MEAL_LLM_BUDGET_SECONDS)
+        """
+        self.fallback = app.config.get('MEAL_COMPOSER_FALLBACK', True)
+        self.budget_seconds = app.config.get('MEAL_LLM_BUDGET_SECONDS') or None  # None: the LLM 'meal' deadline
+        app.extensions['meal_composer'] = self
+        print(f"🧩 Offline meal composer: fallback {'on' if self.fallback else 'off'}"
+              f"{f', AI budget {self.budget_seconds:g}s' if self.fallback and self.budget_seconds else ''}")
+
+    def compose(self, generation, reason='quick'):
+        """
+        Compose a meal for a generate_meal argument dict
+
+        Args:
+            generation: dict of generate_meal arguments
+            reason: 'quick' (asked for) or 'fallback' (AI failed)
+
+        Returns:
+            dict with meal data
+        """
+        meal_data = compose_meal(**generation)
+        with self._lock:
+            if reason == 'fallback':
+                self.fallbacks += 1
+            else:
+                self.quick += 1
+        print(f"🧩 Meal composed offline ({reason}): {meal_data['name_en']}")
+        return meal_data
+
+    def stats(self):
+        """
+        Composer counters
+
+        Returns:
+            dict with fallback setting, budget and counts
+        """
+        with self._lock:
+            return {
+                'fallback': self.fallback,
+                'budget_seconds': self.budget_seconds,
+                'quick': self.quick,
+                'fallbacks': self.fallbacks,
+                'templates': len(MEAL_TEMPLATES),
+            }
+
+
+# Shared composer (configured by init_app)
+meal_composer = MealComposer()
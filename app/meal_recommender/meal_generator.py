@@ -3,13 +3,34 @@ AI Meal Generator
 Handles all AI-related meal generation logic
 """
 
-import os
 import json
-from openai import OpenAI
-from app.meal_recommender.prompts import get_meal_generation_prompt
+from app.llm import llm
+from app.meal_recommender.prompts import get_meal_generation_prompt, get_meal_regeneration_prompt
+from app.meal_recommender.generation_cache import meal_cache
+from app.meal_recommender.meal_stream import PartialMealParser, meal_events
+from app.meal_recommender.single_flight import meal_flights
+from app.meal_recommender.meal_composer import meal_composer
 
 
-def generate_meal(selected_ingredients, meal_type, cuisine_type, child_profiles, dietary_restrictions, language='en'):
+# Backend and model used for meal generation
+MEAL_PROVIDER = 'openai'
+MEAL_MODEL = "openai/gpt-oss-20b:groq"
+
+# Backend and model used to modify a meal from parent feedback
+REGENERATE_PROVIDER = 'gemini'
+REGENERATE_MODEL = 'gemini-2.0-flash-exp'
+
+# Fields every generated meal must have (nutrition is computed locally,
+# see nutrition.py, so the model no longer writes it)
+REQUIRED_MEAL_FIELDS = [
+    'name_en', 'name_ar', 'ingredients', 
+    'instructions_en', 'instructions_ar',
+    'prep_time', 'cook_time'
+]
+
+
+def generate_meal(selected_ingredients, meal_type, cuisine_type, child_profiles, dietary_restrictions, language='en',
+                  deadline=None):
     """
     Generate meal using Gemini AI
     
@@ -20,6 +41,7 @@ def generate_meal(selected_ingredients, meal_type, cuisine_type, child_profiles,
         child_profiles: list of child profile dicts
         dietary_restrictions: list of dietary restrictions
         language: 'en' or 'ar'
+        deadline: Seconds the AI may take in total (None: the 'meal' deadline)
     
     Returns:
         dict with meal data (bilingual)
@@ -28,14 +50,8 @@ def generate_meal(selected_ingredients, meal_type, cuisine_type, child_profiles,
         Exception: if AI generation fails
     """
     
+    response = ''
     try:
-        # Initialize Gemini client
-        client = OpenAI(
-        base_url="https://router.huggingface.co/v1",
-        api_key=os.environ["HF_TOKEN"],
-    )
-
-        
         # Build the prompt using prompt template
         prompt = get_meal_generation_prompt(
             selected_ingredients=selected_ingredients,
@@ -52,33 +68,23 @@ def generate_meal(selected_ingredients, meal_type, cuisine_type, child_profiles,
         print(f"   - Ingredients: {len(selected_ingredients)}")
         print(f"   - Language: {language}")
         
-        # Call Gemini API
-        completion = client.chat.completions.create(
-        model="openai/gpt-oss-20b:groq",
-        messages=[
-            {
-            "role": "user",
-            "content": prompt
-            }
-        ]
-        )
-        response = completion.choices[0].message.content
+        # Call the shared LLM client (pooled connection, timeout, retries);
+        # with hedging configured, a slow or invalid answer is raced by the backup
+        response = llm.complete(
+            prompt=prompt,
+            provider=MEAL_PROVIDER,
+            model=MEAL_MODEL,
+            purpose='meal',
+            deadline=deadline,
+            hedge=True,
+            validate=check_meal_response
+        ).text
         
         # Parse response text into JSON
         meal_data = json.loads(response)
         
         # Validate response has required fields
-        required_fields = [
-            'name_en', 'name_ar', 'ingredients', 
-            'instructions_en', 'instructions_ar',
-            'prep_time', 'cook_time',
-            'nutritional_benefits_en', 'nutritional_benefits_ar',
-            'why_healthy_en', 'why_healthy_ar'
-        ]
-        
-        for field in required_fields:
-            if field not in meal_data:
-                raise ValueError(f"Missing required field: {field}")
+        check_required_fields(meal_data)
         
         print(f"✅ Meal generated successfully: {meal_data['name_en']}")
         
@@ -86,7 +92,7 @@ def generate_meal(selected_ingredients, meal_type, cuisine_type, child_profiles,
         
     except json.JSONDecodeError as e:
         print(f"❌ JSON Parse Error: {e}")
-        print(f"Response text: {response.text[:200]}...")
+        print(f"Response text: {response[:200]}...")
         raise Exception("Failed to parse AI response. Please try again.")
         
     except Exception as e:
@@ -94,6 +100,217 @@ def generate_meal(selected_ingredients, meal_type, cuisine_type, child_profiles,
         raise Exception(f"Failed to generate meal: {str(e)}")
 
 
+def stream_meal(selected_ingredients, meal_type, cuisine_type, child_profiles, dietary_restrictions, language='en',
+                deadline=None):
+    """
+    Generate meal with AI, yielding the raw response text as it arrives
+    (arguments as in generate_meal; parse with meal_stream.PartialMealParser)
+    
+    Yields:
+        str chunks of the JSON response
+    
+    Raises:
+        LLMError: if the stream fails
+    """
+    prompt = get_meal_generation_prompt(
+        selected_ingredients=selected_ingredients,
+        meal_type=meal_type,
+        cuisine_type=cuisine_type,
+        child_profiles=child_profiles,
+        dietary_restrictions=dietary_restrictions,
+        language=language
+    )
+    
+    print(f"🤖 Streaming meal with AI... ({meal_type}, {cuisine_type}, {len(selected_ingredients)} ingredients)")
+    
+    return llm.stream(prompt=prompt, provider=MEAL_PROVIDER, model=MEAL_MODEL, purpose='meal', deadline=deadline)
+
+
+def meal_generation_events(generation, cache_key, force_fresh=False):
+    """
+    Produce a meal as a sequence of progress events
+    Serves the cached meal when there is one; joins an identical generation
+    already in progress; otherwise streams from the model, validates the
+    result and caches it
+    
+    Args:
+        generation: dict of generate_meal arguments
+        cache_key: Fingerprint from meal_fingerprint
+        force_fresh: Skip the cache lookup
+    
+    Yields:
+        (event, field, value) tuples from PartialMealParser, then
+        ('meal', None, meal_data) with the complete meal
+    """
+    meal_data = meal_cache.lookup(cache_key, force_fresh)
+    if meal_data is not None:
+        print(f"⚡ Meal served from cache: {meal_data['name_en']}")
+        yield from meal_events(meal_data)
+        yield 'meal', None, meal_data
+        return
+    
+    flight, is_leader = meal_flights.join(cache_key)
+    if not is_leader:
+        print("🔗 Waiting on an identical meal generation in progress")
+        meal_data = flight.wait()
+        if meal_data is not None:
+            yield from meal_events(meal_data)
+            yield 'meal', None, meal_data
+            return
+        # The leader was abandoned: generate on our own
+        yield from meal_events_with_fallback(generation, cache_key)
+        return
+    
+    meal_data = error = None
+    try:
+        for event in meal_events_with_fallback(generation, cache_key):
+            if event[0] == 'meal':
+                meal_data = event[2]
+            yield event
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Also reached when the caller stops early; followers then retry themselves
+        meal_flights.finish(cache_key, flight, result=meal_data, error=error)
+
+
+def meal_events_with_fallback(generation, cache_key):
+    """
+    Generate a new meal with AI; if that fails or runs past the AI budget
+    (and the composer fallback is on), compose one offline instead
+    A composed meal is not cached, so the next request tries the AI again;
+    when no composed meal fits the restrictions the AI error is raised
+    
+    Yields:
+        Events as in meal_generation_events; ('reset', None, None) first
+        if a partly streamed AI meal is being replaced
+    """
+    if not meal_composer.fallback:
+        yield from stream_meal_events(generation, cache_key)
+        return
+    
+    streamed = False
+    try:
+        for event in stream_meal_events(generation, cache_key, meal_composer.budget_seconds):
+            streamed = True
+            yield event
+        return
+    except Exception as e:
+        print(f"⚠️ AI meal generation failed, composing offline: {e}")
+        error = e
+    
+    try:
+        meal_data = meal_composer.compose(generation, reason='fallback')
+    except ValueError as e:
+        # Restrictions the composer cannot honour: report the AI failure instead
+        print(f"⚠️ Cannot compose offline either: {e}")
+        raise error
+    if streamed:
+        yield 'reset', None, None
+    yield from meal_events(meal_data)
+    yield 'meal', None, meal_data
+
+
+def stream_meal_events(generation, cache_key, budget_seconds=None):
+    """
+    Stream a new meal from the model, then validate and cache it
+    With hedging configured the meal is generated whole (the hedge races
+    complete answers) and its events are sent once it is done
+    
+    Args:
+        generation: dict of generate_meal arguments
+        cache_key: Fingerprint from meal_fingerprint
+        budget_seconds: Give up once the model has taken this long
+                        (None: the LLM client's 'meal' deadline)
+    
+    Yields:
+        Events as in meal_generation_events
+    
+    Raises:
+        LLMError: if the model fails, its circuit is open or the budget runs out
+    """
+    if llm.can_hedge(MEAL_PROVIDER):
+        meal_data = generate_meal(**generation, deadline=budget_seconds)
+        meal_cache.put(cache_key, meal_data)
+        yield from meal_events(meal_data)
+        yield 'meal', None, meal_data
+        return
+    
+    parser = PartialMealParser()
+    for chunk in stream_meal(**generation, deadline=budget_seconds):
+        yield from parser.feed(chunk)
+    
+    meal_data = parser.result()
+    check_required_fields(meal_data)
+    meal_cache.put(cache_key, meal_data)
+    print(f"✅ Meal streamed successfully: {meal_data['name_en']}")
+    yield 'meal', None, meal_data
+
+
+def regenerate_meal_data(original_meal_data, feedback, language='en'):
+    """
+    Modify an existing meal according to parent feedback
+    
+    Args:
+        original_meal_data: dict with the meal's name_en and ingredients
+        feedback: What the parent wants changed
+        language: 'en' or 'ar'
+    
+    Returns:
+        dict with the updated meal data
+    """
+    prompt = get_meal_regeneration_prompt(
+        original_meal=original_meal_data,
+        feedback=feedback,
+        language=language
+    )
+    
+    response = llm.complete(
+        prompt=prompt,
+        provider=REGENERATE_PROVIDER,
+        model=REGENERATE_MODEL,
+        temperature=1.0,
+        json_mode=True,
+        purpose='regenerate',
+        hedge=True,
+        validate=check_json_response
+    )
+    
+    return json.loads(response.text)
+
+
+def check_meal_response(response):
+    """
+    Reject an LLM response that is not a complete meal (used to pick the
+    winner of a hedged call)
+    
+    Args:
+        response: LLMResponse
+    
+    Raises:
+        ValueError: if the text is not valid meal JSON
+    """
+    validate_meal_data(json.loads(response.text))
+
+
+def check_json_response(response):
+    """Reject an LLM response whose text is not JSON"""
+    json.loads(response.text)
+
+
+def check_required_fields(meal_data):
+    """
+    Check that a generated meal has every required field
+    
+    Raises:
+        ValueError: naming the first missing field
+    """
+    for field in REQUIRED_MEAL_FIELDS:
+        if field not in meal_data:
+            raise ValueError(f"Missing required field: {field}")
+
+
 def validate_meal_data(meal_data):
     """
     Validate that meal data has all required fields and correct format
@@ -116,11 +333,7 @@ def validate_meal_data(meal_data):
         'instructions_en': str,
         'instructions_ar': str,
         'prep_time': str,
-        'cook_time': str,
-        'nutritional_benefits_en': str,
-        'nutritional_benefits_ar': str,
-        'why_healthy_en': str,
-        'why_healthy_ar': str
+        'cook_time': str
     }
     
     for field, expected_type in required_fields.items():
@@ -0,0 +1,243 @@
+"""
+Streaming Meal Generation
+Incremental parser for the recipe JSON as the model writes it, and the
+Server-Sent Events encoding used by /meals/generate/stream
+"""
+
+import json
+import re
+
+
+# Top-level string fields sent while still being written (long, read-as-you-go)
+PARTIAL_FIELDS = ('instructions_en', 'instructions_ar')
+
+# Escape that cannot be decoded yet at the end of a partial string: a lone
+# backslash, a short \uXXXX, or a high surrogate still waiting for its pair
+_TRAILING_ESCAPE_RE = re.compile(r'\\(?:u[dD][89abAB][0-9a-fA-F]{2}|u[0-9a-fA-F]{0,3})?$')
+
+
+def _complete_prefix(raw):
+    """
+    Longest prefix of a partial JSON string body that decodes to whole characters
+
+    Args:
+        raw: Text between the opening quote and the end of the buffer
+
+    Returns:
+        str
+    """
+    while True:
+        match = _TRAILING_ESCAPE_RE.search(raw)
+        if match is None:
+            return raw
+        # After an odd run of backslashes this one is the second half of "\\"
+        backslashes = len(raw[:match.start()]) - len(raw[:match.start()].rstrip('\\'))
+        if backslashes % 2:
+            return raw
+        raw = raw[:match.start()]
+
+
+class PartialMealParser:
+    """
+    Incremental parser for one top-level JSON object
+
+    feed() takes text chunks in any split and returns events as soon as
+    they can be known:
+        ('field', key, value)   a top-level value is complete
+        ('item', key, value)    one element of a top-level array is complete
+        ('partial', key, text)  a PARTIAL_FIELDS string so far
+
+    Text before the opening brace (e.g. a ```json fence) is skipped.
+    Scanning is linear in the response size; nothing is re-parsed.
+    """
+
+    def __init__(self, partial_fields=PARTIAL_FIELDS):
+        self.partial_fields = partial_fields
+        self.buffer = ''
+        self.start = None        # index of the opening brace
+        self.end = None          # index of the closing brace
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = 'key'     # at depth 1: key, colon, value, comma
+        self._key = None
+        self._token_start = None  # start of the key string being read
+        self._value_start = None
+        self._value_kind = None  # 'string', 'array', 'object' or 'primitive'
+        self._item_start = None
+        self._item_kind = None
+        self._partial_sent = None
+
+    @property
+    def complete(self):
+        return self.end is not None
+
+    def feed(self, chunk):
+        """
+        Add text and return the events it completes
+
+        Args:
+            chunk: Next piece of the model output
+
+        Returns:
+            list of (event, key, value) tuples
+        """
+        self.buffer += chunk
+        events = []
+        buffer = self.buffer
+
+        while self._pos < len(buffer) and self.end is None:
+            i = self._pos
+            ch = buffer[i]
+            self._pos += 1
+
+            if self.start is None:
+                if ch == '{':
+                    self.start = i
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._string_closed(i, events)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect == 'key':
+                        self._token_start = i
+                    elif self._expect == 'value':
+                        self._begin_value(i, 'string')
+                elif self._depth == 2 and self._value_kind == 'array' and self._item_start is None:
+                    self._item_start, self._item_kind = i, 'string'
+            elif ch in '{[':
+                if self._depth == 1 and self._expect == 'value':
+                    self._begin_value(i, 'array' if ch == '[' else 'object')
+                elif self._depth == 2 and self._value_kind == 'array' and self._item_start is None:
+                    self._item_start, self._item_kind = i, 'container'
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth == 2 and self._item_kind == 'primitive':
+                    self._emit_item(buffer[self._item_start:i], events)
+                if self._depth == 1 and self._value_kind == 'primitive':
+                    self._emit_value(buffer[self._value_start:i], events)
+                self._depth -= 1
+                if self._depth == 2 and self._item_kind == 'container':
+                    self._emit_item(buffer[self._item_start:i + 1], events)
+                elif self._depth == 1 and self._value_kind in ('array', 'object'):
+                    self._emit_value(buffer[self._value_start:i + 1], events)
+                elif self._depth == 0:
+                    self.end = i
+            elif ch == ',':
+                if self._depth == 1:
+                    if self._value_kind == 'primitive':
+                        self._emit_value(buffer[self._value_start:i], events)
+                    self._expect = 'key'
+                elif self._depth == 2 and self._item_kind == 'primitive':
+                    self._emit_item(buffer[self._item_start:i], events)
+            elif ch == ':':
+                if self._depth == 1:
+                    self._expect = 'value'
+            elif not ch.isspace():
+                if self._depth == 1 and self._expect == 'value':
+                    self._begin_value(i, 'primitive')
+                elif self._depth == 2 and self._value_kind == 'array' and self._item_start is None:
+                    self._item_start, self._item_kind = i, 'primitive'
+
+        self._send_partial(events)
+        return events
+
+    def result(self):
+        """
+        The whole parsed object once the closing brace has arrived
+
+        Returns:
+            dict
+
+        Raises:
+            ValueError: if the response was cut off or is not valid JSON
+        """
+        if self.end is None:
+            raise ValueError("Response ended before the recipe was complete")
+        return json.loads(self.buffer[self.start:self.end + 1])
+
+    # ============================================
+    # INTERNALS
+    # ============================================
+
+    def _begin_value(self, index, kind):
+        self._value_start, self._value_kind = index, kind
+        self._expect = 'comma'
+        self._partial_sent = None
+
+    def _string_closed(self, index, events):
+        if self._depth == 1 and self._token_start is not None and self._value_start is None:
+            self._key = json.loads(self.buffer[self._token_start:index + 1])
+            self._token_start = None
+            self._expect = 'colon'
+        elif self._depth == 1 and self._value_kind == 'string':
+            self._emit_value(self.buffer[self._value_start:index + 1], events)
+        elif self._depth == 2 and self._item_kind == 'string':
+            self._emit_item(self.buffer[self._item_start:index + 1], events)
+
+    def _emit_value(self, raw, events):
+        events.append(('field', self._key, json.loads(raw)))
+        self._value_start = self._value_kind = None
+
+    def _emit_item(self, raw, events):
+        events.append(('item', self._key, json.loads(raw)))
+        self._item_start = self._item_kind = None
+
+    def _send_partial(self, events):
+        """Report the growing text of a PARTIAL_FIELDS string"""
+        if not (self._in_string and self._depth == 1 and self._value_kind == 'string'
+                and self._key in self.partial_fields):
+            return
+
+        raw = _complete_prefix(self.buffer[self._value_start + 1:])
+        try:
+            text = json.loads(f'"{raw}"')
+        except ValueError:
+            return
+        if text and text != self._partial_sent:
+            self._partial_sent = text
+            events.append(('partial', self._key, text))
+
+
+def meal_events(meal_data):
+    """
+    Replay a finished meal as the events PartialMealParser would have produced
+    (used when the meal comes from the generation cache)
+
+    Args:
+        meal_data: dict with meal information
+
+    Yields:
+        (event, key, value) tuples
+    """
+    for key, value in meal_data.items():
+        if isinstance(value, list):
+            for item in value:
+                yield 'item', key, item
+        yield 'field', key, value
+
+
+def sse_event(event, data):
+    """
+    Encode one Server-Sent Event
+
+    Args:
+        event: Event name
+        data: JSON-serializable payload
+
+    Returns:
+        str ready to write to the response
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
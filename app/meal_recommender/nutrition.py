@@ -0,0 +1,569 @@
+"""
+Meal Nutrition Calculator
+Local per-100 g nutrient table for every ingredient in INGREDIENTS, and a
+NumPy calculator that turns a recipe's ingredient list into per-serving
+totals plus child-age-appropriate flags (no LLM call involved)
+"""
+
+import re
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+from app.meal_recommender.constants import INGREDIENTS
+
+
+# ============================================
+# NUTRIENT TABLE (per 100 g, as bought: raw meat/veg, dry grains and pulses)
+# Values rounded from USDA FoodData Central
+# ============================================
+
+NUTRIENTS = ('energy_kcal', 'protein_g', 'fibre_g', 'sugar_g', 'sodium_mg')
+
+NUTRITION_PER_100G = {
+    # Proteins
+    "Chicken": (143, 19.6, 0.0, 0.0, 70),
+    "Beef": (215, 18.6, 0.0, 0.0, 66),
+    "Lamb": (282, 16.6, 0.0, 0.0, 59),
+    "Fish": (96, 20.0, 0.0, 0.0, 60),
+    "Shrimp": (85, 20.1, 0.0, 0.0, 119),
+    "Eggs": (143, 12.6, 0.0, 0.4, 142),
+    "Lentils": (352, 24.6, 10.7, 2.0, 6),
+    "Chickpeas": (378, 20.5, 12.2, 10.7, 24),
+    "Fava Beans": (341, 26.1, 25.0, 5.7, 13),
+    # Grains & carbs
+    "Rice (Basmati)": (365, 7.1, 1.3, 0.1, 5),
+    "Brown Rice": (367, 7.5, 3.6, 0.8, 4),
+    "Bread (Khubz)": (275, 9.1, 2.2, 1.3, 536),
+    "Oats": (379, 13.2, 10.1, 1.0, 6),
+    "Pasta": (371, 13.0, 3.2, 2.7, 6),
+    "Bulgur": (342, 12.3, 18.3, 0.4, 17),
+    "Vermicelli": (371, 13.0, 3.2, 2.7, 6),
+    # Vegetables
+    "Tomato": (18, 0.9, 1.2, 2.6, 5),
+    "Cucumber": (15, 0.7, 0.5, 1.7, 2),
+    "Onion": (40, 1.1, 1.7, 4.2, 4),
+    "Garlic": (149, 6.4, 2.1, 1.0, 17),
+    "Potato": (77, 2.0, 2.2, 0.8, 6),
+    "Sweet Potato": (86, 1.6, 3.0, 4.2, 55),
+    "Carrot": (41, 0.9, 2.8, 4.7, 69),
+    "Zucchini": (17, 1.2, 1.0, 2.5, 8),
+    "Eggplant": (25, 1.0, 3.0, 3.5, 2),
+    "Bell Pepper": (31, 1.0, 2.1, 4.2, 4),
+    "Spinach": (23, 2.9, 2.2, 0.4, 79),
+    "Lettuce": (15, 1.4, 1.3, 0.8, 28),
+    "Parsley": (36, 3.0, 3.3, 0.9, 56),
+    "Mint": (44, 3.3, 6.8, 0.0, 30),
+    "Coriander": (23, 2.1, 2.8, 0.9, 46),
+    # Fruits
+    "Dates": (277, 1.8, 6.7, 66.5, 1),
+    "Banana": (89, 1.1, 2.6, 12.2, 1),
+    "Apple": (52, 0.3, 2.4, 10.4, 1),
+    "Orange": (47, 0.9, 2.4, 9.4, 0),
+    "Mango": (60, 0.8, 1.6, 13.7, 1),
+    "Strawberries": (32, 0.7, 2.0, 4.9, 1),
+    "Grapes": (69, 0.7, 0.9, 15.5, 2),
+    "Watermelon": (30, 0.6, 0.4, 6.2, 1),
+    "Pomegranate": (83, 1.7, 4.0, 13.7, 3),
+    "Lemon": (29, 1.1, 2.8, 2.5, 2),
+    # Dairy
+    "Milk": (61, 3.2, 0.0, 5.1, 43),
+    "Yogurt (Laban)": (61, 3.5, 0.0, 4.7, 46),
+    "Cheese (White)": (264, 14.2, 0.0, 4.1, 917),
+    "Labneh": (160, 6.5, 0.0, 3.6, 370),
+    "Butter": (717, 0.9, 0.0, 0.1, 643),
+    # Spices & seasonings
+    "Olive Oil": (884, 0.0, 0.0, 0.0, 2),
+    "Vegetable Oil": (884, 0.0, 0.0, 0.0, 0),
+    "Salt": (0, 0.0, 0.0, 0.0, 38758),
+    "Black Pepper": (251, 10.4, 25.3, 0.6, 20),
+    "Cumin": (375, 17.8, 10.5, 2.3, 168),
+    "Turmeric": (312, 9.7, 22.7, 3.2, 27),
+    "Cinnamon": (247, 4.0, 53.1, 2.2, 10),
+    "Cardamom": (311, 10.8, 28.0, 0.0, 18),
+    "Bay Leaves": (313, 7.6, 26.3, 0.0, 23),
+    "Dried Lemon": (290, 6.0, 20.0, 15.0, 20),
+    # Others
+    "Honey": (304, 0.3, 0.2, 82.1, 4),
+    "Tahini": (595, 17.0, 9.3, 0.5, 115),
+    "Tomato Paste": (82, 4.3, 4.1, 12.2, 59),
+    "Nuts (Mixed)": (594, 17.3, 9.0, 4.6, 12),
+}
+
+# Pantry items recipes often add that are not selectable ingredients
+PANTRY_PER_100G = {
+    "Water": (0, 0.0, 0.0, 0.0, 0),
+    "Sugar": (387, 0.0, 0.0, 100.0, 1),
+    "Flour": (364, 10.3, 2.7, 0.3, 2),
+    "Ghee": (900, 0.3, 0.0, 0.0, 2),
+    "Chicken Stock": (6, 0.6, 0.0, 0.3, 343),
+    "Saffron": (310, 11.4, 3.9, 0.0, 148),
+}
+
+# Other names the model uses for the same ingredient (matched as whole words)
+ALIASES = {
+    "Chicken": ["chicken breast", "chicken thigh"],
+    "Beef": ["minced beef", "ground beef"],
+    "Lamb": ["mutton"],
+    "Fish": ["hammour", "salmon", "fish fillet", "cod", "tuna"],
+    "Shrimp": ["prawn"],
+    "Eggs": ["egg", "egg yolk", "egg white"],
+    "Lentils": ["lentil"],
+    "Chickpeas": ["chickpea", "garbanzo"],
+    "Fava Beans": ["fava", "foul", "ful medames", "broad bean"],
+    "Rice (Basmati)": ["rice", "basmati", "basmati rice", "white rice"],
+    "Bread (Khubz)": ["bread", "khubz", "pita", "flatbread", "arabic bread"],
+    "Oats": ["oat", "rolled oats", "oatmeal"],
+    "Pasta": ["spaghetti", "penne", "macaroni", "noodle"],
+    "Vermicelli": ["sheriya"],
+    "Tomato": ["cherry tomato"],
+    "Onion": ["spring onion", "green onion", "shallot"],
+    "Garlic": ["garlic clove"],
+    "Bell Pepper": ["capsicum", "red pepper", "green pepper", "yellow pepper"],
+    "Eggplant": ["aubergine"],
+    "Zucchini": ["courgette", "kousa"],
+    "Coriander": ["cilantro"],
+    "Strawberries": ["strawberry"],
+    "Grapes": ["grape", "raisin"],
+    "Dates": ["date", "date paste"],
+    "Yogurt (Laban)": ["yogurt", "yoghurt", "laban", "greek yogurt"],
+    "Cheese (White)": ["cheese", "feta", "akkawi", "halloumi", "white cheese"],
+    "Lemon": ["lemon juice", "lime", "lime juice"],
+    "Dried Lemon": ["loomi", "dried lime", "black lime"],
+    "Vegetable Oil": ["oil", "sunflower oil", "canola oil", "cooking oil"],
+    "Bay Leaves": ["bay leaf"],
+    "Cardamom": ["cardamom pod"],
+    "Cinnamon": ["cinnamon stick"],
+    "Tomato Paste": ["tomato puree"],
+    "Nuts (Mixed)": ["nut", "almond", "walnut", "cashew", "pistachio"],
+    "Sugar": ["brown sugar", "caster sugar"],
+    "Flour": ["all purpose flour", "wheat flour", "plain flour"],
+    "Chicken Stock": ["stock", "broth", "chicken broth", "vegetable stock"],
+}
+
+# Ingredients whose sugar counts as added (free) sugar
+ADDED_SUGAR = {"Honey", "Sugar"}
+
+# Whole-food choking hazards for under-4s (serve chopped or ground)
+CHOKING_HAZARDS = {"Nuts (Mixed)", "Grapes"}
+
+
+# ============================================
+# PORTION SIZES
+# ============================================
+
+# Grams per unit; volume units are converted with the ingredient's density
+MASS_UNITS = {
+    'g': 1, 'gm': 1, 'gram': 1, 'kg': 1000, 'kilogram': 1000,
+    'oz': 28.35, 'ounce': 28.35, 'lb': 453.6, 'pound': 453.6,
+}
+VOLUME_UNITS_ML = {
+    'ml': 1, 'milliliter': 1, 'millilitre': 1, 'l': 1000, 'liter': 1000, 'litre': 1000,
+    'cup': 240, 'tbsp': 15, 'tablespoon': 15, 'tsp': 5, 'teaspoon': 5,
+}
+# Fixed weights (g) regardless of ingredient
+FIXED_UNITS = {'pinch': 0.4, 'dash': 0.4, 'handful': 30, 'bunch': 50, 'can': 400, 'tin': 400, 'sprig': 1}
+# Multipliers on the ingredient's piece weight
+PIECE_UNITS = {
+    'piece': 1, 'pc': 1, 'whole': 1, 'medium': 1, 'large': 1.3, 'small': 0.7,
+    'clove': 1, 'fillet': 1, 'breast': 1, 'thigh': 1, 'slice': 0.5, 'stick': 1,
+    'leaf': 1, 'pod': 1, 'head': 1,
+}
+
+# Density (g per ml) for volume amounts; anything unlisted counts as water
+DENSITY_G_PER_ML = {
+    "Rice (Basmati)": 0.78, "Brown Rice": 0.78, "Bulgur": 0.6, "Oats": 0.34, "Pasta": 0.45,
+    "Vermicelli": 0.45, "Lentils": 0.8, "Chickpeas": 0.83, "Fava Beans": 0.8, "Flour": 0.53,
+    "Sugar": 0.85, "Salt": 1.2, "Honey": 1.42, "Olive Oil": 0.92, "Vegetable Oil": 0.92,
+    "Ghee": 0.91, "Butter": 0.96, "Tahini": 1.0, "Tomato Paste": 1.1, "Nuts (Mixed)": 0.6,
+    "Cheese (White)": 0.63, "Labneh": 1.05, "Yogurt (Laban)": 1.03, "Spinach": 0.13,
+    "Lettuce": 0.2, "Parsley": 0.25, "Mint": 0.2, "Coriander": 0.2, "Strawberries": 0.6,
+    "Grapes": 0.64, "Dates": 0.62, "Black Pepper": 0.46, "Cumin": 0.42, "Turmeric": 0.6,
+    "Cinnamon": 0.52, "Cardamom": 0.4, "Saffron": 0.1,
+}
+
+# Weight (g) of one piece; counts without a unit ("2 tomatoes") use this
+PIECE_GRAMS = {
+    "Chicken": 170, "Fish": 150, "Shrimp": 12, "Eggs": 50, "Bread (Khubz)": 60,
+    "Tomato": 120, "Cucumber": 120, "Onion": 110, "Garlic": 5, "Potato": 170,
+    "Sweet Potato": 130, "Carrot": 60, "Zucchini": 200, "Eggplant": 450, "Bell Pepper": 120,
+    "Lettuce": 300, "Dates": 8, "Banana": 118, "Apple": 180, "Orange": 130, "Mango": 200,
+    "Strawberries": 12, "Grapes": 5, "Watermelon": 280, "Pomegranate": 280, "Lemon": 60,
+    "Bay Leaves": 0.2, "Cardamom": 0.2, "Cinnamon": 3, "Dried Lemon": 5, "Parsley": 50,
+    "Mint": 30, "Coriander": 30, "Spinach": 30, "Beef": 150, "Lamb": 150,
+}
+DEFAULT_PIECE_GRAMS = 100
+
+# "to taste", "as needed": a small seasoning amount for the whole recipe
+TO_TASTE_GRAMS = 1.5
+
+# Recipe yield when the model does not say
+DEFAULT_SERVINGS = 4
+
+
+# ============================================
+# CHILD REFERENCE INTAKES (per day, by DRI age band)
+# energy and protein: EER/RDA; fibre: AI; sodium: CDRR; added sugar: 10% of energy
+# ============================================
+
+AGE_BANDS = (
+    # (band, max_age_years, energy_kcal, protein_g, fibre_g, sodium_mg, added_sugar_g)
+    ('0-1', 0, 700, 11, None, 370, 0),
+    ('1-3', 3, 1000, 13, 19, 1200, 25),
+    ('4-8', 8, 1400, 19, 25, 1500, 35),
+    ('9-13', 200, 1800, 34, 28, 1800, 45),
+)
+
+# Share of the day's intake each meal type should provide
+MEAL_SHARE = {'breakfast': 0.25, 'lunch': 0.35, 'dinner': 0.30, 'snack': 0.10, 'dessert': 0.10}
+DEFAULT_MEAL_SHARE = 0.30
+
+FLAG_MESSAGES = {
+    'good_protein': {
+        'level': 'positive',
+        'en': "Good source of protein for ages {band}",
+        'ar': "مصدر جيد للبروتين لعمر {band}",
+    },
+    'good_fibre': {
+        'level': 'positive',
+        'en': "Good source of fibre for ages {band}",
+        'ar': "مصدر جيد للألياف لعمر {band}",
+    },
+    'high_sodium': {
+        'level': 'warning',
+        'en': "High in salt for ages {band} - use less salt or stock",
+        'ar': "نسبة الملح عالية لعمر {band} - قلل الملح أو المرق",
+    },
+    'high_added_sugar': {
+        'level': 'warning',
+        'en': "High in added sugar for ages {band}",
+        'ar': "نسبة السكر المضاف عالية لعمر {band}",
+    },
+    'added_sugar_under_2': {
+        'level': 'warning',
+        'en': "Contains added sugar - not recommended under 2 years",
+        'ar': "يحتوي على سكر مضاف - لا يُنصح به لمن هم دون السنتين",
+    },
+    'honey_under_1': {
+        'level': 'danger',
+        'en': "Contains honey - never give honey to babies under 1 year",
+        'ar': "يحتوي على عسل - لا تقدم العسل للرضع دون السنة",
+    },
+    'choking_risk': {
+        'level': 'warning',
+        'en': "Chop grapes and grind nuts for children under 4 (choking risk)",
+        'ar': "قطّع العنب واطحن المكسرات للأطفال دون 4 سنوات (خطر الاختناق)",
+    },
+}
+
+
+# ============================================
+# TABLE AND MATCHING
+# ============================================
+
+FOOD_NAMES = list(NUTRITION_PER_100G) + list(PANTRY_PER_100G)
+FOOD_INDEX = {name: index for index, name in enumerate(FOOD_NAMES)}
+
+# (foods x NUTRIENTS) matrix, per gram
+NUTRIENT_MATRIX = np.array(
+    [NUTRITION_PER_100G.get(name) or PANTRY_PER_100G[name] for name in FOOD_NAMES],
+    dtype=float
+) / 100.0
+
+ADDED_SUGAR_MASK = np.array([name in ADDED_SUGAR for name in FOOD_NAMES])
+CHOKING_MASK = np.array([name in CHOKING_HAZARDS for name in FOOD_NAMES])
+HONEY_INDEX = FOOD_INDEX["Honey"]
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _words(text):
+    """Lower-case words, with simple plurals made singular"""
+    words = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word.endswith('oes') or word.endswith('ches'):
+            word = word[:-2]
+        elif word.endswith('ies') and len(word) > 4:
+            word = word[:-3] + 'y'
+        elif word.endswith('s') and not word.endswith('ss') and len(word) > 3:
+            word = word[:-1]
+        words.append(word)
+    return tuple(words)
+
+
+def _build_match_keys():
+    """(words, food name) pairs, longest first, so 'sweet potato' wins over 'potato'"""
+    keys = []
+    for name in FOOD_NAMES:
+        keys.append((_words(name), name))
+        keys.append((_words(re.sub(r"\(.*?\)", "", name)), name))
+        for alias in ALIASES.get(name, []):
+            keys.append((_words(alias), name))
+    keys = [(words, name) for words, name in keys if words]
+    return sorted(set(keys), key=lambda key: (-len(key[0]), key))
+
+
+MATCH_KEYS = _build_match_keys()
+
+# Arabic names from the ingredient catalog, longest first
+ARABIC_NAMES = sorted(
+    ((item["name_ar"], item["name_en"]) for category in INGREDIENTS.values() for item in category["items"]),
+    key=lambda pair: -len(pair[0])
+)
+
+
+@lru_cache(maxsize=4096)
+def match_food(name_en, name_ar=''):
+    """
+    Find the table entry for a recipe ingredient name
+
+    Args:
+        name_en: English ingredient name as written by the model
+        name_ar: Arabic name (used when the English one does not match)
+
+    Returns:
+        Food name (key of NUTRITION_PER_100G / PANTRY_PER_100G), or None
+    """
+    words = _words(name_en or '')
+    for key, food in MATCH_KEYS:
+        size = len(key)
+        if any(words[i:i + size] == key for i in range(len(words) - size + 1)):
+            return food
+
+    for arabic, food in ARABIC_NAMES:
+        if arabic and name_ar and arabic in name_ar:
+            return food
+    return None
+
+
+# ============================================
+# AMOUNTS
+# ============================================
+
+_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+_QUANTITY_RE = re.compile(
+    r"(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*(\d+/\d+|\d+(?:\.\d+)?))?"
+)
+
+
+def _number(text):
+    return float(sum(Fraction(part) for part in text.split()))
+
+
+def parse_amount(amount, food):
+    """
+    Convert an amount string to grams
+
+    Handles "200g", "1 1/2 cups", "½ tsp", "2-3 medium", "3 cloves",
+    "a pinch" and "to taste".
+
+    Args:
+        amount: Amount as written by the model
+        food: Matched food name (for density and piece weight)
+
+    Returns:
+        (grams, estimated): estimated is True when the amount had to be guessed
+    """
+    text = str(amount or '').lower()
+    for symbol, fraction in _FRACTIONS.items():
+        text = text.replace(symbol, f" {fraction}")
+
+    match = _QUANTITY_RE.search(text)
+    if match:
+        quantity = _number(match.group(1))
+        if match.group(2):
+            quantity = (quantity + _number(match.group(2))) / 2
+        rest = text[match.end():]
+    else:
+        quantity = 1.0
+        rest = text
+
+    piece = PIECE_GRAMS.get(food, DEFAULT_PIECE_GRAMS)
+    for word in _words(rest)[:2]:
+        if word in MASS_UNITS:
+            return quantity * MASS_UNITS[word], False
+        if word in VOLUME_UNITS_ML:
+            return quantity * VOLUME_UNITS_ML[word] * DENSITY_G_PER_ML.get(food, 1.0), False
+        if word in FIXED_UNITS:
+            return quantity * FIXED_UNITS[word], False
+        if word in PIECE_UNITS:
+            return quantity * PIECE_UNITS[word] * piece, False
+
+    if 'taste' in text or 'need' in text:
+        return TO_TASTE_GRAMS, True
+    if match:
+        return quantity * piece, False  # plain count, e.g. "2"
+    return piece, True
+
+
+def parse_servings(value):
+    """
+    Recipe yield from the model's "servings" value (4, "4", "4-6 servings")
+
+    Returns:
+        int, DEFAULT_SERVINGS when missing or unreadable
+    """
+    match = _QUANTITY_RE.search(str(value or ''))
+    if not match:
+        return DEFAULT_SERVINGS
+    return max(int(round(_number(match.group(1)))), 1)
+
+
+# ============================================
+# CALCULATOR
+# ============================================
+
+def age_band(age):
+    """
+    DRI age band row for a child's age in years
+
+    Returns:
+        tuple from AGE_BANDS
+    """
+    age = 4 if age is None else age
+    for row in AGE_BANDS:
+        # Bands run up to the next birthday: 3.5 is still '1-3'
+        if age < row[1] + 1:
+            return row
+    return AGE_BANDS[-1]
+
+
+def calculate_nutrition_batch(meals):
+    """
+    Nutrition for many recipes at once
+
+    Ingredient amounts are parsed per ingredient, then one (meals x foods)
+    gram matrix times the (foods x nutrients) table gives every total.
+
+    Args:
+        meals: list of dicts with
+            ingredients: list of {"name_en", "name_ar", "amount"}
+            meal_type: breakfast, lunch, dinner, snack, dessert
+            child_ages: list of ages in years (flags are per age band)
+            servings: recipe yield (default DEFAULT_SERVINGS)
+
+    Returns:
+        list of dicts (see calculate_meal_nutrition)
+    """
+    grams = np.zeros((len(meals), len(FOOD_NAMES)))
+    details = []
+
+    for row, meal in enumerate(meals):
+        unmatched, estimated, matched = [], [], 0
+        for ingredient in meal.get('ingredients') or []:
+            if not isinstance(ingredient, dict):
+                ingredient = {'name_en': str(ingredient)}
+            food = match_food(ingredient.get('name_en', ''), ingredient.get('name_ar', ''))
+            if food is None:
+                unmatched.append(ingredient.get('name_en', ''))
+                continue
+            amount_grams, guessed = parse_amount(ingredient.get('amount'), food)
+            grams[row, FOOD_INDEX[food]] += amount_grams
+            matched += 1
+            if guessed:
+                estimated.append(ingredient.get('name_en', ''))
+        total = matched + len(unmatched)
+        details.append((unmatched, estimated, matched / total if total else 0.0))
+
+    servings = np.array([parse_servings(meal.get('servings')) for meal in meals], dtype=float)
+    per_serving = (grams @ NUTRIENT_MATRIX) / servings[:, None]
+    added_sugar = (grams[:, ADDED_SUGAR_MASK] @ NUTRIENT_MATRIX[ADDED_SUGAR_MASK, NUTRIENTS.index('sugar_g')]) / servings
+    has_choking_hazard = (grams[:, CHOKING_MASK] > 0).any(axis=1)
+    has_honey = grams[:, HONEY_INDEX] > 0
+
+    results = []
+    for row, meal in enumerate(meals):
+        values = dict(zip(NUTRIENTS, (round(float(value), 1) for value in per_serving[row])))
+        unmatched, estimated, coverage = details[row]
+        results.append({
+            'servings': int(servings[row]),
+            'per_serving': values,
+            'added_sugar_g': round(float(added_sugar[row]), 1),
+            'coverage': round(coverage, 2),
+            'unmatched': unmatched,
+            'estimated': estimated,
+            'flags': _flags(
+                values,
+                float(added_sugar[row]),
+                bool(has_honey[row]),
+                bool(has_choking_hazard[row]),
+                MEAL_SHARE.get(meal.get('meal_type'), DEFAULT_MEAL_SHARE),
+                meal.get('child_ages') or [None]
+            ),
+        })
+    return results
+
+
+def calculate_meal_nutrition(ingredients, meal_type, child_ages=None, servings=None):
+    """
+    Per-serving nutrition and child flags for one recipe
+
+    Args:
+        ingredients: list of {"name_en", "name_ar", "amount"}
+        meal_type: breakfast, lunch, dinner, snack, dessert
+        child_ages: list of children's ages in years
+        servings: recipe yield (default DEFAULT_SERVINGS)
+
+    Returns:
+        dict with servings, per_serving (NUTRIENTS), added_sugar_g, coverage
+        (share of ingredients found in the table), unmatched and estimated
+        ingredient names, and flags [{code, level, age_band}]
+    """
+    return calculate_nutrition_batch([{
+        'ingredients': ingredients,
+        'meal_type': meal_type,
+        'child_ages': child_ages,
+        'servings': servings,
+    }])[0]
+
+
+def _flags(values, added_sugar, has_honey, has_choking_hazard, share, child_ages):
+    """Flags for each distinct age band among the children"""
+    flags = []
+    seen = set()
+
+    def add(code, band):
+        if (code, band) not in seen:
+            seen.add((code, band))
+            flags.append({'code': code, 'level': FLAG_MESSAGES[code]['level'], 'age_band': band})
+
+    for age in child_ages:
+        band, _, _, protein, fibre, sodium, sugar_limit = age_band(age)
+        if values['protein_g'] >= share * protein:
+            add('good_protein', band)
+        if fibre and values['fibre_g'] >= share * fibre:
+            add('good_fibre', band)
+        if values['sodium_mg'] > share * sodium:
+            add('high_sodium', band)
+        if age is not None and age < 2 and added_sugar > 0:
+            add('added_sugar_under_2', band)
+        elif sugar_limit and added_sugar > share * sugar_limit:
+            add('high_added_sugar', band)
+        if has_honey and age is not None and age < 1:
+            add('honey_under_1', band)
+        if has_choking_hazard and age is not None and age < 4:
+            add('choking_risk', band)
+    return flags
+
+
+def describe_flags(flags, language='en'):
+    """
+    Parent-facing text for nutrition flags
+
+    Args:
+        flags: list of flag dicts from calculate_meal_nutrition
+        language: 'en' or 'ar'
+
+    Returns:
+        list of {"level", "text"}
+    """
+    language = 'ar' if language == 'ar' else 'en'
+    return [
+        {
+            'level': flag['level'],
+            'text': FLAG_MESSAGES[flag['code']][language].format(band=flag.get('age_band', '')),
+        }
+        for flag in flags
+        if flag.get('code') in FLAG_MESSAGES
+    ]
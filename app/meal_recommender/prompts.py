@@ -141,8 +141,8 @@ RECIPE REQUIREMENTS:
 - Une the true known recipe name 
 - Clear, simple steps
 - Realistic prep and cook times
-- Explain nutritional benefits in parent-friendly language
-- Explain why this is specifically healthy for children
+- Give every amount in grams or ml where possible (nutrition is calculated from them)
+- Say how many servings the recipe makes
 
 OUTPUT FORMAT (STRICT JSON):
 {{
@@ -152,7 +152,7 @@ OUTPUT FORMAT (STRICT JSON):
         {{
             "name_en": "ingredient name",
             "name_ar": "اسم المكون",
-            "amount": "quantity with unit (e.g., 2 cups, 100g)",
+            "amount": "quantity in g or ml where possible (e.g., 200g, 250ml, 2 pieces)",
             "icon": "relevant emoji"
         }}
     ],
@@ -160,10 +160,7 @@ OUTPUT FORMAT (STRICT JSON):
     "instructions_ar": "الخطوة 1: قل بسم الله و[التعليمات]\\nالخطوة 2: [التعليمات]\\nالخطوة 3: [التعليمات]\\n...",
     "prep_time": "X minutes",
     "cook_time": "Y minutes",
-    "nutritional_benefits_en": "Brief explanation of key nutrients and health benefits (2-3 sentences)",
-    "nutritional_benefits_ar": "شرح موجز للعناصر الغذائية الرئيسية والفوائد الصحية (2-3 جمل)",
-    "why_healthy_en": "Parent-friendly explanation of why this meal is specifically good for children's growth and development (2-3 sentences)",
-    "why_healthy_ar": "شرح للوالدين عن سبب فائدة هذه الوجبة لنمو الأطفال وتطورهم (2-3 جمل)"
+    "servings": 4
 }}
 
 IMPORTANT:
@@ -3,10 +3,22 @@ Meal Recommender Routes
 Handles meal recommendation and generation
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from db.models import db, User, FamilyProfile, Child, Meal
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, session, jsonify, stream_with_context
+from db.models import db, User, FamilyProfile, Child, Meal, MealJob
 from app.meal_recommender.constants import INGREDIENTS, MEAL_TYPES
-from app.meal_recommender.meal_generator import generate_meal, extract_ingredients
+from app.meal_recommender.meal_generator import (
+    meal_generation_events, regenerate_meal_data, extract_ingredients, MEAL_PROVIDER, REGENERATE_PROVIDER
+)
+from app.meal_recommender.meal_stream import sse_event
+from app.meal_recommender.generation_cache import meal_cache, meal_fingerprint
+from app.meal_recommender.jobs import meal_jobs, QueueFull
+from app.meal_recommender.nutrition import calculate_meal_nutrition, describe_flags
+from app.meal_recommender.single_flight import meal_flights
+from app.meal_recommender.meal_composer import meal_composer
+from app.llm import llm, usage_tags
+import hashlib
+import json
+import uuid
 
 # Create blueprint
 meals_bp = Blueprint(
@@ -57,7 +69,8 @@ def meals_home():
         ingredients=INGREDIENTS,
         meal_types=MEAL_TYPES,
         children=children,
-        family_profile=family_profile
+        family_profile=family_profile,
+        idempotency_key=uuid.uuid4().hex  # one per page view, so a double submit is one job
     )
 
 
@@ -65,8 +78,9 @@ def meals_home():
 @login_required
 def generate_meal_route(): 
     """
-    Generate meal using Gemini AI
-    Takes selected ingredients, meal type, and generates recipe
+    Generate meal using AI (form post, works without JavaScript)
+    Queues a generation job and redirects to its waiting page;
+    a quick idea is composed offline and shown at once
     """
     user_id = session.get('user_id')
     family_profile = FamilyProfile.query.filter_by(user_id=user_id).first()
@@ -76,73 +90,239 @@ def generate_meal_route():
         return redirect(url_for('profile.setup'))
     
     # Get form data
-    selected_ingredients = request.form.getlist('ingredients')
-    custom_ingredient = request.form.get('custom_ingredient', '').strip()
-    meal_type = request.form.get('meal_type')
-    cuisine_type = request.form.get('cuisine_type', 'arabic')  # NEW: Get cuisine type
-    language = request.form.get('language', 'en')
+    all_selected, meal_type, cuisine_type, language, force_fresh = read_meal_form()
     
     # Validation
-    if not selected_ingredients and not custom_ingredient:
-        if language == 'ar':
-            flash('الرجاء اختيار مكون واحد على الأقل', 'error')
-        else:
-            flash('Please select at least one ingredient', 'error')
+    error = validate_meal_form(all_selected, meal_type, language)
+    if error:
+        flash(error, 'error')
         return redirect(url_for('meals.meals_home', lang=language))
     
-    if not meal_type:
-        if language == 'ar':
-            flash('الرجاء اختيار نوع الوجبة', 'error')
-        else:
-            flash('Please select a meal type', 'error')
+    if request.form.get('quick') == '1':
+        try:
+            meal = save_quick_meal(family_profile, all_selected, meal_type, cuisine_type, language)
+        except ValueError as e:
+            print(f"❌ Quick meal failed: {e}")
+            flash(quick_failed_message(language), 'error')
+            return redirect(url_for('meals.meals_home', lang=language))
+        return redirect(url_for('meals.view_meal', meal_id=meal.id, lang=language))
+    
+    if not can_generate_with_ai():
+        flash(ai_unavailable_message(language), 'error')
         return redirect(url_for('meals.meals_home', lang=language))
     
-    # Combine ingredients
-    all_selected = selected_ingredients.copy()
-    if custom_ingredient:
-        # Split by comma if multiple custom ingredients
-        custom_list = [ing.strip() for ing in custom_ingredient.split(',') if ing.strip()]
-        all_selected.extend(custom_list)
+    try:
+        job = submit_generation_job(family_profile, all_selected, meal_type, cuisine_type, language, force_fresh)
+    except QueueFull as e:
+        print(f"⏳ Meal queue full: {e}")
+        flash(busy_message(language), 'error')
+        return redirect(url_for('meals.meals_home', lang=language))
     
-    # Build child profiles for AI
-    child_profiles = build_child_profiles(family_profile)
-    all_dietary_restrictions = get_all_dietary_restrictions(family_profile)
+    return redirect(url_for('meals.job_wait', job_id=job.id))
+
+
+@meals_bp.route('/jobs', methods=['POST'])
+@login_required
+def create_generation_job():
+    """
+    API endpoint to queue a meal generation
+    Takes the same form as /generate; poll status_url for progress.
+    With quick=1 the meal is composed offline and saved right away (201)
+    """
+    user_id = session.get('user_id')
+    family_profile = FamilyProfile.query.filter_by(user_id=user_id).first()
+    
+    if not family_profile:
+        return jsonify({'success': False, 'error': 'Please complete your family profile first'}), 400
+    
+    all_selected, meal_type, cuisine_type, language, force_fresh = read_meal_form()
+    error = validate_meal_form(all_selected, meal_type, language)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    if request.form.get('quick') == '1':
+        try:
+            meal = save_quick_meal(family_profile, all_selected, meal_type, cuisine_type, language)
+        except ValueError as e:
+            print(f"❌ Quick meal failed: {e}")
+            return jsonify({'success': False, 'error': quick_failed_message(language)}), 422
+        return jsonify({
+            'success': True,
+            'meal_id': meal.id,
+            'url': url_for('meals.view_meal', meal_id=meal.id, lang=language)
+        }), 201
+    
+    if not can_generate_with_ai():
+        return jsonify({'success': False, 'error': ai_unavailable_message(language)}), 503
     
-    # Generate meal with AI
     try:
-        meal_data = generate_meal(
-            selected_ingredients=all_selected,
-            meal_type=meal_type,
-            cuisine_type=cuisine_type,  # NEW: Pass cuisine type
-            child_profiles=child_profiles,
-            dietary_restrictions=all_dietary_restrictions,
-            language=language
-        )
-        
-        # Save meal to database
-        meal = save_meal_to_database(
-            family_profile=family_profile,
-            meal_data=meal_data,
-            meal_type=meal_type,
-            selected_ingredients=all_selected
-        )
-        
-        # Success message
+        job = submit_generation_job(family_profile, all_selected, meal_type, cuisine_type, language, force_fresh)
+    except QueueFull as e:
+        print(f"⏳ Meal queue full: {e}")
+        return jsonify({'success': False, 'error': busy_message(language)}), 503
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': url_for('meals.job_status', job_id=job.id)
+    }), 202
+
+
+@meals_bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """
+    API endpoint to poll a meal job
+    Returns its status and the progress events after ?after=N
+    """
+    job = get_own_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    after = request.args.get('after', 0, type=int)
+    data = meal_jobs.status(job, after=max(after, 0))
+    data['success'] = True
+    if job.status == MealJob.DONE:
+        language = job.get_payload().get('language', 'en')
+        data['url'] = url_for('meals.view_meal', meal_id=job.meal_id, lang=language)
+    return jsonify(data)
+
+
+@meals_bp.route('/jobs/<job_id>/wait')
+@login_required
+def job_wait(job_id):
+    """
+    Waiting page for a queued generation (refreshes itself until done)
+    """
+    job = get_own_job(job_id)
+    if job is None:
+        flash('Access denied', 'error')
+        return redirect(url_for('meals.meals_home'))
+    
+    language = job.get_payload().get('language', 'en')
+    
+    if job.status == MealJob.DONE:
         if language == 'ar':
             flash('تم إنشاء الوجبة بنجاح! 🎉', 'success')
         else:
             flash('Meal generated successfully! 🎉', 'success')
-        
-        # Redirect to view the meal
-        return redirect(url_for('meals.view_meal', meal_id=meal.id, lang=language))
-        
-    except Exception as e:
-        print(f"❌ Error generating meal: {e}")
+        return redirect(url_for('meals.view_meal', meal_id=job.meal_id, lang=language))
+    
+    if job.status == MealJob.FAILED:
         if language == 'ar':
             flash('فشل في إنشاء الوجبة. الرجاء المحاولة مرة أخرى.', 'error')
         else:
             flash('Failed to generate meal. Please try again.', 'error')
         return redirect(url_for('meals.meals_home', lang=language))
+    
+    return render_template(
+        'meal_job.html',
+        job=job,
+        language=language,
+        queue_position=meal_jobs.status(job).get('queue_position')
+    )
+
+
+@meals_bp.route('/api/job-stats')
+@login_required
+def job_stats():
+    """
+    API endpoint for meal job queue metrics
+    Returns queue depth, running jobs and wait/run latency percentiles
+    """
+    stats = meal_jobs.stats()
+    stats['single_flight'] = meal_flights.stats()
+    stats['composer'] = meal_composer.stats()
+    return jsonify(stats)
+
+
+@meals_bp.route('/generate/stream', methods=['POST'])
+@login_required
+def generate_meal_stream():
+    """
+    Generate meal with AI, streamed as Server-Sent Events
+    Takes the same form as /generate; the name, ingredients and instructions
+    are sent as soon as the model writes them, and the meal is saved when
+    the stream ends. Holds the request open for the whole generation;
+    the page itself uses the job queue (/jobs) instead
+    
+    Events:
+        field    {"field", "value"}  a recipe field is complete
+        item     {"field", "value"}  one ingredient is complete
+        partial  {"field", "value"}  instructions written so far
+        done     {"meal_id", "url"}  meal saved
+        error    {"error"}           generation failed
+    """
+    user_id = session.get('user_id')
+    family_profile = FamilyProfile.query.filter_by(user_id=user_id).first()
+    
+    if not family_profile:
+        return jsonify({'success': False, 'error': 'Please complete your family profile first'}), 400
+    
+    all_selected, meal_type, cuisine_type, language, force_fresh = read_meal_form()
+    error = validate_meal_form(all_selected, meal_type, language)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    child_profiles = build_child_profiles(family_profile)
+    all_dietary_restrictions = get_all_dietary_restrictions(family_profile)
+    generation = dict(
+        selected_ingredients=all_selected,
+        meal_type=meal_type,
+        cuisine_type=cuisine_type,
+        child_profiles=child_profiles,
+        dietary_restrictions=all_dietary_restrictions,
+        language=language
+    )
+    cache_key = meal_fingerprint(**generation)
+    
+    def events():
+        # Opens the stream right away, before the model answers
+        yield ": generating\n\n"
+        
+        try:
+            meal_data = None
+            for event, field, value in meal_generation_events(generation, cache_key, force_fresh):
+                if event == 'meal':
+                    meal_data = value
+                else:
+                    yield sse_event(event, {'field': field, 'value': value})
+            
+            meal = save_meal_to_database(
+                family_profile=family_profile,
+                meal_data=meal_data,
+                meal_type=meal_type,
+                selected_ingredients=all_selected
+            )
+            yield sse_event('done', {
+                'meal_id': meal.id,
+                'url': url_for('meals.view_meal', meal_id=meal.id, lang=language)
+            })
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error streaming meal: {e}")
+            if language == 'ar':
+                message = 'فشل في إنشاء الوجبة. الرجاء المحاولة مرة أخرى.'
+            else:
+                message = 'Failed to generate meal. Please try again.'
+            yield sse_event('error', {'error': message})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@meals_bp.route('/api/cache-stats')
+@login_required
+def cache_stats():
+    """
+    API endpoint for meal generation cache metrics
+    Returns hit/miss counters and current size
+    """
+    return jsonify(meal_cache.stats())
 
 
 @meals_bp.route('/view/<int:meal_id>')
@@ -171,7 +351,8 @@ def view_meal(meal_id):
         'view_meal.html',
         meal=meal,
         language=language,
-        user_name=user_name
+        user_name=user_name,
+        nutrition_flags=describe_flags(meal.get_nutrition_flags(), language)
     )
 
 @meals_bp.route('/regenerate/<int:meal_id>', methods=['POST'])
@@ -179,6 +360,9 @@ def view_meal(meal_id):
 def regenerate_meal(meal_id):
     """
     Regenerate a meal with user feedback
+    Queues a regeneration job; poll status_url until it is done.
+    Resubmits with the same Idempotency-Key (or the same feedback while
+    it is still running) return the existing job
     """
     user_id = session.get('user_id')
     family_profile = FamilyProfile.query.filter_by(user_id=user_id).first()
@@ -197,66 +381,27 @@ def regenerate_meal(meal_id):
     if not feedback:
         return jsonify({'success': False, 'error': 'Feedback is required'})
     
+    # Fail fast while the AI provider's circuit is open
+    if not llm.is_available(REGENERATE_PROVIDER):
+        return jsonify({'success': False, 'error': ai_unavailable_message(language)}), 503
+    
     try:
-        # Use the regeneration prompt
-        from app.meal_recommender.prompts import get_meal_regeneration_prompt
-        from google import genai
-        from google.genai import types
-        import os
-        import json
-        
-        client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
-        
-        # Get original meal data
-        original_meal_data = {
-            'name_en': original_meal.name_en,
-            'ingredients': original_meal.get_ingredients()
-        }
-        
-        prompt = get_meal_regeneration_prompt(
-            original_meal=original_meal_data,
-            feedback=feedback,
-            language=language
-        )
-        
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=1.0,
-                response_mime_type="application/json"
-            )
-        )
-        
-        meal_data = json.loads(response.text)
-        
-        # Update the existing meal instead of creating new one
-        original_meal.name_en = meal_data['name_en']
-        original_meal.name_ar = meal_data['name_ar']
-        original_meal.instructions_en = meal_data['instructions_en']
-        original_meal.instructions_ar = meal_data['instructions_ar']
-        original_meal.prep_time = meal_data.get('prep_time', 'N/A')
-        original_meal.cook_time = meal_data.get('cook_time', 'N/A')
-        original_meal.nutritional_benefits_en = meal_data.get('nutritional_benefits_en', '')
-        original_meal.nutritional_benefits_ar = meal_data.get('nutritional_benefits_ar', '')
-        original_meal.why_healthy_en = meal_data.get('why_healthy_en', '')
-        original_meal.why_healthy_ar = meal_data.get('why_healthy_ar', '')
-        
-        # Update ingredients
-        ai_ingredients = extract_ingredients(meal_data)
-        original_meal.set_ingredients(ai_ingredients)
-        
-        # Recalculate missing ingredients
-        missing = original_meal.calculate_missing_ingredients()
-        original_meal.set_missing_ingredients(missing)
-        
-        db.session.commit()
-        
-        return jsonify({'success': True, 'message': 'Meal regenerated successfully!'})
-        
-    except Exception as e:
-        print(f"Error regenerating meal: {e}")
-        return jsonify({'success': False, 'error': str(e)})
+        request_key = json.dumps([original_meal.id, feedback.casefold(), language], ensure_ascii=False)
+        job = meal_jobs.submit(family_profile.id, 'regenerate', {
+            'meal_id': original_meal.id,
+            'feedback': feedback,
+            'language': language
+        }, idempotency_key=request_idempotency_key(data),
+            dedupe_key=hashlib.sha256(request_key.encode('utf-8')).hexdigest())
+    except QueueFull as e:
+        print(f"⏳ Meal queue full: {e}")
+        return jsonify({'success': False, 'error': busy_message(language)}), 503
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': url_for('meals.job_status', job_id=job.id)
+    }), 202
 
 @meals_bp.route('/history')
 @login_required
@@ -335,6 +480,167 @@ def delete_meal(meal_id):
 # HELPER FUNCTIONS
 # ============================================
 
+def submit_generation_job(family_profile, all_selected, meal_type, cuisine_type, language, force_fresh):
+    """
+    Queue a meal generation for a family
+    The child profiles and cache key are captured now, so the job
+    generates exactly what was asked for. Resubmits (same idempotency key,
+    or the same request while it is still running) get the existing job
+    
+    Returns:
+        MealJob
+    
+    Raises:
+        QueueFull: if too many jobs are waiting
+    """
+    generation = build_generation(family_profile, all_selected, meal_type, cuisine_type, language)
+    cache_key = meal_fingerprint(**generation)
+    return meal_jobs.submit(family_profile.id, 'generate', {
+        'generation': generation,
+        'cache_key': cache_key,
+        'force_fresh': force_fresh,
+        'language': language
+    }, idempotency_key=request_idempotency_key(), dedupe_key=cache_key)
+
+
+def build_generation(family_profile, all_selected, meal_type, cuisine_type, language):
+    """
+    Arguments for generate_meal (and compose_meal) for a family's request
+    
+    Returns:
+        dict
+    """
+    return dict(
+        selected_ingredients=all_selected,
+        meal_type=meal_type,
+        cuisine_type=cuisine_type,  # NEW: Pass cuisine type
+        child_profiles=build_child_profiles(family_profile),
+        dietary_restrictions=get_all_dietary_restrictions(family_profile),
+        language=language
+    )
+
+
+def save_quick_meal(family_profile, all_selected, meal_type, cuisine_type, language):
+    """
+    Compose a meal offline (no AI call) and save it
+    
+    Returns:
+        Meal object
+    
+    Raises:
+        ValueError: if no recipe template fits the family's restrictions
+    """
+    generation = build_generation(family_profile, all_selected, meal_type, cuisine_type, language)
+    meal_data = meal_composer.compose(generation, reason='quick')
+    return save_meal_to_database(
+        family_profile=family_profile,
+        meal_data=meal_data,
+        meal_type=meal_type,
+        selected_ingredients=all_selected
+    )
+
+
+def request_idempotency_key(data=None):
+    """
+    Client idempotency key from the Idempotency-Key header, the form,
+    or a JSON body
+    
+    Returns:
+        str, or None
+    """
+    key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key')
+    if not key and data:
+        key = data.get('idempotency_key')
+    return key.strip()[:200] if key and key.strip() else None
+
+
+def get_own_job(job_id):
+    """
+    Get a meal job if it belongs to the logged-in family
+    
+    Returns:
+        MealJob, or None
+    """
+    family_profile = FamilyProfile.query.filter_by(user_id=session.get('user_id')).first()
+    job = db.session.get(MealJob, job_id)
+    if job is None or family_profile is None or job.family_profile_id != family_profile.id:
+        return None
+    return job
+
+
+def busy_message(language):
+    """Message shown when the generation queue is full"""
+    if language == 'ar':
+        return 'الطلبات كثيرة الآن. الرجاء المحاولة بعد قليل.'
+    return 'Lots of meals are cooking right now. Please try again in a moment.'
+
+
+def can_generate_with_ai():
+    """
+    Check whether a generation request can be served: the meal backend's
+    circuit lets calls through, or the offline composer will stand in
+    """
+    return meal_composer.fallback or llm.is_available(MEAL_PROVIDER)
+
+
+def ai_unavailable_message(language):
+    """Message shown while the AI provider's circuit is open"""
+    if language == 'ar':
+        return 'مساعد الوصفات الذكي غير متاح مؤقتاً. الرجاء المحاولة بعد دقيقة أو تجربة "فكرة سريعة".'
+    return 'Our AI chef is unavailable for a moment. Please try again in a minute, or use "Quick Idea".'
+
+
+def quick_failed_message(language):
+    """Message shown when no quick recipe fits the family"""
+    if language == 'ar':
+        return 'لم نجد فكرة سريعة تناسب قيود عائلتك الغذائية. جرّب إنشاء وجبة بالذكاء الاصطناعي.'
+    return "We couldn't find a quick idea that fits your family's restrictions. Try generating a meal with AI."
+
+
+def read_meal_form():
+    """
+    Read the meal generation form
+    
+    Returns:
+        (all selected ingredients incl. custom ones, meal_type, cuisine_type, language, force_fresh)
+    """
+    selected_ingredients = request.form.getlist('ingredients')
+    custom_ingredient = request.form.get('custom_ingredient', '').strip()
+    meal_type = request.form.get('meal_type')
+    cuisine_type = request.form.get('cuisine_type', 'arabic')  # NEW: Get cuisine type
+    language = request.form.get('language', 'en')
+    force_fresh = request.form.get('force_fresh') == '1'
+    
+    # Combine ingredients
+    all_selected = selected_ingredients.copy()
+    if custom_ingredient:
+        # Split by comma if multiple custom ingredients
+        custom_list = [ing.strip() for ing in custom_ingredient.split(',') if ing.strip()]
+        all_selected.extend(custom_list)
+    
+    return all_selected, meal_type, cuisine_type, language, force_fresh
+
+
+def validate_meal_form(all_selected, meal_type, language):
+    """
+    Check the meal generation form
+    
+    Returns:
+        Error message in the user's language, or None if valid
+    """
+    if not all_selected:
+        if language == 'ar':
+            return 'الرجاء اختيار مكون واحد على الأقل'
+        return 'Please select at least one ingredient'
+    
+    if not meal_type:
+        if language == 'ar':
+            return 'الرجاء اختيار نوع الوجبة'
+        return 'Please select a meal type'
+    
+    return None
+
+
 def build_child_profiles(family_profile):
     """
     Build child profiles list for AI
@@ -352,6 +658,7 @@ def build_child_profiles(family_profile):
         child_profiles.append({
             "name": child.name,
             "age": child.get_age(),
+            "age_range": child.get_age_range(),
             "dietary_restrictions": child.get_dietary_restrictions(),
             "special_needs": child.special_needs
         })
@@ -359,6 +666,37 @@ def build_child_profiles(family_profile):
     return child_profiles
 
 
+def family_child_ages(family_profile_id):
+    """
+    Ages (in years) of a family's children
+    
+    Returns:
+        list of ints
+    """
+    children = Child.query.filter_by(family_profile_id=family_profile_id).all()
+    return [child.get_age() for child in children if child.get_age() is not None]
+
+
+def set_meal_nutrition(meal, meal_data, child_ages):
+    """
+    Compute a meal's per-serving nutrition and child flags
+    
+    Args:
+        meal: Meal object (ingredients already set)
+        meal_data: dict from AI generation (for the servings count)
+        child_ages: list of children's ages
+    """
+    nutrition = calculate_meal_nutrition(
+        meal.get_ingredients(),
+        meal.meal_type,
+        child_ages=child_ages,
+        servings=meal_data.get('servings')
+    )
+    meal.set_nutrition(nutrition)
+    if nutrition['unmatched']:
+        print(f"🥗 No nutrition data for: {', '.join(nutrition['unmatched'])}")
+
+
 def get_all_dietary_restrictions(family_profile):
     """
     Get all dietary restrictions from all children
@@ -423,8 +761,103 @@ def save_meal_to_database(family_profile, meal_data, meal_type, selected_ingredi
     meal.nutritional_benefits_ar = meal_data.get('nutritional_benefits_ar', '')
     meal.why_healthy_en = meal_data.get('why_healthy_en', '')
     meal.why_healthy_ar = meal_data.get('why_healthy_ar', '')
+    meal.source = meal_data.get('source', 'ai')
+    
+    # Nutrition from the local nutrient table (not the model)
+    set_meal_nutrition(meal, meal_data, family_child_ages(family_profile.id))
     
     db.session.add(meal)
     db.session.commit()
     
-    return meal
\ No newline at end of file
+    return meal
+
+
+def apply_meal_update(meal, meal_data):
+    """
+    Overwrite a meal with regenerated data
+    
+    Args:
+        meal: Meal object
+        meal_data: dict from AI regeneration
+    """
+    meal.name_en = meal_data['name_en']
+    meal.name_ar = meal_data['name_ar']
+    meal.instructions_en = meal_data['instructions_en']
+    meal.instructions_ar = meal_data['instructions_ar']
+    meal.prep_time = meal_data.get('prep_time', 'N/A')
+    meal.cook_time = meal_data.get('cook_time', 'N/A')
+    meal.nutritional_benefits_en = meal_data.get('nutritional_benefits_en', '')
+    meal.nutritional_benefits_ar = meal_data.get('nutritional_benefits_ar', '')
+    meal.why_healthy_en = meal_data.get('why_healthy_en', '')
+    meal.why_healthy_ar = meal_data.get('why_healthy_ar', '')
+    meal.source = meal_data.get('source', 'ai')
+    
+    # Update ingredients
+    ai_ingredients = extract_ingredients(meal_data)
+    meal.set_ingredients(ai_ingredients)
+    
+    # Recalculate missing ingredients
+    missing = meal.calculate_missing_ingredients()
+    meal.set_missing_ingredients(missing)
+    
+    # Recalculate nutrition for the new ingredient amounts
+    set_meal_nutrition(meal, meal_data, family_child_ages(meal.family_profile_id))
+
+
+# ============================================
+# JOB HANDLERS (run by the meal job workers)
+# ============================================
+
+def run_generation_job(job, payload, report):
+    """
+    Generate and save a meal, reporting the recipe as it streams in
+    
+    Returns:
+        ID of the saved meal
+    """
+    family_profile = db.session.get(FamilyProfile, job.family_profile_id)
+    generation = payload['generation']
+    
+    meal_data = None
+    with usage_tags(user_id=family_profile.user_id):
+        for event, field, value in meal_generation_events(generation, payload['cache_key'], payload.get('force_fresh', False)):
+            if event == 'meal':
+                meal_data = value
+            else:
+                report(event, field, value)
+    
+    meal = save_meal_to_database(
+        family_profile=family_profile,
+        meal_data=meal_data,
+        meal_type=generation['meal_type'],
+        selected_ingredients=generation['selected_ingredients']
+    )
+    return meal.id
+
+
+def run_regeneration_job(job, payload, report):
+    """
+    Modify an existing meal according to parent feedback
+    
+    Returns:
+        ID of the updated meal
+    """
+    meal = db.session.get(Meal, payload['meal_id'])
+    if meal is None or meal.family_profile_id != job.family_profile_id:
+        raise ValueError("Meal not found")
+    
+    original_meal_data = {
+        'name_en': meal.name_en,
+        'ingredients': meal.get_ingredients()
+    }
+    family_profile = db.session.get(FamilyProfile, job.family_profile_id)
+    with usage_tags(user_id=family_profile.user_id):
+        meal_data = regenerate_meal_data(original_meal_data, payload['feedback'], payload.get('language', 'en'))
+    
+    apply_meal_update(meal, meal_data)
+    db.session.commit()
+    return meal.id
+
+
+meal_jobs.register('generate', run_generation_job)
+meal_jobs.register('regenerate', run_regeneration_job)
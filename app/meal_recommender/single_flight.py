@@ -0,0 +1,100 @@
+"""
+Single-Flight Generation
+Concurrent identical meal generations share one upstream LLM call: the
+first caller generates, the rest wait for its result
+"""
+
+import copy
+import threading
+
+
+# How long a follower waits on the leader before generating on its own
+DEFAULT_WAIT_SECONDS = 300
+
+
+class Flight:
+    """One in-progress generation that other callers can wait on"""
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.followers = 0
+        self._done = threading.Event()
+
+    def wait(self, timeout=DEFAULT_WAIT_SECONDS):
+        """
+        Wait for the leader to finish
+
+        Returns:
+            Copy of the result, or None if the leader gave up or took too long
+
+        Raises:
+            The leader's exception, if its generation failed
+        """
+        if not self._done.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return copy.deepcopy(self.result)
+
+
+class SingleFlight:
+    """
+    Registry of in-progress generations, keyed on the request fingerprint
+
+    join() makes the first caller for a key the leader; later callers get
+    the same Flight and wait on it. The leader must call finish() with its
+    result or error (or neither, if it was abandoned, so followers generate
+    on their own).
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._flights = {}  # key -> Flight
+        self._lock = threading.Lock()
+
+    def join(self, key):
+        """
+        Join the generation for a key, starting it if none is in progress
+
+        Returns:
+            (Flight, is_leader)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.coalesced += 1
+                return flight, False
+
+            flight = self._flights[key] = Flight()
+            self.leaders += 1
+            return flight, True
+
+    def finish(self, key, flight, result=None, error=None):
+        """Publish the leader's outcome and wake every follower"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = result
+        flight.error = error
+        flight._done.set()
+
+    def stats(self):
+        """
+        Coalescing counters for monitoring
+
+        Returns:
+            dict with in_flight, leaders (upstream calls) and coalesced (calls saved)
+        """
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+            }
+
+
+# Shared, process-level registry
+meal_flights = SingleFlight()
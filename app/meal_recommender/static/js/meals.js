@@ -25,12 +25,15 @@ const translations = {
         mealTypeTitle: 'Choose Meal Type',
         mealTypeDesc: 'What type of meal do you want to prepare?',
         generateText: '🎨 Generate Healthy Meal',
+        quickText: '⚡ Quick Idea (instant)',
+        forceFreshLabel: '✨ Always create a brand-new recipe',
         historyLink: '📖 View Meal History',
         countText: '{count} ingredients selected',
         generating: '⏳ Generating...',
         selectIngredient: 'Please select at least one ingredient',
         loadingTitle: 'Generating Your Meal',
         loadingSubtitle: 'Our AI chef is preparing something delicious...',
+        streamFailed: 'Failed to generate meal. Please try again.',
         regeneratingTitle: 'Modifying Your Recipe',
         regeneratingSubtitle: 'Making it even better...',
         regenerateText: 'Modify Recipe',
@@ -54,12 +57,15 @@ const translations = {
         mealTypeTitle: 'اختر نوع الوجبة',
         mealTypeDesc: 'ما نوع الوجبة التي تريد تحضيرها؟',
         generateText: '🎨 إنشاء وجبة صحية',
+        quickText: '⚡ فكرة سريعة (فورية)',
+        forceFreshLabel: '✨ أنشئ وصفة جديدة تماماً',
         historyLink: '📖 عرض سجل الوجبات',
         countText: '{count} مكونات محددة',
         generating: '⏳ جاري الإنشاء...',
         selectIngredient: 'الرجاء اختيار مكون واحد على الأقل',
         loadingTitle: 'جاري إنشاء وجبتك',
         loadingSubtitle: 'الطاهي الذكي يحضر لك شيئاً لذيذاً...',
+        streamFailed: 'فشل في إنشاء الوجبة. الرجاء المحاولة مرة أخرى.',
         regeneratingTitle: 'جاري تعديل الوصفة',
         regeneratingSubtitle: 'نجعلها أفضل...',
         regenerateText: 'تعديل الوصفة',
@@ -196,6 +202,16 @@ function updatePageText() {
         generateTextEl.textContent = t.generateText;
     }
     
+    const quickTextEl = document.getElementById('quickText');
+    if (quickTextEl) {
+        quickTextEl.textContent = t.quickText;
+    }
+    
+    const forceFreshLabelEl = document.getElementById('forceFreshLabel');
+    if (forceFreshLabelEl) {
+        forceFreshLabelEl.textContent = t.forceFreshLabel;
+    }
+    
     const historyLinkEl = document.getElementById('historyLink');
     if (historyLinkEl) {
         historyLinkEl.textContent = t.historyLink;
@@ -248,6 +264,7 @@ function updateSelectedCount() {
     
     // Enable/disable generate button
     const generateBtn = document.getElementById('generateBtn');
+    const quickBtn = document.getElementById('quickBtn');
     const customInput = document.getElementById('custom_ingredient');
     
     if (generateBtn && customInput) {
@@ -258,6 +275,7 @@ function updateSelectedCount() {
         } else {
             generateBtn.disabled = true;
         }
+        if (quickBtn) quickBtn.disabled = generateBtn.disabled;
     }
 }
 
@@ -286,6 +304,18 @@ document.addEventListener('DOMContentLoaded', function() {
                 return false;
             }
             
+            // Quick ideas are composed instantly: a plain form post is fastest
+            if (e.submitter && e.submitter.name === 'quick') {
+                return true;
+            }
+            
+            // Queue the generation and show the recipe as the job reports it
+            if (mealFormEl.dataset.jobUrl && window.fetch) {
+                e.preventDefault();
+                submitMealJob(mealFormEl);
+                return false;
+            }
+            
             // Show loading overlay
             showLoadingOverlay();
             
@@ -294,6 +324,128 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// ============================================
+// BACKGROUND GENERATION (job queue + polling)
+// ============================================
+
+// First poll comes quickly (cached meals finish at once), then back off
+const JOB_POLL_FIRST_MS = 150;
+const JOB_POLL_MS = 500;
+const JOB_POLL_MAX_MS = 2000;
+
+// Queue the form as a generation job and follow its progress
+function submitMealJob(form) {
+    showLoadingOverlay();
+    resetStreamPreview();
+    
+    fetch(form.dataset.jobUrl, {
+        method: 'POST',
+        body: new FormData(form),
+        headers: { 'Accept': 'application/json' }
+    })
+        .then(function(response) {
+            return response.json().then(function(data) {
+                return { status: response.status, data: data };
+            });
+        })
+        .then(function(result) {
+            if (!result.data.success) {
+                hideLoadingOverlay();
+                alert(result.data.error || translations[currentLanguage].streamFailed);
+                return;
+            }
+            pollMealJob(result.data.status_url, 0, JOB_POLL_FIRST_MS);
+        })
+        .catch(function(error) {
+            // Job API unreachable: fall back to the regular form post
+            console.error('Meal job submit failed:', error);
+            form.submit();
+        });
+}
+
+// Poll a job, rendering the progress events we don't have yet
+function pollMealJob(statusUrl, after, delay) {
+    setTimeout(function() {
+        fetch(statusUrl + '?after=' + after, { headers: { 'Accept': 'application/json' } })
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                if (!data.success) throw new Error(data.error || 'Job not found');
+                
+                (data.events || []).forEach(function(item) {
+                    handleStreamEvent(item.event, item);
+                });
+                
+                if (data.status === 'done') {
+                    handleStreamEvent('done', { url: data.url });
+                } else if (data.status === 'failed') {
+                    handleStreamEvent('error', {});
+                } else {
+                    pollMealJob(statusUrl, data.next, Math.min(Math.max(delay * 1.5, JOB_POLL_MS), JOB_POLL_MAX_MS));
+                }
+            })
+            .catch(function(error) {
+                console.error('Meal job poll failed:', error);
+                hideLoadingOverlay();
+                alert(translations[currentLanguage].streamFailed);
+            });
+    }, delay);
+}
+
+// Render one progress event; returns true once the job is finished
+function handleStreamEvent(event, data) {
+    const suffix = currentLanguage === 'ar' ? '_ar' : '_en';
+    const preview = document.getElementById('streamPreview');
+    
+    if (event === 'done') {
+        window.location.href = data.url;
+        return true;
+    }
+    
+    if (event === 'error') {
+        hideLoadingOverlay();
+        alert(data.error || translations[currentLanguage].streamFailed);
+        return true;
+    }
+    
+    // The AI failed part way: an offline recipe replaces what was shown
+    if (event === 'reset') {
+        resetStreamPreview();
+        return false;
+    }
+    
+    if (preview) preview.classList.add('active');
+    
+    if (event === 'item' && data.field === 'ingredients') {
+        const list = document.getElementById('streamIngredients');
+        const ingredient = data.value || {};
+        const item = document.createElement('li');
+        item.textContent = `${ingredient.icon || '🥘'} ${ingredient['name' + suffix] || ingredient.name_en || ''}` +
+            (ingredient.amount ? ` - ${ingredient.amount}` : '');
+        if (list) list.appendChild(item);
+    } else if ((event === 'field' || event === 'partial') && data.field === 'name' + suffix) {
+        const nameEl = document.getElementById('streamMealName');
+        if (nameEl) nameEl.textContent = data.value;
+    } else if ((event === 'field' || event === 'partial') && data.field === 'instructions' + suffix) {
+        const instructionsEl = document.getElementById('streamInstructions');
+        if (instructionsEl) {
+            instructionsEl.textContent = data.value;
+            instructionsEl.scrollTop = instructionsEl.scrollHeight;
+        }
+    }
+    return false;
+}
+
+// Clear the preview from a previous attempt
+function resetStreamPreview() {
+    const preview = document.getElementById('streamPreview');
+    if (preview) preview.classList.remove('active');
+    
+    ['streamMealName', 'streamIngredients', 'streamInstructions'].forEach(function(id) {
+        const el = document.getElementById(id);
+        if (el) el.innerHTML = '';
+    });
+}
+
 // Show loading overlay
 function showLoadingOverlay() {
     const overlay = document.getElementById('loadingOverlay');
@@ -0,0 +1,74 @@
+"""
+Operations Routes
+Process internals for whoever runs the server (LLM latency, circuit
+breakers, token usage); not part of the family-facing app
+
+Every route needs the OPS_API_TOKEN config value as a bearer token:
+    curl -H "Authorization: Bearer $OPS_API_TOKEN" http://localhost:5000/ops/llm-latency
+Without a configured token the routes answer 404
+"""
+
+import hmac
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Blueprint, abort, current_app, jsonify, request
+
+from app.llm import llm, usage_meter, usage_totals
+
+# Create blueprint
+ops_bp = Blueprint('ops', __name__, url_prefix='/ops')
+
+
+def ops_token_required(f):
+    """Decorator to require the operations bearer token"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = current_app.config.get('OPS_API_TOKEN')
+        if not token:
+            abort(404)
+        scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(given.strip().encode(), token.encode()):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@ops_bp.route('/llm-latency')
+@ops_token_required
+def llm_latency():
+    """
+    Per-backend LLM latency histograms
+    Used to tune the hedging budget (LLM_HEDGE_AFTER_SECONDS / LLM_HEDGE_PERCENTILE)
+    """
+    return jsonify(llm.latency_report())
+
+
+@ops_bp.route('/llm-breakers')
+@ops_token_required
+def llm_breakers():
+    """
+    LLM circuit breaker states and call deadlines
+    A backend in state "open" is refusing calls until retry_after
+    """
+    return jsonify(llm.resilience_report())
+
+
+@ops_bp.route('/llm-usage')
+@ops_token_required
+def llm_usage():
+    """
+    AI token usage
+    Ledger totals per feature over the last ?days= (default 30), for one
+    user with ?user_id=, plus this process's totals and heaviest prompt sections
+    (utils/llm_usage_report.py gives the full ledger breakdown)
+    """
+    days = max(request.args.get('days', 30, type=int), 1)
+    user_id = request.args.get('user_id', type=int)
+    since = datetime.utcnow() - timedelta(days=days)
+    return jsonify({
+        'days': days,
+        'user_id': user_id,
+        'features': usage_totals(('feature',), since=since, user_id=user_id),
+        'process': usage_meter.report()
+    })
@@ -0,0 +1,182 @@
+"""
+Activity Catalog
+Process-level, in-memory copy of every activity
+Indexed by (category, age_range) so the activity routes never re-read the table
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import func
+
+from db.models import db, Activity, ActivityCatalogVersion
+from app.screen_free_activities.scoring import ScoringEngine
+
+
+# How often (seconds) to check whether the activities table changed
+# underneath us, e.g. after utils/populate_activities.py ran in another process
+DEFAULT_REFRESH_SECONDS = 60
+
+
+class CatalogSnapshot:
+    """
+    One immutable build of the catalog
+
+    Positions returned by select_positions always refer to this snapshot's
+    activity list and scoring arrays, even if the catalog is rebuilt meanwhile.
+    """
+
+    def __init__(self, activities, version=None):
+        self.activities = activities
+        self.version = version
+        self.by_id = {activity.id: activity for activity in activities}
+        self.position_of = {activity.id: position for position, activity in enumerate(activities)}
+
+        # Index holds catalog positions, so the scoring arrays line up with it
+        index = defaultdict(list)
+        for position, activity in enumerate(activities):
+            index[(activity.category, activity.age_range)].append(position)
+        self.index = {key: np.array(positions, dtype=np.intp) for key, positions in index.items()}
+
+        self.scoring = ScoringEngine(activities)
+
+    def select_positions(self, category='all', age_range=None):
+        """
+        Get catalog positions of activities matching a category and age range
+
+        Args:
+            category: Category key, or 'all' for every category
+            age_range: Age range string, or None for every age range
+
+        Returns:
+            numpy array of positions (see activities_at)
+        """
+        if category == 'all' and age_range is None:
+            return np.arange(len(self.activities), dtype=np.intp)
+
+        selected = [
+            positions
+            for (activity_category, activity_age_range), positions in self.index.items()
+            if (category == 'all' or activity_category == category)
+            and (age_range is None or activity_age_range == age_range)
+        ]
+        if not selected:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate(selected))
+
+    def activities_at(self, positions):
+        """Get the Activity objects at the given catalog positions"""
+        return [self.activities[position] for position in positions]
+
+    def select(self, category='all', age_range=None):
+        """Get the Activity objects matching a category and age range"""
+        return self.activities_at(self.select_positions(category, age_range))
+
+    def __len__(self):
+        return len(self.activities)
+
+
+class ActivityCatalog:
+    """
+    Holds all activities in memory, indexed by (category, age_range)
+
+    Only the live catalog version is loaded. Activities are detached from the
+    database session, so they can be shared safely between requests. The
+    catalog is rebuilt on app start, after the populate script finishes, and
+    whenever the live version or its fingerprint changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = CatalogSnapshot([])
+        self._checked_at = 0.0
+        self.refresh_seconds = DEFAULT_REFRESH_SECONDS
+
+    def init_app(self, app):
+        """
+        Build the catalog when the app starts
+
+        Args:
+            app: Flask application instance
+        """
+        self.refresh_seconds = app.config.get('ACTIVITY_CATALOG_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)
+        app.extensions['activity_catalog'] = self
+
+        with app.app_context():
+            self.rebuild()
+
+    def _table_version(self):
+        """Cheap fingerprint of the live catalog (version id + row count + highest id)"""
+        live_id = ActivityCatalogVersion.live_id()
+        count, max_id = db.session.query(func.count(Activity.id), func.max(Activity.id)) \
+            .filter(Activity.live_filter()).one()
+        return (live_id, count, max_id)
+
+    def rebuild(self):
+        """
+        Reload every activity from the database and rebuild the index
+        Must be called inside an app context
+
+        Returns:
+            Number of activities in the catalog
+        """
+        with self._lock:
+            version = self._table_version()
+            activities = Activity.query.filter(Activity.live_filter()).order_by(Activity.id).all()
+
+            # Detach from the session so the objects outlive this request
+            for activity in activities:
+                db.session.expunge(activity)
+
+            # Swapping a single reference keeps readers consistent
+            self._snapshot = CatalogSnapshot(activities, version)
+            self._checked_at = time.monotonic()
+
+        print(f"📚 Activity catalog loaded: {len(activities)} activities")
+        return len(activities)
+
+    def refresh_if_stale(self):
+        """Rebuild the catalog if the activities table changed since the last build"""
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_seconds:
+            return
+
+        self._checked_at = now
+        if self._table_version() != self._snapshot.version:
+            self.rebuild()
+
+    def snapshot(self):
+        """
+        Get the current catalog build (refreshing it first if stale)
+
+        Returns:
+            CatalogSnapshot
+        """
+        self.refresh_if_stale()
+        return self._snapshot
+
+    def select(self, category='all', age_range=None):
+        """
+        Get activities matching a category and age range
+
+        Args:
+            category: Category key, or 'all' for every category
+            age_range: Age range string, or None for every age range
+
+        Returns:
+            list of (detached) Activity objects
+        """
+        return self.snapshot().select(category, age_range)
+
+    def get(self, activity_id):
+        """Get a single activity by ID, or None"""
+        return self.snapshot().by_id.get(activity_id)
+
+    def __len__(self):
+        return len(self._snapshot)
+
+
+# Shared, process-level catalog
+activity_catalog = ActivityCatalog()
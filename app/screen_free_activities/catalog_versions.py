@@ -0,0 +1,316 @@
+"""
+Activity Catalog Versions
+Build a new catalog next to the live one, switch to it in one transaction,
+and keep the previous version for instant rollback
+
+Every build gives each activity a new ID; activity_key matches the same
+activity across versions, so popularity counters and recommendations
+carry over to the new catalog
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, or_
+
+from db.models import (
+    db, Activity, ActivityCatalogVersion, ActivityCompletion,
+    ActivityHomeRequirement, ActivityMaterial, ActivityStats
+)
+from db.activity_search import normalize_text, unindex_activities
+from app.screen_free_activities.completions import merge_activity_stats
+
+
+# IDs per IN (...) clause, below SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 500
+
+
+def activity_key(title_en, category, age_range):
+    """
+    Identity of an activity across catalog versions: English title
+    (normalized, case-folded, whitespace collapsed), category and age range
+
+    Returns:
+        tuple
+    """
+    return ' '.join(normalize_text(title_en).casefold().split()), category, age_range
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[start:start + ID_CHUNK_SIZE]
+
+
+def counterparts_in_version(activity_ids, version_id):
+    """
+    Map activities of any catalog version to the same activities in another one
+
+    Args:
+        activity_ids: Activity IDs to map
+        version_id: Target catalog version (None: unversioned legacy rows)
+
+    Returns:
+        dict: activity ID -> ID of its counterpart in version_id; IDs already
+        in that version map to themselves, ones without a counterpart are left out
+    """
+    mapping = {}
+    keys = {}
+    for chunk in _chunks(list(set(activity_ids))):
+        rows = db.session.query(
+            Activity.id, Activity.title_en, Activity.category, Activity.age_range, Activity.catalog_version_id
+        ).filter(Activity.id.in_(chunk))
+        for activity_id, title_en, category, age_range, catalog_version_id in rows:
+            if catalog_version_id == version_id:
+                mapping[activity_id] = activity_id
+            else:
+                keys[activity_id] = activity_key(title_en, category, age_range)
+    if not keys:
+        return mapping
+
+    # Only the target rows that can match: same categories and age ranges (indexed)
+    in_version = Activity.catalog_version_id == version_id if version_id is not None \
+        else Activity.catalog_version_id.is_(None)
+    wanted = set(keys.values())
+    by_key = {}
+    rows = db.session.query(Activity.id, Activity.title_en, Activity.category, Activity.age_range).filter(
+        in_version,
+        Activity.category.in_({key[1] for key in wanted}),
+        Activity.age_range.in_({key[2] for key in wanted})
+    ).order_by(Activity.id)
+    for activity_id, title_en, category, age_range in rows:
+        key = activity_key(title_en, category, age_range)
+        if key in wanted:
+            by_key.setdefault(key, activity_id)
+
+    mapping.update({activity_id: by_key[key] for activity_id, key in keys.items() if key in by_key})
+    return mapping
+
+
+def carry_activity_stats(version_id):
+    """
+    Move popularity and rating counters onto a catalog version's activities
+    Counters of activities outside the version are added to their
+    counterparts in it and then dropped, so each completion counts once
+    whichever version is live; counters without a counterpart stay where
+    they are. Runs in the caller's transaction
+
+    Args:
+        version_id: Catalog version the counters move to
+
+    Returns:
+        Number of activities whose counters were moved
+    """
+    rows = db.session.query(
+        ActivityStats.activity_id, ActivityStats.completion_count, ActivityStats.rating_sum,
+        ActivityStats.rating_count, ActivityStats.popularity_score, ActivityStats.last_completed_at
+    ).join(Activity, Activity.id == ActivityStats.activity_id).filter(
+        or_(Activity.catalog_version_id != version_id, Activity.catalog_version_id.is_(None))
+    ).all()
+    if not rows:
+        return 0
+
+    counterparts = counterparts_in_version([row.activity_id for row in rows], version_id)
+    deltas = defaultdict(lambda: {
+        'completion_count': 0, 'rating_sum': 0, 'rating_count': 0,
+        'popularity_score': 0.0, 'last_completed_at': None
+    })
+    moved = []
+    for row in rows:
+        target = counterparts.get(row.activity_id)
+        if target is None:
+            continue
+        delta = deltas[target]
+        delta['completion_count'] += row.completion_count
+        delta['rating_sum'] += row.rating_sum
+        delta['rating_count'] += row.rating_count
+        delta['popularity_score'] += row.popularity_score
+        if row.last_completed_at and (delta['last_completed_at'] is None
+                                      or row.last_completed_at > delta['last_completed_at']):
+            delta['last_completed_at'] = row.last_completed_at
+        moved.append(row.activity_id)
+
+    merge_activity_stats(deltas)
+    for chunk in _chunks(moved):
+        ActivityStats.query.filter(ActivityStats.activity_id.in_(chunk)).delete(synchronize_session=False)
+    return len(moved)
+
+
+def start_catalog_version(resume=False):
+    """
+    Get a 'building' catalog version to generate into
+
+    Args:
+        resume: Reuse the newest unfinished build instead of starting a new one
+
+    Returns:
+        ActivityCatalogVersion
+    """
+    if resume:
+        version = ActivityCatalogVersion.query.filter_by(status='building') \
+            .order_by(ActivityCatalogVersion.id.desc()).first()
+        if version:
+            discard_building_versions(keep_id=version.id)
+            return version
+
+    # Earlier failed or interrupted builds are never resumed from here on
+    discard_building_versions()
+    version = ActivityCatalogVersion(status='building')
+    db.session.add(version)
+    db.session.commit()
+    return version
+
+
+def delete_version_activities(version_id, keep_referenced=True):
+    """
+    Delete a catalog version's activities (and their resource rows)
+
+    Args:
+        version_id: Catalog version ID
+        keep_referenced: Keep activities that an ActivityCompletion points to
+
+    Returns:
+        Number of deleted activities
+    """
+    doomed = db.session.query(Activity.id).filter(Activity.catalog_version_id == version_id)
+    if keep_referenced:
+        referenced = db.session.query(ActivityCompletion.activity_id)
+        doomed = doomed.filter(Activity.id.notin_(referenced))
+    doomed = doomed.scalar_subquery()
+
+    # Bulk deletes skip ORM cascades, so clear the resource tables and search index explicitly
+    ActivityHomeRequirement.query.filter(ActivityHomeRequirement.activity_id.in_(doomed)) \
+        .delete(synchronize_session=False)
+    ActivityMaterial.query.filter(ActivityMaterial.activity_id.in_(doomed)) \
+        .delete(synchronize_session=False)
+    unindex_activities(doomed)
+    deleted = Activity.query.filter(Activity.id.in_(doomed)).delete(synchronize_session=False)
+
+    db.session.commit()
+    return deleted
+
+
+def discard_building_versions(keep_id=None, before_id=None):
+    """
+    Delete unfinished ('building') catalog versions with their activities
+    A failed or interrupted build leaves one behind; a checkpointed build
+    reloads its activities from the checkpoint, so nothing is lost
+
+    Args:
+        keep_id: Building version to keep (the one being resumed)
+        before_id: Only discard versions started before this one
+
+    Returns:
+        Number of discarded versions
+    """
+    stale = ActivityCatalogVersion.query.filter_by(status='building')
+    if keep_id is not None:
+        stale = stale.filter(ActivityCatalogVersion.id != keep_id)
+    if before_id is not None:
+        stale = stale.filter(ActivityCatalogVersion.id < before_id)
+
+    discarded = 0
+    for version in stale.all():
+        delete_version_activities(version.id, keep_referenced=True)
+        # A version row stays only while something still points at its activities
+        if not Activity.query.filter(Activity.catalog_version_id == version.id).count():
+            db.session.delete(version)
+            db.session.commit()
+            discarded += 1
+
+    if discarded:
+        print(f"🧹 Discarded {discarded} unfinished catalog builds")
+    return discarded
+
+
+def activate_catalog_version(version_id):
+    """
+    Switch live traffic to a catalog version in one transaction
+    (popularity and rating counters move along, see carry_activity_stats)
+
+    Args:
+        version_id: Catalog version ID to make live
+
+    Returns:
+        ActivityCatalogVersion that is now live
+    """
+    version = db.session.get(ActivityCatalogVersion, version_id)
+    if version is None:
+        raise ValueError(f"Catalog version {version_id} not found")
+
+    try:
+        version.activity_count = db.session.query(func.count(Activity.id)) \
+            .filter(Activity.catalog_version_id == version_id).scalar()
+
+        # Legacy rows (built before versions) become a retired version of their own,
+        # so rolling back to them works like any other version
+        if ActivityCatalogVersion.live_id() is None:
+            legacy_count = Activity.query.filter(Activity.catalog_version_id.is_(None)).count()
+            if legacy_count:
+                legacy = ActivityCatalogVersion(status='retired', activity_count=legacy_count)
+                db.session.add(legacy)
+                db.session.flush()
+                Activity.query.filter(Activity.catalog_version_id.is_(None)) \
+                    .update({'catalog_version_id': legacy.id}, synchronize_session=False)
+
+        moved = carry_activity_stats(version_id)
+
+        ActivityCatalogVersion.query.filter_by(status='live') \
+            .update({'status': 'retired'}, synchronize_session=False)
+        version.status = 'live'
+        version.activated_at = datetime.utcnow()
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if moved:
+        print(f"📈 Carried popularity counters of {moved} activities over to catalog version {version_id}")
+    return version
+
+
+def rollback_catalog_version():
+    """
+    Make the previously live catalog version live again
+
+    Returns:
+        ActivityCatalogVersion that is now live, or None if there is nothing to roll back to
+    """
+    live = ActivityCatalogVersion.live()
+    previous = ActivityCatalogVersion.query.filter_by(status='retired') \
+        .order_by(ActivityCatalogVersion.activated_at.desc().nullslast(), ActivityCatalogVersion.id.desc())
+
+    if live:
+        previous = previous.filter(ActivityCatalogVersion.id != live.id)
+
+    previous = previous.first()
+    if previous is None:
+        return None
+
+    return activate_catalog_version(previous.id)
+
+
+def prune_catalog_versions(keep=2):
+    """
+    Drop activities of old catalog versions
+    Keeps the newest `keep` activated versions (live + previous by default)
+    and any activity still referenced by an ActivityCompletion; unfinished
+    builds started before the live version are discarded
+
+    Returns:
+        Number of deleted activities
+    """
+    live_id = ActivityCatalogVersion.live_id()
+    if live_id is not None:
+        discard_building_versions(before_id=live_id)
+
+    activated = ActivityCatalogVersion.query.filter(ActivityCatalogVersion.status.in_(['live', 'retired'])) \
+        .order_by(ActivityCatalogVersion.activated_at.desc().nullslast(), ActivityCatalogVersion.id.desc()).all()
+
+    deleted = 0
+    for version in activated[keep:]:
+        if version.status == 'live':
+            continue
+        deleted += delete_version_activities(version.id, keep_referenced=True)
+
+    return deleted
@@ -0,0 +1,253 @@
+"""
+Activity Completion Ingestion
+Insert-or-ignore against the daily unique index (keeping the per-activity
+counters in the same transaction), plus an optional write-behind queue
+that lands bursts of completions in one transaction
+"""
+
+import atexit
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db.models import db, ActivityCompletion, ActivityStats
+
+
+# Write-behind defaults
+DEFAULT_FLUSH_SECONDS = 0.5
+DEFAULT_BATCH_SIZE = 200
+
+
+def completion_row(user_id, activity_id, child_id=None, rating=None, completed_at=None):
+    """
+    Build an activity_completions row
+
+    Args:
+        user_id: User who completed the activity
+        activity_id: Completed activity
+        child_id: Child who did it (optional)
+        rating: 1-5 stars (optional)
+        completed_at: Completion time (default: now, UTC)
+
+    Returns:
+        Row dict for insert_completions
+    """
+    completed_at = completed_at or datetime.utcnow()
+    return {
+        'user_id': user_id,
+        'activity_id': activity_id,
+        'child_id': child_id,
+        'rating': rating,
+        'completed_at': completed_at,
+        'completed_on': completed_at.date(),
+    }
+
+
+def insert_completions(rows):
+    """
+    Insert completions, silently skipping ones already recorded that day,
+    and add the new ones to activity_stats
+    Runs in the caller's transaction (one statement per table, executemany for batches)
+
+    Args:
+        rows: Row dicts from completion_row
+
+    Returns:
+        Number of rows actually inserted
+    """
+    if not rows:
+        return 0
+
+    table = ActivityCompletion.__table__
+    stmt = sqlite_insert(table).on_conflict_do_nothing() \
+        .returning(table.c.activity_id, table.c.rating, table.c.completed_at)
+    inserted = db.session.execute(stmt, rows).all()
+
+    update_activity_stats(inserted)
+    return len(inserted)
+
+
+def update_activity_stats(completions):
+    """
+    Fold new completions into the per-activity counters (upsert, caller's transaction)
+
+    Args:
+        completions: (activity_id, rating, completed_at) tuples of newly inserted completions
+    """
+    if not completions:
+        return
+
+    deltas = defaultdict(lambda: {
+        'completion_count': 0, 'rating_sum': 0, 'rating_count': 0,
+        'popularity_score': 0.0, 'last_completed_at': None
+    })
+    for activity_id, rating, completed_at in completions:
+        delta = deltas[activity_id]
+        delta['completion_count'] += 1
+        if rating:
+            delta['rating_sum'] += rating
+            delta['rating_count'] += 1
+        delta['popularity_score'] += ActivityStats.popularity_weight(completed_at)
+        if delta['last_completed_at'] is None or completed_at > delta['last_completed_at']:
+            delta['last_completed_at'] = completed_at
+
+    merge_activity_stats(deltas)
+
+
+def merge_activity_stats(deltas):
+    """
+    Add counters to activity_stats rows, creating missing ones (upsert, caller's transaction)
+
+    Args:
+        deltas: activity_id -> dict of completion_count, rating_sum, rating_count,
+                popularity_score and last_completed_at to add
+    """
+    if not deltas:
+        return
+
+    table = ActivityStats.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.activity_id],
+        set_={
+            'completion_count': table.c.completion_count + stmt.excluded.completion_count,
+            'rating_sum': table.c.rating_sum + stmt.excluded.rating_sum,
+            'rating_count': table.c.rating_count + stmt.excluded.rating_count,
+            'popularity_score': table.c.popularity_score + stmt.excluded.popularity_score,
+            'last_completed_at': func.max(
+                func.coalesce(table.c.last_completed_at, stmt.excluded.last_completed_at),
+                func.coalesce(stmt.excluded.last_completed_at, table.c.last_completed_at)
+            ),
+        }
+    )
+    db.session.execute(stmt, [{'activity_id': activity_id, **delta} for activity_id, delta in deltas.items()])
+
+
+def record_completion(user_id, activity_id, child_id=None, rating=None):
+    """
+    Record one completion (and its counters) in a single transaction
+
+    Returns:
+        True if it was new, False if it was already recorded today
+    """
+    try:
+        inserted = insert_completions([completion_row(user_id, activity_id, child_id, rating)])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return inserted > 0
+
+
+class CompletionQueue:
+    """
+    Write-behind buffer for completions
+
+    A background thread waits `flush_seconds` after the first queued row,
+    then writes everything waiting (in batches of up to `batch_size`) with
+    one executemany per transaction, so a burst takes the SQLite write lock once.
+    Rows still queued at interpreter exit are flushed by an atexit hook.
+    """
+
+    def __init__(self, flush_seconds=DEFAULT_FLUSH_SECONDS, batch_size=DEFAULT_BATCH_SIZE):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.enabled = False
+        self.flushed = 0
+        self._queue = queue.Queue()
+        self._app = None
+        self._thread = None
+        self._flush_lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Enable write-behind if the app config asks for it
+
+        Args:
+            app: Flask application instance
+        """
+        self._app = app
+        self.enabled = app.config.get('ACTIVITY_COMPLETION_WRITE_BEHIND', False)
+        self.flush_seconds = app.config.get('ACTIVITY_COMPLETION_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        app.extensions['activity_completion_queue'] = self
+
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='completion-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def submit(self, user_id, activity_id, child_id=None, rating=None):
+        """Queue a completion; it is written within flush_seconds"""
+        self._queue.put(completion_row(user_id, activity_id, child_id, rating))
+
+    def _drain(self, first=None):
+        rows = [] if first is None else [first]
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows):
+        with self._app.app_context():
+            inserted = self._insert(rows)
+        self.flushed += inserted
+        return inserted
+
+    def _insert(self, rows):
+        try:
+            inserted = insert_completions(rows)
+            db.session.commit()
+            return inserted
+        except Exception as e:
+            db.session.rollback()
+            if len(rows) == 1:
+                current_app.logger.error("Dropped queued completion %r: %s", rows[0], e)
+                return 0
+            # The route already answered these: retry one by one so only the bad row is lost
+            current_app.logger.warning("Writing %d queued completions failed (%s), retrying one by one", len(rows), e)
+            return sum(self._insert([row]) for row in rows)
+
+    def flush(self):
+        """
+        Write everything queued right now
+
+        Returns:
+            Number of completions inserted
+        """
+        inserted = 0
+        with self._flush_lock:
+            rows = self._drain()
+            while rows:
+                inserted += self._write(rows)
+                rows = self._drain()
+        return inserted
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+
+            # Let the burst build up before taking the write lock
+            time.sleep(self.flush_seconds)
+            with self._flush_lock:
+                rows = self._drain(first)
+                while rows:
+                    self._write(rows)
+                    rows = self._drain()
+
+    def __len__(self):
+        return self._queue.qsize()
+
+
+# Shared, process-level write-behind queue
+completion_queue = CompletionQueue()
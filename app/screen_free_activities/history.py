@@ -0,0 +1,208 @@
+"""
+Recently Shown Activities
+Per-user ring buffer of the activities a user was just shown,
+so "Get New Ideas" keeps serving fresh ones until the pool runs out
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+
+# Activities remembered per user, and for how long
+DEFAULT_HISTORY_SIZE = 60
+DEFAULT_HISTORY_TTL_SECONDS = 6 * 60 * 60
+
+# Users tracked at once; the least recently active user is dropped first
+DEFAULT_MAX_USERS = 10000
+
+# Random draws per requested activity before giving up on rejection sampling
+MAX_DRAWS_PER_PICK = 8
+
+
+class UserHistory:
+    """Bounded, time-limited list of activity IDs shown to one user"""
+
+    def __init__(self, size):
+        self._shown = deque(maxlen=size)  # (activity_id, shown_at), oldest first
+        self._counts = {}
+
+    def expire(self, cutoff):
+        while self._shown and self._shown[0][1] < cutoff:
+            self._forget(self._shown.popleft()[0])
+
+    def _forget(self, activity_id):
+        count = self._counts.get(activity_id, 0) - 1
+        if count > 0:
+            self._counts[activity_id] = count
+        else:
+            self._counts.pop(activity_id, None)
+
+    def add(self, activity_id, shown_at):
+        if len(self._shown) == self._shown.maxlen:
+            self._forget(self._shown[0][0])
+        self._shown.append((activity_id, shown_at))
+        self._counts[activity_id] = self._counts.get(activity_id, 0) + 1
+
+    def __contains__(self, activity_id):
+        return activity_id in self._counts
+
+    def ids(self):
+        """Distinct recently shown activity IDs"""
+        return list(self._counts)
+
+    def oldest_first(self):
+        """Recently shown IDs, least recent first (for refilling an exhausted pool)"""
+        return list(dict.fromkeys(reversed([activity_id for activity_id, _ in self._shown])))[::-1]
+
+    def __len__(self):
+        return len(self._counts)
+
+
+class RecentHistory:
+    """
+    Recently shown activities for every active user
+
+    Memory is bounded twice over: each user keeps at most `size` entries,
+    and at most `max_users` users are kept (least recently active evicted).
+    Entries older than `ttl_seconds` no longer count as recent.
+
+    Kept in process memory; with several workers each one remembers what it
+    served, which still removes most repeats.
+    """
+
+    def __init__(self, size=DEFAULT_HISTORY_SIZE, ttl_seconds=DEFAULT_HISTORY_TTL_SECONDS,
+                 max_users=DEFAULT_MAX_USERS):
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Read history limits from the app config
+
+        Args:
+            app: Flask application instance
+        """
+        self.size = app.config.get('ACTIVITY_HISTORY_SIZE', DEFAULT_HISTORY_SIZE)
+        self.ttl_seconds = app.config.get('ACTIVITY_HISTORY_TTL_SECONDS', DEFAULT_HISTORY_TTL_SECONDS)
+        app.extensions['activity_history'] = self
+
+    def recent(self, user_key):
+        """
+        Get a user's recent history (expired entries dropped)
+
+        Args:
+            user_key: Session user ID, or None for anonymous callers
+
+        Returns:
+            UserHistory, or None if the user has no recent history
+        """
+        if user_key is None:
+            return None
+
+        with self._lock:
+            history = self._users.get(user_key)
+            if history is None:
+                return None
+            history.expire(time.monotonic() - self.ttl_seconds)
+            return history
+
+    def record(self, user_key, activity_ids):
+        """
+        Remember activities that were just shown to a user
+
+        Args:
+            user_key: Session user ID, or None for anonymous callers
+            activity_ids: IDs of the activities in the response
+        """
+        if user_key is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            history = self._users.get(user_key)
+            if history is None:
+                history = self._users[user_key] = UserHistory(self.size)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_key)
+
+            history.expire(now - self.ttl_seconds)
+            for activity_id in activity_ids:
+                history.add(activity_id, now)
+
+    def __len__(self):
+        return len(self._users)
+
+
+def sample_fresh_positions(catalog, positions, limit, history=None, chosen=None):
+    """
+    Randomly pick catalog positions, skipping recently shown activities
+
+    Costs O(limit + history size), never O(catalog): a pool that is large
+    compared to the history is rejection-sampled, and only a pool within a
+    constant factor of limit + history is scanned outright. When there are
+    not enough fresh activities, the least recently shown ones fill the rest.
+
+    Args:
+        catalog: CatalogSnapshot the positions belong to
+        positions: Sorted numpy array of candidate catalog positions
+        limit: Number of positions to pick
+        history: UserHistory to avoid, or None
+        chosen: Set of positions already picked by the caller (updated in place)
+
+    Returns:
+        list of picked positions
+    """
+    chosen = set() if chosen is None else chosen
+    pool_size = len(positions)
+    limit = min(limit, pool_size)
+    if limit <= 0:
+        return []
+
+    def is_fresh(position):
+        return position not in chosen and (history is None or catalog.activities[position].id not in history)
+
+    excluded = len(chosen) + (len(history) if history is not None else 0)
+    picked = []
+
+    if pool_size <= MAX_DRAWS_PER_PICK * (limit + excluded):
+        # Small pool: a full pass is as cheap as sampling
+        fresh = [int(position) for position in positions if is_fresh(int(position))]
+        picked = random.sample(fresh, min(limit, len(fresh)))
+        chosen.update(picked)
+    else:
+        # At least 7/8 of the pool is fresh, so few draws are wasted
+        draws = 0
+        while len(picked) < limit and draws < limit * MAX_DRAWS_PER_PICK:
+            position = int(positions[random.randrange(pool_size)])
+            draws += 1
+            if is_fresh(position):
+                picked.append(position)
+                chosen.add(position)
+
+    # Pool exhausted: repeat the least recently shown activities
+    if len(picked) < limit and history is not None:
+        for activity_id in history.oldest_first():
+            if len(picked) >= limit:
+                break
+            position = catalog.position_of.get(activity_id)
+            if position is None or position in chosen:
+                continue
+            index = np.searchsorted(positions, position)
+            if index < pool_size and positions[index] == position:
+                picked.append(position)
+                chosen.add(position)
+
+    return picked
+
+
+# Shared, process-level history
+activity_history = RecentHistory()
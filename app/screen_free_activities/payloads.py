@@ -0,0 +1,90 @@
+"""
+Activity Payload Cache
+Serialized JSON for each (activity_id, language, fields), computed once
+per catalog version instead of on every API call
+"""
+
+import json
+import threading
+
+from flask import current_app
+
+from app.screen_free_activities.catalog import activity_catalog
+
+
+# Supported field-selection modes (see Activity.to_dict)
+PAYLOAD_FIELDS = ('full', 'card')
+
+
+def normalize_fields(fields):
+    """Fall back to the full payload for unknown field modes"""
+    return fields if fields in PAYLOAD_FIELDS else 'full'
+
+
+class PayloadCache:
+    """
+    Serialized activity payloads, valid for one catalog version
+
+    Activities are global and only change when the catalog is rebuilt,
+    so the whole cache is dropped whenever the catalog version changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._payloads = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, activity, language='en', fields='full', version=None):
+        """
+        Get the serialized JSON payload for an activity
+
+        Args:
+            activity: Activity object
+            language: 'en' or 'ar'
+            fields: 'full' or 'card'
+            version: Catalog version the payload belongs to
+
+        Returns:
+            JSON string
+        """
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._payloads = {}
+                    self._version = version
+
+        language = 'ar' if language == 'ar' else 'en'
+        key = (activity.id, language, fields)
+
+        payload = self._payloads.get(key)
+        if payload is None:
+            self.misses += 1
+            payload = json.dumps(activity.to_dict(language=language, fields=fields), ensure_ascii=False)
+            self._payloads[key] = payload
+        else:
+            self.hits += 1
+
+        return payload
+
+    def __len__(self):
+        return len(self._payloads)
+
+
+# Shared, process-level payload cache
+payload_cache = PayloadCache()
+
+
+def activity_response(activity, language='en', fields='full'):
+    """Build a JSON response for one activity from the payload cache"""
+    version = activity_catalog.snapshot().version
+    body = payload_cache.get(activity, language, fields, version)
+    return current_app.response_class(body, mimetype='application/json')
+
+
+def activities_response(activities, language='en', fields='full'):
+    """Build a JSON array response for a list of activities from the payload cache"""
+    version = activity_catalog.snapshot().version
+    body = '[' + ','.join(payload_cache.get(activity, language, fields, version) for activity in activities) + ']'
+    return current_app.response_class(body, mimetype='application/json')
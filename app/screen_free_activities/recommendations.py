@@ -0,0 +1,80 @@
+"""
+Activity Recommendations
+Reads the top-N lists precomputed by utils/build_recommendations.py;
+every lookup is a primary-key range read, independent of catalog size
+"""
+
+import numpy as np
+from sqlalchemy import select
+
+from db.models import db, ActivityCatalogVersion, ActivityCompletion, ActivitySimilarity, UserRecommendation
+from app.screen_free_activities.catalog_versions import counterparts_in_version
+
+
+def recommended_activity_ids(user_id):
+    """
+    Get a user's recommended activities, best first
+
+    Users the last build already knew get their own list. Users who only
+    started completing activities since then get the activities most similar
+    to their latest completion (mapped into the live catalog, since the lists
+    are built on live IDs). Everyone else gets an empty list (cold start).
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        list of activity IDs
+    """
+    activity_ids = list(db.session.execute(
+        select(UserRecommendation.activity_id)
+        .where(UserRecommendation.user_id == user_id)
+        .order_by(UserRecommendation.rank)
+    ).scalars())
+    if activity_ids:
+        return activity_ids
+
+    latest_completed = db.session.execute(
+        select(ActivityCompletion.activity_id)
+        .where(ActivityCompletion.user_id == user_id)
+        .order_by(ActivityCompletion.completed_at.desc())
+        .limit(1)
+    ).scalar()
+    if latest_completed is None:
+        return []
+
+    latest_completed = counterparts_in_version([latest_completed], ActivityCatalogVersion.live_id()).get(latest_completed)
+    if latest_completed is None:
+        return []
+
+    return list(db.session.execute(
+        select(ActivitySimilarity.similar_activity_id)
+        .where(ActivitySimilarity.activity_id == latest_completed)
+        .order_by(ActivitySimilarity.rank)
+    ).scalars())
+
+
+def recommended_positions(catalog, candidate_positions, user_id, k):
+    """
+    Map a user's recommendations onto the current candidate pool
+
+    Args:
+        catalog: CatalogSnapshot
+        candidate_positions: Sorted numpy array of catalog positions passing the filters
+        user_id: User ID
+        k: Maximum number of positions to return
+
+    Returns:
+        numpy array of up to k positions, best recommendation first
+    """
+    picked = []
+    for activity_id in recommended_activity_ids(user_id):
+        position = catalog.position_of.get(activity_id)
+        if position is None:
+            continue
+        index = np.searchsorted(candidate_positions, position)
+        if index < len(candidate_positions) and candidate_positions[index] == position:
+            picked.append(position)
+            if len(picked) >= k:
+                break
+    return np.array(picked, dtype=np.intp)
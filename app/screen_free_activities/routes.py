@@ -1,6 +1,13 @@
-from flask import Blueprint, render_template, jsonify, request, session, redirect, url_for
+from flask import Blueprint, render_template, jsonify, request, session, redirect, url_for, current_app
 from db.models import db, Activity, User, FamilyProfile, Child, ActivityCompletion
-from sqlalchemy import func
+from app.screen_free_activities.catalog import activity_catalog
+from app.screen_free_activities.sampling import sample_activities, load_activities, popular_activity_ids
+from app.screen_free_activities.payloads import activity_response, activities_response, normalize_fields
+from app.screen_free_activities.history import activity_history, sample_fresh_positions
+from app.screen_free_activities.completions import completion_queue, record_completion
+from app.screen_free_activities.recommendations import recommended_positions
+from db.activity_search import search_activity_ids
+import numpy as np
 import random
 
 # Create blueprint
@@ -13,6 +20,9 @@ screen_free_bp = Blueprint(
     static_url_path='/activities/static'
 )
 
+# Upper bound for ?limit= on the search endpoint
+MAX_SEARCH_RESULTS = 50
+
 
 @screen_free_bp.route('/')
 def activities_list():
@@ -41,79 +51,70 @@ def activities_list():
     # Get filters from query params
     category_filter = request.args.get('category', 'all')
     child_filter = request.args.get('child', 'all')
+    home_only = request.args.get('home_only') == '1'
+    sort = request.args.get('sort', 'default')
     language = request.args.get('lang', family_profile.language if family_profile else 'en')
     
-    # Base query - get all activities
-    query = Activity.query
-    
-    # Filter by category if specified
-    if category_filter != 'all':
-        query = query.filter_by(category=category_filter)
-    
     # Filter by child's age if specified
     selected_child = None
+    age_range = None
     if child_filter != 'all':
         try:
             child_id = int(child_filter)
             selected_child = Child.query.get(child_id)
             if selected_child:
                 age_range = selected_child.get_age_range()
-                query = query.filter_by(age_range=age_range)
         except (ValueError, TypeError):
             pass
     
-    # Get all matching activities
-    all_activities = query.all()
+    # Get all matching activities from the in-memory catalog
+    catalog = activity_catalog.snapshot()
+    candidate_positions = catalog.select_positions(category=category_filter, age_range=age_range)
+    
+    # Only activities this home has everything for
+    if home_only:
+        candidate_positions = candidate_positions[catalog.scoring.covered_mask(candidate_positions, home_resources)]
+    
+    if sort == 'popular':
+        # Popular this week: a full page ranked by the running activity_stats counters
+        top_count = 6
+        popular_ids = popular_activity_ids(
+            category=category_filter,
+            age_range=age_range,
+            limit=top_count,
+            home_resources=home_resources if home_only else None
+        )
+        leading = [catalog.position_of[activity_id] for activity_id in popular_ids if activity_id in catalog.position_of]
+        top_positions = np.array(leading, dtype=np.intp)
+    else:
+        # Collaborative filtering first (precomputed by utils/build_recommendations.py)
+        top_count = 4 if len(candidate_positions) > 6 else 6
+        top_positions = recommended_positions(catalog, candidate_positions, user_id, top_count)
+    remaining_positions = np.setdiff1d(candidate_positions, top_positions)
     
-    # Smart sorting: prioritize activities matching home resources and interests
-    if all_activities:
-        scored_activities = []
+    # Smart sorting fills the rest (and serves cold-start users):
+    # prioritize activities matching home resources and interests
+    if len(top_positions) < top_count:
         child_interests = selected_child.get_interests() if selected_child else []
-        
-        for activity in all_activities:
-            score = 0
-            
-            # Boost score if matches child's interests
-            if child_interests:
-                # Map category to interests
-                category_interest_map = {
-                    'games': 'sports',
-                    'cooking': 'cooking',
-                    'creative': 'arts',
-                    'nature': 'outdoor',
-                    'reading': 'reading',
-                    'science': 'science'
-                }
-                if activity.category in category_interest_map:
-                    if category_interest_map[activity.category] in child_interests:
-                        score += 10
-            
-            # Boost score if matches home resources
-            activity_requirements = activity.get_home_requirements()
-            if activity_requirements:
-                for req in activity_requirements:
-                    if req in home_resources:
-                        score += 5
-            
-            scored_activities.append((activity, score))
-        
-        # Sort by score (highest first)
-        scored_activities.sort(key=lambda x: x[1], reverse=True)
-        
-        # Select top activities (max 6)
-        if len(scored_activities) > 6:
-            # Take some high-scored and some random for variety
-            top_activities = [act for act, score in scored_activities[:4]]
-            remaining = [act for act, score in scored_activities[4:]]
-            if len(remaining) >= 2:
-                top_activities.extend(random.sample(remaining, 2))
-            else:
-                top_activities.extend(remaining)
-            activities = top_activities
+        scored_positions, remaining_positions = catalog.scoring.top_k(
+            remaining_positions,
+            home_resources=home_resources,
+            interests=child_interests,
+            k=top_count - len(top_positions)
+        )
+        top_positions = np.concatenate([top_positions, scored_positions])
+    activities = catalog.activities_at(top_positions)
+    
+    # Take some high-scored and some random for variety (the popular view stays ranked)
+    if sort != 'popular':
+        if len(remaining_positions) >= 2:
+            picks = random.sample(range(len(remaining_positions)), 2)
+            activities.extend(catalog.activities_at(remaining_positions[picks]))
         else:
-            activities = [act for act, score in scored_activities]
-    else:
-        activities = []
+            activities.extend(catalog.activities_at(remaining_positions))
+    
+    # "Get New Ideas" should move past what the page already shows
+    activity_history.record(user_id, [activity.id for activity in activities])
     
     return render_template(
         'activities_list.html',
@@ -123,8 +124,10 @@ def activities_list():
         language=language,
         category_filter=category_filter,
         child_filter=child_filter,
+        sort=sort,
+        home_only=home_only,
         user_name=user_name,
-        total_activities=len(all_activities)
+        total_activities=len(candidate_positions)
     )
 
 
@@ -132,78 +135,111 @@ def activities_list():
 def api_get_activities():
     """
     API endpoint to get activities (for "Get New Ideas" button)
-    Returns different random activities each time
+    Returns different random activities each time,
+    or the most popular ones this week with sort=popular (topped up with
+    random ones while few activities have stats, e.g. after a catalog swap)
     """
     category_filter = request.args.get('category', 'all')
     child_filter = request.args.get('child', 'all')
     language = request.args.get('lang', 'en')
     limit = int(request.args.get('limit', 6))
+    fields = normalize_fields(request.args.get('fields', 'full'))
+    home_only = request.args.get('home_only') == '1'
     
-    # Base query
-    query = Activity.query
-    
-    # Filter by category
-    if category_filter != 'all':
-        query = query.filter_by(category=category_filter)
+    # Home resources for the "needs only what this home has" filter
+    home_resources = None
+    if home_only:
+        family_profile = FamilyProfile.query.filter_by(user_id=session.get('user_id')).first()
+        home_resources = family_profile.get_home_resources() if family_profile else []
     
     # Filter by child's age if specified
+    age_range = None
     if child_filter != 'all':
         try:
             child_id = int(child_filter)
             selected_child = Child.query.get(child_id)
             if selected_child:
                 age_range = selected_child.get_age_range()
-                print(f"DEBUG API: Child {selected_child.name}, Age: {selected_child.get_age()}, Age Range: {age_range}")
-                query = query.filter_by(age_range=age_range)
         except (ValueError, TypeError):
             pass  # Invalid child_filter, ignore
     
-    # Get ALL matching activities first
-    all_activities = query.all()
+    user_id = session.get('user_id')
+    
+    # Popular this week: ranked by the running activity_stats counters
+    popular = []
+    if request.args.get('sort') == 'popular':
+        activity_ids = popular_activity_ids(
+            category=category_filter,
+            age_range=age_range,
+            limit=limit,
+            home_resources=home_resources
+        )
+        popular = [activity_catalog.get(activity_id) for activity_id in activity_ids]
+        if None in popular:
+            popular = load_activities(activity_ids, language, fields)
+        if len(popular) >= limit:
+            return activities_response(popular, language=language, fields=fields)
+        # Too few have stats yet: the random picks below fill the page
+        activity_history.record(user_id, [activity.id for activity in popular])
+    
+    # Skip what this user was just shown, until the pool runs out
+    history = activity_history.recent(user_id)
+    remaining = limit - len(popular)
+    
+    # Large catalogs: sample in the database, loading only the needed columns
+    if current_app.config.get('ACTIVITY_SAMPLING_SOURCE') == 'database':
+        popular_ids = {activity.id for activity in popular}
+        sampled = sample_activities(
+            category=category_filter,
+            age_range=age_range,
+            limit=remaining,
+            language=language,
+            fields=fields,
+            home_resources=home_resources,
+            history=history
+        )
+        activities = popular + [activity for activity in sampled if activity.id not in popular_ids]
+        activity_history.record(user_id, [activity.id for activity in activities])
+        return activities_response(activities, language=language, fields=fields)
+    
+    # Candidate positions in the in-memory catalog (never materialized as objects)
+    catalog = activity_catalog.snapshot()
+    positions = catalog.select_positions(category=category_filter, age_range=age_range)
+    if home_resources is not None:
+        positions = positions[catalog.scoring.covered_mask(positions, home_resources)]
+    
+    chosen = {catalog.position_of[activity.id] for activity in popular if activity.id in catalog.position_of}
+    picked = []
     
     # If "All Activities" is selected and no child filter, get diverse selection
     if category_filter == 'all' and child_filter == 'all':
-        # Group activities by category
-        from collections import defaultdict
-        activities_by_category = defaultdict(list)
-        for activity in all_activities:
-            activities_by_category[activity.category].append(activity)
-        
-        # Try to get at least one from each category if possible
-        diverse_activities = []
-        categories = list(activities_by_category.keys())
-        
         # First pass: get one from each category
+        categories = list(dict.fromkeys(category for category, _ in catalog.index))
         for category in categories:
-            if len(diverse_activities) < limit and activities_by_category[category]:
-                activity = random.choice(activities_by_category[category])
-                diverse_activities.append(activity)
-                activities_by_category[category].remove(activity)
-        
-        # Second pass: fill remaining slots randomly from remaining activities
-        remaining = []
-        for cat_activities in activities_by_category.values():
-            remaining.extend(cat_activities)
-        
-        if remaining and len(diverse_activities) < limit:
-            needed = limit - len(diverse_activities)
-            if len(remaining) >= needed:
-                diverse_activities.extend(random.sample(remaining, needed))
-            else:
-                diverse_activities.extend(remaining)
-        
-        all_activities = diverse_activities
-    
-    # If we have more activities than requested, randomly sample WITHOUT replacement
-    if len(all_activities) > limit:
-        activities = random.sample(all_activities, limit)
-    else:
-        activities = all_activities
+            if len(picked) >= remaining:
+                break
+            category_positions = catalog.select_positions(category=category)
+            if home_resources is not None:
+                category_positions = category_positions[catalog.scoring.covered_mask(category_positions, home_resources)]
+            picked += sample_fresh_positions(catalog, category_positions, 1, history, chosen)
+    
+    # Fill remaining slots randomly, WITHOUT replacement
+    picked += sample_fresh_positions(catalog, positions, remaining - len(picked), history, chosen)
     
-    # Convert to dict - this ensures unique activities
-    activities_data = [activity.to_dict(language=language) for activity in activities]
+    activities = popular + catalog.activities_at(picked)
+    activity_history.record(user_id, [activity.id for activity in activities])
     
-    return jsonify(activities_data)
+    # Serialize from the cached per-language payloads
+    return activities_response(activities, language=language, fields=fields)
+
+def _id_value(value):
+    """A positive integer ID from a JSON value (int or digit string), else None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    return value if isinstance(value, int) and value > 0 else None
+
 
 @screen_free_bp.route('/api/complete', methods=['POST'])
 def api_complete_activity():
@@ -214,30 +250,35 @@ def api_complete_activity():
     if not user_id:
         return jsonify({'success': False, 'error': 'Not logged in'})
     
-    data = request.get_json()
-    activity_id = data.get('activity_id')
+    data = request.get_json(silent=True) or {}
+    activity_id = _id_value(data.get('activity_id'))
+    child_id = data.get('child_id')
+    rating = data.get('rating')
     
-    if not activity_id:
+    # Checked up front: with write-behind the client is answered before the row is written
+    if activity_id is None:
         return jsonify({'success': False, 'error': 'Missing activity_id'})
+    if db.session.query(Activity.id).filter(Activity.id == activity_id).scalar() is None:
+        return jsonify({'success': False, 'error': 'Activity not found'})
+    if child_id is not None:
+        child_id = _id_value(child_id)
+        family_profile = FamilyProfile.query.filter_by(user_id=user_id).first()
+        if child_id is None or family_profile is None or Child.query.filter_by(
+                id=child_id, family_profile_id=family_profile.id).first() is None:
+            return jsonify({'success': False, 'error': 'Child not found'})
+    # bool is an int subclass: True would pass as a 1-star rating
+    if rating is not None and (isinstance(rating, bool) or rating not in (1, 2, 3, 4, 5)):
+        return jsonify({'success': False, 'error': 'Rating must be 1-5'})
     
-    # Check if already completed
-    existing = ActivityCompletion.query.filter_by(
-        user_id=user_id,
-        activity_id=activity_id
-    ).first()
+    # Write-behind: acknowledge now, land the burst in one batched write
+    if completion_queue.enabled:
+        completion_queue.submit(user_id, activity_id, child_id, rating)
+        return jsonify({'success': True, 'message': 'Activity completed!'})
     
-    if existing:
+    # One INSERT ... ON CONFLICT DO NOTHING against the daily unique index
+    if not record_completion(user_id, activity_id, child_id, rating):
         return jsonify({'success': True, 'message': 'Already completed'})
     
-    # Create new completion
-    completion = ActivityCompletion(
-        user_id=user_id,
-        activity_id=activity_id
-    )
-    
-    db.session.add(completion)
-    db.session.commit()
-    
     return jsonify({'success': True, 'message': 'Activity completed!'})
 
 
@@ -276,7 +317,45 @@ def api_get_activity(activity_id):
     Used when opening the activity detail modal
     """
     language = request.args.get('lang', 'en')
+    fields = normalize_fields(request.args.get('fields', 'full'))
+    
+    activity = activity_catalog.get(activity_id) or Activity.query.get_or_404(activity_id)
+    
+    return activity_response(activity, language=language, fields=fields)
+
+@screen_free_bp.route('/api/search')
+def api_search_activities():
+    """
+    Full-text search over activity titles, descriptions and steps
+    Works in English and Arabic; best matches first
+    """
+    query = request.args.get('q', '').strip()
+    category_filter = request.args.get('category', 'all')
+    child_filter = request.args.get('child', 'all')
+    language = request.args.get('lang', 'en')
+    fields = normalize_fields(request.args.get('fields', 'card'))
+    try:
+        limit = min(int(request.args.get('limit', 20)), MAX_SEARCH_RESULTS)
+    except (ValueError, TypeError):
+        limit = 20
+    
+    # Filter by child's age if specified
+    age_range = None
+    if child_filter != 'all':
+        try:
+            selected_child = Child.query.get(int(child_filter))
+            if selected_child:
+                age_range = selected_child.get_age_range()
+        except (ValueError, TypeError):
+            pass
+    
+    activity_ids = search_activity_ids(query, category=category_filter, age_range=age_range, limit=limit)
     
-    activity = Activity.query.get_or_404(activity_id)
+    # Serve from the in-memory catalog; load anything it doesn't have yet
+    activities = [activity_catalog.get(activity_id) for activity_id in activity_ids]
+    missing = [activity_id for activity_id, activity in zip(activity_ids, activities) if activity is None]
+    if missing:
+        loaded = {activity.id: activity for activity in load_activities(missing, language, fields)}
+        activities = [activity or loaded.get(activity_id) for activity_id, activity in zip(activity_ids, activities)]
     
-    return jsonify(activity.to_dict(language=language))
\ No newline at end of file
+    return activities_response([activity for activity in activities if activity], language=language, fields=fields)
@@ -0,0 +1,162 @@
+"""
+Database-side Activity Sampling
+Picks random activity IDs inside SQLite, then loads only those rows
+and only the columns an activity card needs
+"""
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only
+
+from db.models import db, Activity, ActivityHomeRequirement, ActivityStats
+
+
+def covered_by_home(home_resources):
+    """
+    SQL condition: the activity needs no home area outside home_resources
+
+    Args:
+        home_resources: list of home resource keys the family has
+
+    Returns:
+        SQLAlchemy boolean expression on Activity
+    """
+    uncovered = select(ActivityHomeRequirement.activity_id).where(
+        ActivityHomeRequirement.activity_id == Activity.id,
+        ActivityHomeRequirement.requirement.notin_(home_resources)
+    ).exists()
+    return ~uncovered
+
+
+def activity_filters(category='all', age_range=None, home_resources=None):
+    """
+    WHERE clauses for live activities matching the list filters
+
+    Returns:
+        list of SQL expressions
+    """
+    filters = [Activity.live_filter()]
+    if category != 'all':
+        filters.append(Activity.category == category)
+    if age_range:
+        filters.append(Activity.age_range == age_range)
+    if home_resources is not None:
+        filters.append(covered_by_home(home_resources))
+    return filters
+
+
+def popular_activity_ids(category='all', age_range=None, limit=6, home_resources=None):
+    """
+    Most popular activities this week, from the running activity_stats counters
+    (never aggregates activity_completions)
+
+    Args:
+        category: Category key, or 'all' for every category
+        age_range: Age range string, or None for every age range
+        limit: Number of IDs to return
+        home_resources: If given, only activities this home fully covers
+
+    Returns:
+        list of activity IDs, most popular first
+    """
+    stmt = (
+        select(Activity.id)
+        .join(ActivityStats, ActivityStats.activity_id == Activity.id)
+        .where(*activity_filters(category, age_range, home_resources))
+        .order_by(ActivityStats.popularity_score.desc(), Activity.id)
+        .limit(limit)
+    )
+    return list(db.session.execute(stmt).scalars())
+
+
+def sample_activity_ids(category='all', age_range=None, limit=6, round_robin=False, home_resources=None,
+                        exclude_ids=None):
+    """
+    Pick random activity IDs in the database
+
+    Args:
+        category: Category key, or 'all' for every category
+        age_range: Age range string, or None for every age range
+        limit: Number of IDs to pick
+        round_robin: Take one activity per category in turn (for the "all" view)
+        home_resources: If given, only activities this home fully covers
+        exclude_ids: Activity IDs to skip (e.g. recently shown ones)
+
+    Returns:
+        list of activity IDs, in display order
+    """
+    filters = activity_filters(category, age_range, home_resources)
+    if exclude_ids:
+        filters.append(Activity.id.notin_(exclude_ids))
+
+    if round_robin:
+        # Rank activities randomly within each category, then take all
+        # rank-1 rows first, then rank-2 rows, and so on
+        rank = func.row_number().over(
+            partition_by=Activity.category,
+            order_by=func.random()
+        ).label('rank')
+        ranked = select(Activity.id, rank).where(*filters).subquery()
+        stmt = (
+            select(ranked.c.id)
+            .where(ranked.c.rank <= limit)
+            .order_by(ranked.c.rank, func.random())
+            .limit(limit)
+        )
+    else:
+        stmt = select(Activity.id).where(*filters).order_by(func.random()).limit(limit)
+
+    return list(db.session.execute(stmt).scalars())
+
+
+def load_activities(activity_ids, language='en', fields='full'):
+    """
+    Load activities by ID, keeping large text columns deferred for cards
+
+    Args:
+        activity_ids: list of activity IDs
+        language: 'en' or 'ar'
+        fields: 'card' loads only the card columns, 'full' loads every column
+
+    Returns:
+        list of Activity objects, in the same order as activity_ids
+    """
+    if not activity_ids:
+        return []
+
+    query = Activity.query
+    if fields == 'card':
+        query = query.options(load_only(*Activity.card_columns(language)))
+    activities = query.filter(Activity.id.in_(activity_ids)).all()
+
+    by_id = {activity.id: activity for activity in activities}
+    return [by_id[activity_id] for activity_id in activity_ids if activity_id in by_id]
+
+
+def sample_activities(category='all', age_range=None, limit=6, language='en', fields='full', home_resources=None,
+                      history=None):
+    """
+    Sample random activities in the database
+
+    Recently shown activities (history) are skipped; if too few fresh ones
+    are left, the rest is topped up from the recently shown ones.
+
+    Returns:
+        list of Activity objects
+    """
+    round_robin = category == 'all' and age_range is None
+    recent_ids = history.ids() if history is not None else []
+    activity_ids = sample_activity_ids(
+        category, age_range, limit,
+        round_robin=round_robin,
+        home_resources=home_resources,
+        exclude_ids=recent_ids
+    )
+
+    if recent_ids and len(activity_ids) < limit:
+        activity_ids += sample_activity_ids(
+            category, age_range, limit - len(activity_ids),
+            home_resources=home_resources,
+            exclude_ids=activity_ids
+        )
+
+    return load_activities(activity_ids, language, fields)
@@ -0,0 +1,131 @@
+"""
+Activity Scoring Engine
+Encodes activities as fixed-width NumPy arrays once, then scores whole
+candidate sets against a family's home resources and a child's interests
+in a single vectorized operation
+"""
+
+import numpy as np
+
+
+# Activity category -> child interest it appeals to
+CATEGORY_INTEREST_MAP = {
+    'games': 'sports',
+    'cooking': 'cooking',
+    'creative': 'arts',
+    'nature': 'outdoor',
+    'reading': 'reading',
+    'science': 'science'
+}
+
+# Score weights
+INTEREST_SCORE = 10
+RESOURCE_SCORE = 5
+
+
+class ScoringEngine:
+    """
+    Pre-encoded feature arrays for a fixed list of activities
+
+    - requirement_matrix: (activities x home resources) count of each requirement
+    - category_codes: (activities,) index of each activity's category
+    """
+
+    def __init__(self, activities):
+        """
+        Args:
+            activities: list of Activity objects, in catalog order
+        """
+        requirements_per_activity = [activity.get_home_requirements() for activity in activities]
+
+        resources = sorted({req for reqs in requirements_per_activity for req in reqs})
+        self.resource_columns = {resource: column for column, resource in enumerate(resources)}
+
+        categories = sorted({activity.category for activity in activities})
+        self.category_columns = {category: column for column, category in enumerate(categories)}
+
+        self.requirement_matrix = np.zeros((len(activities), len(resources)), dtype=np.int16)
+        for row, reqs in enumerate(requirements_per_activity):
+            for req in reqs:
+                self.requirement_matrix[row, self.resource_columns[req]] += 1
+
+        self.category_codes = np.array(
+            [self.category_columns[activity.category] for activity in activities],
+            dtype=np.intp
+        )
+
+    def encode_resources(self, home_resources):
+        """Encode a family's home resources as a 0/1 vector over resource columns"""
+        vector = np.zeros(len(self.resource_columns), dtype=np.int16)
+        for resource in home_resources:
+            column = self.resource_columns.get(resource)
+            if column is not None:
+                vector[column] = 1
+        return vector
+
+    def encode_interests(self, interests):
+        """Encode a child's interests as a 0/1 vector over category columns"""
+        vector = np.zeros(len(self.category_columns), dtype=np.int16)
+        for category, column in self.category_columns.items():
+            if CATEGORY_INTEREST_MAP.get(category) in interests:
+                vector[column] = 1
+        return vector
+
+    def score(self, positions, home_resources, interests):
+        """
+        Score a candidate set of activities
+
+        Args:
+            positions: array of catalog positions to score
+            home_resources: list of home resource keys the family has
+            interests: list of the child's interests
+
+        Returns:
+            numpy array of scores, aligned with positions
+        """
+        resource_vector = self.encode_resources(home_resources)
+        interest_vector = self.encode_interests(interests)
+
+        resource_hits = self.requirement_matrix[positions] @ resource_vector
+        interest_hits = interest_vector[self.category_codes[positions]]
+
+        return RESOURCE_SCORE * resource_hits + INTEREST_SCORE * interest_hits
+
+    def covered_mask(self, positions, home_resources):
+        """
+        Which candidates need no home area outside home_resources
+
+        Returns:
+            boolean numpy array, aligned with positions
+        """
+        missing_vector = 1 - self.encode_resources(home_resources)
+        return (self.requirement_matrix[positions] @ missing_vector) == 0
+
+    def top_k(self, positions, home_resources, interests, k):
+        """
+        Select the k highest-scoring activities from a candidate set
+
+        Ties keep catalog order, like a stable sort would
+
+        Returns:
+            (top positions sorted by score, remaining positions)
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        if len(positions) <= k:
+            k = len(positions)
+
+        scores = self.score(positions, home_resources, interests)
+
+        if k == len(positions):
+            candidates = np.arange(len(positions))
+        else:
+            # Anything tied with the k-th score might belong in the top k
+            kth_score = np.partition(scores, len(scores) - k)[len(scores) - k]
+            candidates = np.flatnonzero(scores >= kth_score)
+
+        order = candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+
+        mask = np.ones(len(positions), dtype=bool)
+        mask[order] = False
+
+        return positions[order], positions[mask]
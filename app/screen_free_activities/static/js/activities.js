@@ -16,6 +16,10 @@ const translations = {
         scienceExperiments: 'Science Experiments',
         childSelection: 'Child Selection',
         allChildren: 'All Children',
+        forYou: 'For You',
+        popularThisWeek: 'Popular This Week',
+        anyActivity: 'Any Activity',
+        homeOnly: 'Only What My Home Has',
         perfectForHome: 'Perfect for Your Home',
         balconySpace: 'Balcony Space',
         kitchenAccess: 'Kitchen Access',
@@ -52,6 +56,10 @@ const translations = {
         scienceExperiments: 'تجارب علمية',
         childSelection: 'اختيار الطفل',
         allChildren: 'جميع الأطفال',
+        forYou: 'مقترحة لك',
+        popularThisWeek: 'الأكثر شيوعاً هذا الأسبوع',
+        anyActivity: 'أي نشاط',
+        homeOnly: 'ما يناسب منزلي فقط',
         perfectForHome: 'مناسب لمنزلك',
         balconySpace: 'مساحة الشرفة',
         kitchenAccess: 'الوصول للمطبخ',
@@ -119,6 +127,20 @@ function updatePageText() {
         
     }
     
+    // Sort selection
+    const sortSelectionDropdown = document.getElementById('sort-selection');
+    if (sortSelectionDropdown) {
+        sortSelectionDropdown.options[0].text = t('forYou');
+        sortSelectionDropdown.options[1].text = t('popularThisWeek');
+    }
+    
+    // Home resources selection
+    const homeSelectionDropdown = document.getElementById('home-selection');
+    if (homeSelectionDropdown) {
+        homeSelectionDropdown.options[0].text = t('anyActivity');
+        homeSelectionDropdown.options[1].text = t('homeOnly');
+    }
+    
     // Perfect for Your Home section
     const sectionTitles = document.querySelectorAll('.section-title');
     if (sectionTitles[0]) sectionTitles[0].textContent = t('perfectForHome');
@@ -259,6 +281,20 @@ function setupFilterListeners() {
             loadActivities();
         });
     }
+    
+    const sortSelectionDropdown = document.getElementById('sort-selection');
+    if (sortSelectionDropdown) {
+        sortSelectionDropdown.addEventListener('change', function() {
+            loadActivities();
+        });
+    }
+    
+    const homeSelectionDropdown = document.getElementById('home-selection');
+    if (homeSelectionDropdown) {
+        homeSelectionDropdown.addEventListener('change', function() {
+            loadActivities();
+        });
+    }
 }
 
 // Load activities via AJAX
@@ -266,8 +302,13 @@ function loadActivities() {
     const activityTypeDropdown = document.getElementById('activity-type');
     const childSelectionDropdown = document.getElementById('child-selection');
     
+    const sortSelectionDropdown = document.getElementById('sort-selection');
+    const homeSelectionDropdown = document.getElementById('home-selection');
+    
     const category = activityTypeDropdown ? activityTypeDropdown.value : 'all';
     const child = childSelectionDropdown ? childSelectionDropdown.value : 'all';
+    const sort = sortSelectionDropdown ? sortSelectionDropdown.value : 'default';
+    const homeOnly = homeSelectionDropdown ? homeSelectionDropdown.value : '0';
     
     // Show loading spinner
     loadingSpinner.style.display = 'block';
@@ -276,7 +317,7 @@ function loadActivities() {
     }
     
     // Fetch activities with current language
-    const url = `/activities/api/activities?category=${category}&child=${child}&lang=${currentLanguage}&limit=6`;
+    const url = `/activities/api/activities?category=${category}&child=${child}&sort=${sort}&home_only=${homeOnly}&lang=${currentLanguage}&limit=6&fields=card`;
     console.log('Fetching from:', url);
     
     fetch(url)
@@ -2,7 +2,7 @@
 Database initialization
 """
 
-from db.models import db, Activity, User, FamilyProfile, Child, ActivityCompletion
+from db.models import db, Activity, User, FamilyProfile, Child, ActivityCompletion, ActivityHomeRequirement, ActivityMaterial, ActivityCatalogVersion, ActivitySimilarity, UserRecommendation, ActivityStats, Meal, MealJob, LLMUsage
 
 
 def init_db(app):
@@ -17,4 +17,8 @@ def init_db(app):
     with app.app_context():
         # Create all tables
         db.create_all()
+        
+        # Bring existing databases up to date
+        from db.migrations import run_migrations
+        run_migrations()
         print("✅ Database initialized!")
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Activity Full-Text Search
+SQLite FTS5 index over the bilingual activity text; Arabic is normalized
+the same way on the way in and in queries
+"""
+
+import json
+import re
+
+from sqlalchemy import column, delete, table, text
+
+from db.models import db, ActivityCatalogVersion
+
+
+FTS_TABLE = 'activities_fts'
+FTS_COLUMNS = ('title_en', 'title_ar', 'description_en', 'description_ar', 'steps_en', 'steps_ar')
+
+# Harakat, superscript alef and Quranic marks; tatweel
+_ARABIC_MARKS_RE = re.compile(r'[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+# Alef madda/hamza/wasla -> bare alef; ta marbuta -> ha; alef maqsura -> ya
+_ARABIC_LETTERS = str.maketrans({
+    '\u0622': '\u0627', '\u0623': '\u0627', '\u0625': '\u0627', '\u0671': '\u0627',
+    '\u0629': '\u0647', '\u0649': '\u064a',
+})
+
+# Definite article, alone or after wa/fa/bi/ka/li ("al-", "wal-", "bil-", "lil-")
+_ARABIC_ARTICLE_RE = re.compile(r'(?<!\w)(?:[\u0648\u0641\u0628\u0643\u0644]?\u0627\u0644|\u0644\u0644)(?=\w\w)')
+
+_QUERY_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(value):
+    """
+    Normalize text for indexing and querying
+    Strips Arabic diacritics, tatweel and the definite article, and unifies
+    alef, ta marbuta and alef maqsura variants
+    (Latin case and accents are folded by the FTS tokenizer)
+
+    Args:
+        value: Text, or None
+
+    Returns:
+        Normalized string
+    """
+    if not value:
+        return ''
+    value = _ARABIC_MARKS_RE.sub('', value).translate(_ARABIC_LETTERS)
+    return _ARABIC_ARTICLE_RE.sub('', value)
+
+
+def _steps_text(steps_json):
+    steps = json.loads(steps_json) if steps_json else []
+    return ' '.join(str(step) for step in steps)
+
+
+def fts_row(activity_id, row):
+    """
+    Build an activities_fts row from an activities row
+
+    Args:
+        activity_id: Activity ID (becomes the FTS rowid)
+        row: Mapping with the activity's text columns (steps as JSON)
+
+    Returns:
+        Row dict for index_activity_rows
+    """
+    return {
+        'rowid': activity_id,
+        'title_en': normalize_text(row.get('title_en')),
+        'title_ar': normalize_text(row.get('title_ar')),
+        'description_en': normalize_text(row.get('description_en')),
+        'description_ar': normalize_text(row.get('description_ar')),
+        'steps_en': normalize_text(_steps_text(row.get('steps_en'))),
+        'steps_ar': normalize_text(_steps_text(row.get('steps_ar'))),
+    }
+
+
+def create_search_index():
+    """Create the FTS5 table (no-op if it exists)"""
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{', '.join(FTS_COLUMNS)}, tokenize='unicode61 remove_diacritics 2')"
+    ))
+
+
+def index_activity_rows(fts_rows):
+    """
+    Add activities to the search index (one executemany, caller's transaction)
+
+    Args:
+        fts_rows: Row dicts from fts_row
+    """
+    if not fts_rows:
+        return
+    db.session.execute(text(
+        f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+        f"VALUES (:rowid, {', '.join(':' + column for column in FTS_COLUMNS)})"
+    ), fts_rows)
+
+
+def unindex_activities(activity_ids):
+    """
+    Remove activities from the search index (caller's transaction)
+
+    Args:
+        activity_ids: List of IDs, or a subquery selecting them
+    """
+    fts = table(FTS_TABLE, column('rowid'))
+    db.session.execute(delete(fts).where(fts.c.rowid.in_(activity_ids)))
+
+
+def reindex_activities(chunk_size=1000):
+    """
+    Rebuild the search index from the activities table
+
+    Returns:
+        Number of indexed activities
+    """
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+
+    indexed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(text(
+            "SELECT id, title_en, title_ar, description_en, description_ar, steps_en, steps_ar "
+            "FROM activities WHERE id > :last_id ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': chunk_size}).mappings().all()
+
+        if not rows:
+            break
+
+        index_activity_rows([fts_row(row['id'], row) for row in rows])
+        indexed += len(rows)
+        last_id = rows[-1]['id']
+
+    return indexed
+
+
+def build_match_query(query):
+    """
+    Turn user input into a safe FTS5 MATCH expression
+    Every word must match, the last one as a prefix (search-as-you-type)
+
+    Returns:
+        MATCH string, or None if the query has no searchable words
+    """
+    terms = _QUERY_TERM_RE.findall(normalize_text(query))
+    if not terms:
+        return None
+
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_activity_ids(query, category='all', age_range=None, limit=20):
+    """
+    Search live activities, best matches first (BM25, titles weighted up)
+
+    Args:
+        query: Free text in English or Arabic
+        category: Category key, or 'all' for every category
+        age_range: Age range string, or None for every age range
+        limit: Maximum number of results
+
+    Returns:
+        list of activity IDs
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    live_id = ActivityCatalogVersion.live_id()
+    conditions = [f"{FTS_TABLE} MATCH :match"]
+    params = {'match': match, 'limit': limit}
+
+    if live_id is None:
+        conditions.append("a.catalog_version_id IS NULL")
+    else:
+        conditions.append("a.catalog_version_id = :live_id")
+        params['live_id'] = live_id
+    if category != 'all':
+        conditions.append("a.category = :category")
+        params['category'] = category
+    if age_range:
+        conditions.append("a.age_range = :age_range")
+        params['age_range'] = age_range
+
+    # Every match is ranked, so a common word still returns the best ones.
+    # CROSS JOIN keeps the FTS index as the outer loop; otherwise SQLite may
+    # scan activities by version and probe the index once per row.
+    # Column weights follow FTS_COLUMNS: titles > descriptions > steps
+    return list(db.session.execute(text(
+        f"SELECT a.id FROM {FTS_TABLE} CROSS JOIN activities a ON a.id = {FTS_TABLE}.rowid "
+        f"WHERE {' AND '.join(conditions)} "
+        f"ORDER BY bm25({FTS_TABLE}, 10.0, 10.0, 3.0, 3.0, 1.0, 1.0) LIMIT :limit"
+    ), params).scalars())
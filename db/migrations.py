@@ -0,0 +1,320 @@
+"""
+Database Migrations
+db.create_all() only creates missing tables. These steps bring existing
+databases up to date (new indexes, columns and data backfills) and run
+once each, in order, when the app starts.
+"""
+
+import json
+from datetime import datetime
+
+from sqlalchemy import text
+
+from db.models import db, ActivityStats
+from db.activity_search import create_search_index, reindex_activities
+
+
+# Ordered list of (name, function)
+MIGRATIONS = []
+
+
+def migration(name):
+    """Register a migration step under a unique, ordered name"""
+    def register(func):
+        MIGRATIONS.append((name, func))
+        return func
+    return register
+
+
+def run_migrations():
+    """
+    Apply all pending migrations
+    Must be called inside an app context, after db.create_all()
+
+    Returns:
+        list of applied migration names
+    """
+    db.session.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name VARCHAR(100) PRIMARY KEY, applied_at DATETIME NOT NULL)"
+    ))
+    applied = set(db.session.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+    newly_applied = []
+    for name, func in MIGRATIONS:
+        if name in applied:
+            continue
+
+        try:
+            func()
+            db.session.execute(
+                text("INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"),
+                {'name': name, 'applied_at': datetime.utcnow()}
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Migration {name} failed: {e}")
+            raise
+
+        newly_applied.append(name)
+        print(f"✅ Applied migration: {name}")
+
+    db.session.commit()
+    return newly_applied
+
+
+# ============================================
+# HELPERS
+# ============================================
+
+def column_exists(table, column):
+    """Check whether a column exists on a SQLite table"""
+    rows = db.session.execute(text(f"PRAGMA table_info({table})")).mappings()
+    return any(row['name'] == column for row in rows)
+
+
+def activity_resource_rows(activity_id, materials_json, requirements_json):
+    """
+    Build activity_materials / activity_home_requirements rows from the JSON columns
+
+    Returns:
+        (material rows, requirement rows) as lists of dicts
+    """
+    materials = json.loads(materials_json) if materials_json else []
+    requirements = json.loads(requirements_json) if requirements_json else []
+
+    material_rows = []
+    for material in materials:
+        if isinstance(material, dict):
+            name_en, name_ar = material.get('name_en', ''), material.get('name_ar', '')
+        else:
+            name_en = name_ar = str(material)
+        material_rows.append({'activity_id': activity_id, 'name_en': name_en, 'name_ar': name_ar})
+
+    requirement_rows = [
+        {'activity_id': activity_id, 'requirement': requirement}
+        for requirement in dict.fromkeys(requirements)
+    ]
+
+    return material_rows, requirement_rows
+
+
+# ============================================
+# MIGRATIONS
+# ============================================
+
+@migration('0001_activities_category_age_range_index')
+def add_activity_category_age_index():
+    """Index used by category/age filtering and database-side sampling"""
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_activities_category_age_range "
+        "ON activities (category, age_range)"
+    ))
+
+
+@migration('0002_backfill_activity_resources')
+def backfill_activity_resources(chunk_size=1000):
+    """Fill activity_materials and activity_home_requirements from the JSON columns"""
+    last_id = 0
+    while True:
+        rows = db.session.execute(text(
+            "SELECT a.id, a.materials, a.home_requirements FROM activities a "
+            "WHERE a.id > :last_id "
+            "AND NOT EXISTS (SELECT 1 FROM activity_home_requirements r WHERE r.activity_id = a.id) "
+            "AND NOT EXISTS (SELECT 1 FROM activity_materials m WHERE m.activity_id = a.id) "
+            "ORDER BY a.id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': chunk_size}).all()
+
+        if not rows:
+            break
+
+        material_rows, requirement_rows = [], []
+        for activity_id, materials_json, requirements_json in rows:
+            materials, requirements = activity_resource_rows(activity_id, materials_json, requirements_json)
+            material_rows.extend(materials)
+            requirement_rows.extend(requirements)
+
+        if material_rows:
+            db.session.execute(text(
+                "INSERT INTO activity_materials (activity_id, name_en, name_ar) "
+                "VALUES (:activity_id, :name_en, :name_ar)"
+            ), material_rows)
+        if requirement_rows:
+            db.session.execute(text(
+                "INSERT OR IGNORE INTO activity_home_requirements (activity_id, requirement) "
+                "VALUES (:activity_id, :requirement)"
+            ), requirement_rows)
+
+        last_id = rows[-1][0]
+        print(f"   Backfilled resources up to activity {last_id}")
+
+
+@migration('0003_activity_catalog_versions')
+def add_activity_catalog_versions():
+    """Versioned catalogs: activities belong to a catalog build (NULL for legacy rows)"""
+    if not column_exists('activities', 'catalog_version_id'):
+        db.session.execute(text(
+            "ALTER TABLE activities ADD COLUMN catalog_version_id INTEGER "
+            "REFERENCES activity_catalog_versions (id)"
+        ))
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_activities_catalog_version_id "
+        "ON activities (catalog_version_id)"
+    ))
+
+
+@migration('0004_activity_completions_daily_unique')
+def add_activity_completions_daily_unique():
+    """One completion per (user, activity, child, day), enforced by a unique index"""
+    if not column_exists('activity_completions', 'completed_on'):
+        db.session.execute(text("ALTER TABLE activity_completions ADD COLUMN completed_on DATE"))
+    db.session.execute(text(
+        "UPDATE activity_completions SET completed_on = date(completed_at) "
+        "WHERE completed_on IS NULL AND completed_at IS NOT NULL"
+    ))
+
+    # Drop duplicates from before the constraint, keeping the first completion
+    db.session.execute(text(
+        "DELETE FROM activity_completions WHERE id NOT IN ("
+        "SELECT MIN(id) FROM activity_completions "
+        "GROUP BY user_id, activity_id, coalesce(child_id, 0), completed_on)"
+    ))
+
+    # NULLs never collide in a unique index, so key "no child" as 0
+    db.session.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_activity_completions_daily "
+        "ON activity_completions (user_id, activity_id, coalesce(child_id, 0), completed_on)"
+    ))
+
+
+@migration('0005_activities_fts')
+def add_activities_fts():
+    """Full-text search index over the bilingual activity text"""
+    create_search_index()
+    indexed = reindex_activities()
+    if indexed:
+        print(f"   Indexed {indexed} activities for search")
+
+
+@migration('0006_backfill_activity_stats')
+def backfill_activity_stats(chunk_size=5000):
+    """Build the per-activity counters from the completions recorded so far"""
+    stats = {}
+    last_id = 0
+    while True:
+        rows = db.session.execute(text(
+            "SELECT id, activity_id, rating, completed_at FROM activity_completions "
+            "WHERE id > :last_id AND completed_at IS NOT NULL ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': chunk_size}).all()
+
+        if not rows:
+            break
+
+        for _, activity_id, rating, completed_at in rows:
+            if isinstance(completed_at, str):
+                completed_at = datetime.fromisoformat(completed_at)
+            entry = stats.setdefault(activity_id, {
+                'activity_id': activity_id, 'completion_count': 0, 'rating_sum': 0,
+                'rating_count': 0, 'popularity_score': 0.0, 'last_completed_at': completed_at
+            })
+            entry['completion_count'] += 1
+            if rating:
+                entry['rating_sum'] += rating
+                entry['rating_count'] += 1
+            entry['popularity_score'] += ActivityStats.popularity_weight(completed_at)
+            entry['last_completed_at'] = max(entry['last_completed_at'], completed_at)
+
+        last_id = rows[-1][0]
+
+    db.session.execute(text("DELETE FROM activity_stats"))
+    if stats:
+        db.session.execute(text(
+            "INSERT INTO activity_stats (activity_id, completion_count, rating_sum, rating_count, "
+            "popularity_score, last_completed_at) VALUES (:activity_id, :completion_count, :rating_sum, "
+            ":rating_count, :popularity_score, :last_completed_at)"
+        ), list(stats.values()))
+        print(f"   Built counters for {len(stats)} activities")
+
+
+@migration('0007_meal_jobs_duplicate_keys')
+def add_meal_jobs_duplicate_keys():
+    """Idempotency and dedupe keys on meal jobs (one job per family and idempotency key)"""
+    for column in ('idempotency_key', 'dedupe_key'):
+        if not column_exists('meal_jobs', column):
+            db.session.execute(text(f"ALTER TABLE meal_jobs ADD COLUMN {column} VARCHAR(64)"))
+    db.session.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_meal_jobs_idempotency_key "
+        "ON meal_jobs (family_profile_id, idempotency_key)"
+    ))
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_meal_jobs_dedupe_key "
+        "ON meal_jobs (family_profile_id, dedupe_key)"
+    ))
+
+
+@migration('0008_meal_nutrition')
+def add_meal_nutrition(chunk_size=500):
+    """Numeric per-serving nutrition on meals, computed for the meals saved so far"""
+    from app.meal_recommender.nutrition import calculate_nutrition_batch
+
+    for column, kind in (('servings', 'INTEGER'), ('energy_kcal', 'FLOAT'), ('protein_g', 'FLOAT'),
+                         ('fibre_g', 'FLOAT'), ('sugar_g', 'FLOAT'), ('sodium_mg', 'FLOAT'),
+                         ('nutrition_flags', 'TEXT')):
+        if not column_exists('meals', column):
+            db.session.execute(text(f"ALTER TABLE meals ADD COLUMN {column} {kind}"))
+
+    # Children's ages per family, for the age-band flags
+    today = datetime.utcnow().date()
+    ages = {}
+    for family_profile_id, birthdate in db.session.execute(text(
+        "SELECT family_profile_id, birthdate FROM children WHERE birthdate IS NOT NULL"
+    )).all():
+        if isinstance(birthdate, str):
+            birthdate = datetime.fromisoformat(birthdate).date()
+        age = today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
+        ages.setdefault(family_profile_id, []).append(age)
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(text(
+            "SELECT id, family_profile_id, meal_type, ingredients FROM meals "
+            "WHERE id > :last_id AND energy_kcal IS NULL ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': chunk_size}).all()
+
+        if not rows:
+            break
+
+        results = calculate_nutrition_batch([
+            {
+                'ingredients': json.loads(ingredients) if ingredients else [],
+                'meal_type': meal_type,
+                'child_ages': ages.get(family_profile_id),
+            }
+            for _, family_profile_id, meal_type, ingredients in rows
+        ])
+        db.session.execute(text(
+            "UPDATE meals SET servings = :servings, energy_kcal = :energy_kcal, protein_g = :protein_g, "
+            "fibre_g = :fibre_g, sugar_g = :sugar_g, sodium_mg = :sodium_mg, nutrition_flags = :flags "
+            "WHERE id = :id"
+        ), [
+            {'id': row[0], 'servings': result['servings'], 'flags': json.dumps(result['flags']), **result['per_serving']}
+            for row, result in zip(rows, results)
+        ])
+
+        last_id = rows[-1][0]
+        print(f"   Computed nutrition up to meal {last_id}")
+
+
+@migration('0009_meal_jobs_owner')
+def add_meal_jobs_owner():
+    """Owning process of each meal job, so recovery leaves a live process's jobs alone"""
+    if not column_exists('meal_jobs', 'owner'):
+        db.session.execute(text("ALTER TABLE meal_jobs ADD COLUMN owner VARCHAR(100)"))
+
+
+@migration('0010_meal_source')
+def add_meal_source():
+    """Who wrote each meal's recipe (earlier meals are marked 'ai': composed ones were not told apart)"""
+    if not column_exists('meals', 'source'):
+        db.session.execute(text("ALTER TABLE meals ADD COLUMN source VARCHAR(20) NOT NULL DEFAULT 'ai'"))
@@ -199,12 +199,54 @@ class Child(db.Model):
     def __repr__(self):
         return f'<Child {self.name} age {self.get_age()}>'
             
+class ActivityCatalogVersion(db.Model):
+    """
+    One build of the global activity catalog
+    A new catalog is generated as a 'building' version, then switched to
+    'live' in one transaction; the previous version stays for rollback
+    """
+    __tablename__ = 'activity_catalog_versions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='building', index=True)  # building, live, retired
+    activity_count = db.Column(db.Integer, default=0)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    activated_at = db.Column(db.DateTime)
+    
+    @classmethod
+    def live(cls):
+        """Get the live catalog version, or None before the first versioned build"""
+        return cls.query.filter_by(status='live').first()
+    
+    @classmethod
+    def live_id(cls):
+        """Get the live catalog version ID, or None"""
+        return db.session.query(cls.id).filter_by(status='live').scalar()
+    
+    def to_dict(self):
+        """Convert catalog version to dictionary"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'activity_count': self.activity_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'activated_at': self.activated_at.isoformat() if self.activated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<ActivityCatalogVersion {self.id} {self.status}>'
+
 class Activity(db.Model):
     """
     Screen-free activities
     Pre-generated, global activities shown to all users
     """
     __tablename__ = 'activities'
+    __table_args__ = (
+        db.Index('ix_activities_category_age_range', 'category', 'age_range'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -219,6 +261,9 @@ class Activity(db.Model):
     duration = db.Column(db.String(20), nullable=False)  
     category = db.Column(db.String(50), nullable=False)   
     
+    # Catalog build this activity belongs to (NULL: built before catalog versions)
+    catalog_version_id = db.Column(db.Integer, db.ForeignKey('activity_catalog_versions.id'), index=True)
+    
     # JSON fields (stored as text)
     materials = db.Column(db.Text)           
     steps_en = db.Column(db.Text)            
@@ -228,14 +273,23 @@ class Activity(db.Model):
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Normalized copies of the JSON fields (kept in sync by the setters)
+    material_rows = db.relationship('ActivityMaterial', backref='activity', cascade='all, delete-orphan')
+    requirement_rows = db.relationship('ActivityHomeRequirement', backref='activity', cascade='all, delete-orphan')
+    
     # Helper methods for JSON fields
     def get_materials(self):
         """Get materials as a list of dicts"""
         return json.loads(self.materials) if self.materials else []
     
     def set_materials(self, materials_list):
-        """Set materials from a list of dicts"""
+        """Set materials from a list of dicts (and the activity_materials rows)"""
         self.materials = json.dumps(materials_list, ensure_ascii=False)
+        self.material_rows = [
+            ActivityMaterial(name_en=material.get('name_en', ''), name_ar=material.get('name_ar', ''))
+            if isinstance(material, dict) else ActivityMaterial(name_en=str(material), name_ar=str(material))
+            for material in materials_list
+        ]
     
     def get_steps_en(self):
         """Get English steps as a list"""
@@ -258,19 +312,28 @@ class Activity(db.Model):
         return json.loads(self.home_requirements) if self.home_requirements else []
     
     def set_home_requirements(self, req_list):
-        """Set home requirements from a list"""
+        """Set home requirements from a list (and the activity_home_requirements rows)"""
         self.home_requirements = json.dumps(req_list)
+        self.requirement_rows = [ActivityHomeRequirement(requirement=req) for req in dict.fromkeys(req_list)]
     
-    def to_dict(self, language='en'):
+    def to_dict(self, language='en', fields='full'):
         """
         Convert activity to dictionary for API/frontend
         
         Args:
             language: 'en' or 'ar' for language preference
+            fields: 'full' for both languages, 'card' for the slim card view
         
         Returns:
             dict with activity data
         """
+        if fields == 'card':
+            return self.to_card_dict(language=language)
+        
+        # Decode each JSON column once
+        steps_en = self.get_steps_en()
+        steps_ar = self.get_steps_ar()
+        
         return {
             'id': self.id,
             'title': self.title_en if language == 'en' else self.title_ar,
@@ -283,15 +346,184 @@ class Activity(db.Model):
             'duration': self.duration,
             'category': self.category,
             'materials': self.get_materials(),
-            'steps': self.get_steps_en() if language == 'en' else self.get_steps_ar(),
-            'steps_en': self.get_steps_en(),
-            'steps_ar': self.get_steps_ar(),
+            'steps': steps_en if language == 'en' else steps_ar,
+            'steps_en': steps_en,
+            'steps_ar': steps_ar,
             'home_requirements': self.get_home_requirements(),
         }
     
+    @classmethod
+    def live_filter(cls):
+        """
+        SQL condition selecting activities of the live catalog version
+        Older versions stay in the table so completions keep resolving
+        """
+        live_id = ActivityCatalogVersion.live_id()
+        if live_id is None:
+            return cls.catalog_version_id.is_(None)
+        return cls.catalog_version_id == live_id
+    
+    @classmethod
+    def card_columns(cls, language='en'):
+        """
+        Columns needed to render an activity card in one language
+        Everything else (the other language, home requirements) can stay deferred
+        """
+        suffix = 'ar' if language == 'ar' else 'en'
+        return [
+            cls.id,
+            cls.age_range,
+            cls.duration,
+            cls.category,
+            cls.materials,
+            getattr(cls, f'title_{suffix}'),
+            getattr(cls, f'description_{suffix}'),
+            getattr(cls, f'steps_{suffix}'),
+        ]
+    
+    def to_card_dict(self, language='en'):
+        """
+        Convert activity to a slim dictionary for activity cards
+        Only touches the columns listed in card_columns
+        
+        Args:
+            language: 'en' or 'ar' for language preference
+        
+        Returns:
+            dict with card data
+        """
+        suffix = 'ar' if language == 'ar' else 'en'
+        title = getattr(self, f'title_{suffix}')
+        description = getattr(self, f'description_{suffix}')
+        steps_json = getattr(self, f'steps_{suffix}')
+        
+        return {
+            'id': self.id,
+            'title': title,
+            f'title_{suffix}': title,
+            'description': description,
+            f'description_{suffix}': description,
+            'age_range': self.age_range,
+            'duration': self.duration,
+            'category': self.category,
+            'materials': self.get_materials(),
+            'steps': json.loads(steps_json) if steps_json else [],
+        }
+    
     def __repr__(self):
         return f'<Activity {self.title_en}>'
 
+class ActivityHomeRequirement(db.Model):
+    """
+    Home area an activity needs (normalized from Activity.home_requirements)
+    Lets "needs only what this home has" run as an indexed SQL filter
+    """
+    __tablename__ = 'activity_home_requirements'
+    __table_args__ = (
+        db.Index('ix_activity_home_requirements_requirement', 'requirement', 'activity_id'),
+    )
+    
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'), primary_key=True)
+    requirement = db.Column(db.String(50), primary_key=True)
+    
+    def __repr__(self):
+        return f'<ActivityHomeRequirement activity={self.activity_id} {self.requirement}>'
+
+class ActivityMaterial(db.Model):
+    """
+    Material an activity uses (normalized from Activity.materials)
+    """
+    __tablename__ = 'activity_materials'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'), nullable=False, index=True)
+    name_en = db.Column(db.String(200), nullable=False, index=True)
+    name_ar = db.Column(db.String(200))
+    
+    def __repr__(self):
+        return f'<ActivityMaterial activity={self.activity_id} {self.name_en}>'
+
+class ActivitySimilarity(db.Model):
+    """
+    Precomputed top-N similar activities per activity
+    Written by utils/build_recommendations.py (item-item collaborative filtering)
+    """
+    __tablename__ = 'activity_similarities'
+    
+    activity_id = db.Column(db.Integer, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    similar_activity_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f'<ActivitySimilarity {self.activity_id} #{self.rank} -> {self.similar_activity_id}>'
+
+class UserRecommendation(db.Model):
+    """
+    Precomputed top-N recommended activities per user
+    Written by utils/build_recommendations.py (item-item collaborative filtering)
+    """
+    __tablename__ = 'user_recommendations'
+    
+    user_id = db.Column(db.Integer, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    activity_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f'<UserRecommendation user={self.user_id} #{self.rank} -> {self.activity_id}>'
+
+class ActivityStats(db.Model):
+    """
+    Running counters per activity, updated in the same transaction as each new completion
+    Popularity and rating sorts read these rows instead of aggregating completions
+    """
+    __tablename__ = 'activity_stats'
+    
+    # Recent popularity halves every week. Each completion adds
+    # 2^((t - epoch) / half-life), so ordering by the stored score is ordering
+    # by decayed popularity at any moment, without rewriting old rows.
+    # (Floats hold this for ~19 years past the epoch.)
+    POPULARITY_EPOCH = datetime(2026, 1, 1)
+    POPULARITY_HALF_LIFE_DAYS = 7.0
+    
+    # Bayesian average: every activity starts with this many virtual ratings of PRIOR_RATING
+    PRIOR_RATING = 4.0
+    PRIOR_WEIGHT = 5
+    
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'), primary_key=True)
+    completion_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    popularity_score = db.Column(db.Float, nullable=False, default=0.0, index=True)
+    last_completed_at = db.Column(db.DateTime)
+    
+    @classmethod
+    def popularity_weight(cls, completed_at):
+        """Contribution of one completion to popularity_score"""
+        days = (completed_at - cls.POPULARITY_EPOCH).total_seconds() / 86400
+        return 2.0 ** (days / cls.POPULARITY_HALF_LIFE_DAYS)
+    
+    def recent_popularity(self, now=None):
+        """Decayed completion count as of now (roughly: completions this week)"""
+        now = now or datetime.utcnow()
+        return self.popularity_score / self.popularity_weight(now)
+    
+    def bayesian_rating(self):
+        """Average rating shrunk towards PRIOR_RATING while there are few ratings"""
+        return (self.PRIOR_RATING * self.PRIOR_WEIGHT + self.rating_sum) / (self.PRIOR_WEIGHT + self.rating_count)
+    
+    def to_dict(self):
+        """Convert stats to dictionary"""
+        return {
+            'activity_id': self.activity_id,
+            'completion_count': self.completion_count,
+            'rating_count': self.rating_count,
+            'average_rating': round(self.rating_sum / self.rating_count, 2) if self.rating_count else None,
+            'bayesian_rating': round(self.bayesian_rating(), 2),
+            'recent_popularity': round(self.recent_popularity(), 2)
+        }
+
 class ActivityCompletion(db.Model):
     """
     Track completed activities for users
@@ -307,6 +539,8 @@ class ActivityCompletion(db.Model):
     
     # Completion details
     completed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # UTC day of completion; one completion per (user, activity, child, day)
+    completed_on = db.Column(db.Date, default=lambda: datetime.utcnow().date())
     notes = db.Column(db.Text)  # Optional notes from parent
     
     # Rating (1-5 stars, optional)
@@ -320,6 +554,7 @@ class ActivityCompletion(db.Model):
             'activity_id': self.activity_id,
             'child_id': self.child_id,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'completed_on': self.completed_on.isoformat() if self.completed_on else None,
             'notes': self.notes,
             'rating': self.rating
         }
@@ -358,6 +593,18 @@ class Meal(db.Model):
     why_healthy_en = db.Column(db.Text)  # Why this meal is healthy for the child
     why_healthy_ar = db.Column(db.Text)
     
+    # Computed nutrition (per serving, from the local nutrient table)
+    servings = db.Column(db.Integer)
+    energy_kcal = db.Column(db.Float)
+    protein_g = db.Column(db.Float)
+    fibre_g = db.Column(db.Float)
+    sugar_g = db.Column(db.Float)
+    sodium_mg = db.Column(db.Float)
+    nutrition_flags = db.Column(db.Text)  # JSON array of {code, level, age_band}
+    
+    # Who wrote the recipe: 'ai', or 'composer' (offline template, quick idea or AI fallback)
+    source = db.Column(db.String(20), default='ai', nullable=False)
+    
     # User interaction
     is_favorite = db.Column(db.Boolean, default=False)
     
@@ -389,6 +636,40 @@ class Meal(db.Model):
         """Set ingredients user needs to buy"""
         self.missing_ingredients = json.dumps(ingredients_list, ensure_ascii=False)
     
+    def get_nutrition_flags(self):
+        """Get child nutrition flags as a list"""
+        return json.loads(self.nutrition_flags) if self.nutrition_flags else []
+    
+    def set_nutrition(self, nutrition):
+        """
+        Store computed nutrition
+        
+        Args:
+            nutrition: dict from nutrition.calculate_meal_nutrition
+        """
+        per_serving = nutrition['per_serving']
+        self.servings = nutrition['servings']
+        self.energy_kcal = per_serving['energy_kcal']
+        self.protein_g = per_serving['protein_g']
+        self.fibre_g = per_serving['fibre_g']
+        self.sugar_g = per_serving['sugar_g']
+        self.sodium_mg = per_serving['sodium_mg']
+        self.nutrition_flags = json.dumps(nutrition['flags'], ensure_ascii=False)
+    
+    def get_nutrition(self):
+        """Per-serving nutrition as a dict (None before it is computed)"""
+        if self.energy_kcal is None:
+            return None
+        return {
+            'servings': self.servings,
+            'energy_kcal': self.energy_kcal,
+            'protein_g': self.protein_g,
+            'fibre_g': self.fibre_g,
+            'sugar_g': self.sugar_g,
+            'sodium_mg': self.sodium_mg,
+            'flags': self.get_nutrition_flags()
+        }
+    
     def calculate_missing_ingredients(self):
         """
         Calculate which ingredients are missing based on what's selected
@@ -455,6 +736,8 @@ class Meal(db.Model):
             'cook_time': self.cook_time,
             'nutritional_benefits': self.nutritional_benefits_ar if language == 'ar' else self.nutritional_benefits_en,
             'why_healthy': self.why_healthy_ar if language == 'ar' else self.why_healthy_en,
+            'nutrition': self.get_nutrition(),
+            'source': self.source,
             'is_favorite': self.is_favorite,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -462,6 +745,88 @@ class Meal(db.Model):
     def __repr__(self):
         return f'<Meal {self.name_en}>'
 
+
+class MealJob(db.Model):
+    """
+    Queued meal generation / regeneration
+    Durable record of each job; the in-process worker pool runs them
+    """
+    __tablename__ = 'meal_jobs'
+    __table_args__ = (
+        db.Index('ix_meal_jobs_status_created_at', 'status', 'created_at'),
+        db.Index('ux_meal_jobs_idempotency_key', 'family_profile_id', 'idempotency_key', unique=True),
+        db.Index('ix_meal_jobs_dedupe_key', 'family_profile_id', 'dedupe_key'),
+    )
+    
+    # Job states
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    family_profile_id = db.Column(db.Integer, db.ForeignKey('family_profiles.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # generate, regenerate
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+    
+    # Job input (JSON) and outcome
+    payload = db.Column(db.Text)
+    meal_id = db.Column(db.Integer, db.ForeignKey('meals.id', ondelete='SET NULL'))
+    error = db.Column(db.Text)
+    
+    # Duplicate detection: the client's idempotency key (scoped to the
+    # request), and a fingerprint of the request itself
+    idempotency_key = db.Column(db.String(64))
+    dedupe_key = db.Column(db.String(64))
+    
+    # Process that accepted or is running the job (see MealJobQueue)
+    owner = db.Column(db.String(100))
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def get_payload(self):
+        """Get the job input as a dict"""
+        return json.loads(self.payload) if self.payload else {}
+    
+    def set_payload(self, payload):
+        """Set the job input from a dict"""
+        self.payload = json.dumps(payload, ensure_ascii=False)
+    
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
+    
+    def wait_seconds(self):
+        """Time spent queued (None until started)"""
+        if not self.started_at:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+    
+    def run_seconds(self):
+        """Time spent running (None until finished)"""
+        if not (self.started_at and self.finished_at):
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+    
+    def to_dict(self):
+        """Convert job to dictionary"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'meal_id': self.meal_id,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'wait_seconds': self.wait_seconds(),
+            'run_seconds': self.run_seconds()
+        }
+    
+    def __repr__(self):
+        return f'<MealJob {self.id} {self.kind} {self.status}>'
+
 class ChatConversation(db.Model):
     """
     Chat conversations - groups messages into sessions
@@ -525,4 +890,64 @@ class ChatMessage(db.Model):
         }
     
     def __repr__(self):
-        return f'<ChatMessage {self.id}: {self.role}>'
\ No newline at end of file
+        return f'<ChatMessage {self.id}: {self.role}>'
+
+class LLMUsage(db.Model):
+    """
+    Usage ledger: one row per LLM call (each attempt and each side of a hedge)
+    Tokens, wall time and prompt size, tagged by feature and user
+    """
+    __tablename__ = 'llm_usage'
+    __table_args__ = (
+        db.Index('ix_llm_usage_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_llm_usage_feature_created_at', 'feature', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Who and what the call was for (no user: scripts and batch jobs)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    feature = db.Column(db.String(30), nullable=False)  # meal, regenerate, chat, title, activity-batch, other
+    provider = db.Column(db.String(30), nullable=False)
+    model = db.Column(db.String(100))
+    
+    # Tokens as reported by the provider; estimated from the text when it reports none
+    input_tokens = db.Column(db.Integer, default=0, nullable=False)
+    output_tokens = db.Column(db.Integer, default=0, nullable=False)
+    estimated = db.Column(db.Boolean, default=False, nullable=False)
+    
+    # Outcome
+    duration_ms = db.Column(db.Integer, nullable=False)
+    success = db.Column(db.Boolean, default=True, nullable=False)
+    error = db.Column(db.String(50))  # exception type, 'cancelled' (lost a hedge) or 'abandoned' (stream not read to the end)
+    
+    # Prompt size, and estimated tokens per prompt section (JSON)
+    prompt_chars = db.Column(db.Integer, default=0, nullable=False)
+    prompt_sections = db.Column(db.Text)
+    
+    def get_prompt_sections(self):
+        """Get {section: estimated tokens}"""
+        return json.loads(self.prompt_sections) if self.prompt_sections else {}
+    
+    def to_dict(self):
+        """Convert usage row to dictionary"""
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'user_id': self.user_id,
+            'feature': self.feature,
+            'provider': self.provider,
+            'model': self.model,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'estimated': self.estimated,
+            'duration_ms': self.duration_ms,
+            'success': self.success,
+            'error': self.error,
+            'prompt_chars': self.prompt_chars,
+            'prompt_sections': self.get_prompt_sections()
+        }
+    
+    def __repr__(self):
+        return f'<LLMUsage {self.feature} {self.provider} {self.input_tokens}+{self.output_tokens}>'
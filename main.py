@@ -23,6 +23,43 @@ database_path = os.path.join(basedir, 'health_heroes.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Activity catalog configuration
+app.config['ACTIVITY_CATALOG_REFRESH_SECONDS'] = int(os.getenv('ACTIVITY_CATALOG_REFRESH_SECONDS', 60))
+app.config['ACTIVITY_SAMPLING_SOURCE'] = os.getenv('ACTIVITY_SAMPLING_SOURCE', 'catalog')  # 'catalog' or 'database'
+app.config['ACTIVITY_HISTORY_SIZE'] = int(os.getenv('ACTIVITY_HISTORY_SIZE', 60))  # recently shown activities per user
+app.config['ACTIVITY_HISTORY_TTL_SECONDS'] = int(os.getenv('ACTIVITY_HISTORY_TTL_SECONDS', 6 * 60 * 60))
+app.config['ACTIVITY_COMPLETION_WRITE_BEHIND'] = os.getenv('ACTIVITY_COMPLETION_WRITE_BEHIND', '0') == '1'
+app.config['ACTIVITY_COMPLETION_FLUSH_SECONDS'] = float(os.getenv('ACTIVITY_COMPLETION_FLUSH_SECONDS', 0.5))
+
+# LLM client configuration (shared by meals, chat and activity generation)
+app.config['LLM_TIMEOUT_SECONDS'] = float(os.getenv('LLM_TIMEOUT_SECONDS', 60))
+app.config['LLM_MAX_RETRIES'] = int(os.getenv('LLM_MAX_RETRIES', 2))
+app.config['LLM_POOL_CONNECTIONS'] = int(os.getenv('LLM_POOL_CONNECTIONS', 20))
+app.config['LLM_BACKEND'] = os.getenv('LLM_BACKEND', '')  # 'stub' sends every call to the local stub
+app.config['LLM_BACKUP_BASE_URL'] = os.getenv('LLM_BACKUP_BASE_URL', '')  # optional second OpenAI-compatible endpoint ('backup')
+app.config['LLM_HEDGE_TO'] = os.getenv('LLM_HEDGE_TO', '')  # e.g. 'openai=gemini:gemini-2.5-flash'; empty disables hedging
+app.config['LLM_HEDGE_AFTER_SECONDS'] = float(os.getenv('LLM_HEDGE_AFTER_SECONDS', 10))  # budget until latency is known
+app.config['LLM_HEDGE_PERCENTILE'] = float(os.getenv('LLM_HEDGE_PERCENTILE', 90))  # then hedge after the primary's p90
+app.config['LLM_DEADLINE_SECONDS'] = float(os.getenv('LLM_DEADLINE_SECONDS', 90))  # whole call, retries included
+app.config['LLM_DEADLINES'] = os.getenv('LLM_DEADLINES', '')  # per purpose, e.g. 'chat=20,title=8,meal=60'
+app.config['LLM_BREAKER_FAILURES'] = int(os.getenv('LLM_BREAKER_FAILURES', 5))  # transient failures in a row that open a circuit
+app.config['LLM_BREAKER_OPEN_SECONDS'] = float(os.getenv('LLM_BREAKER_OPEN_SECONDS', 30))  # then one trial call
+app.config['LLM_USAGE_LEDGER'] = os.getenv('LLM_USAGE_LEDGER', '1') == '1'  # write every call's usage to llm_usage
+app.config['LLM_USAGE_FLUSH_SECONDS'] = float(os.getenv('LLM_USAGE_FLUSH_SECONDS', 2))
+
+# Meal generation cache configuration
+app.config['MEAL_CACHE_SIZE'] = int(os.getenv('MEAL_CACHE_SIZE', 500))  # 0 disables the cache
+app.config['MEAL_CACHE_TTL_SECONDS'] = int(os.getenv('MEAL_CACHE_TTL_SECONDS', 24 * 60 * 60))
+app.config['MEAL_JOB_WORKERS'] = int(os.getenv('MEAL_JOB_WORKERS', 4))  # background meal generations at once
+app.config['MEAL_JOB_MAX_QUEUED'] = int(os.getenv('MEAL_JOB_MAX_QUEUED', 100))  # new jobs are refused beyond this
+app.config['MEAL_JOB_LEASE_SECONDS'] = int(os.getenv('MEAL_JOB_LEASE_SECONDS', 600))  # then a dead process's running job is retried
+app.config['MEAL_JOB_OWNER'] = os.getenv('MEAL_JOB_OWNER', '')  # stable per-server name: a restart retries its own running jobs at once
+app.config['MEAL_COMPOSER_FALLBACK'] = os.getenv('MEAL_COMPOSER_FALLBACK', '1') == '1'  # compose offline when the AI fails
+app.config['MEAL_LLM_BUDGET_SECONDS'] = float(os.getenv('MEAL_LLM_BUDGET_SECONDS', 30))  # then fall back (0: no budget)
+
+# Operations endpoints (/ops/...) need this as a bearer token; empty disables them
+app.config['OPS_API_TOKEN'] = os.getenv('OPS_API_TOKEN', '')
+
 # Initialize database
 from db import init_db
 init_db(app)
@@ -34,6 +71,7 @@ from app.meal_recommender.routes import meals_bp
 from app.screen_free_activities.routes import screen_free_bp
 from app.chatbot.routes import chatbot_bp
 from app.dashboard.routes import dashboard_bp
+from app.ops.routes import ops_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(profile_bp)
@@ -41,6 +79,32 @@ app.register_blueprint(meals_bp)
 app.register_blueprint(screen_free_bp)
 app.register_blueprint(chatbot_bp)
 app.register_blueprint(dashboard_bp, url_prefix="/")
+app.register_blueprint(ops_bp)
+
+# Load the in-memory activity catalog
+from app.screen_free_activities.catalog import activity_catalog
+activity_catalog.init_app(app)
+from app.screen_free_activities.history import activity_history
+activity_history.init_app(app)
+from app.screen_free_activities.completions import completion_queue
+completion_queue.init_app(app)
+
+# Shared LLM backends
+from app.llm import llm, usage_meter
+llm.init_app(app)
+usage_meter.init_app(app)
+
+# Cache repeated meal generations
+from app.meal_recommender.generation_cache import meal_cache
+meal_cache.init_app(app)
+
+# Offline meal composer (quick ideas, AI fallback)
+from app.meal_recommender.meal_composer import meal_composer
+meal_composer.init_app(app)
+
+# Background meal generation workers (started by the first request served)
+from app.meal_recommender.jobs import meal_jobs
+meal_jobs.init_app(app)
 
 # Home route
 @app.route('/')
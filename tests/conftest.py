@@ -0,0 +1,81 @@
+"""
+Shared fixtures: a Flask app on a throwaway SQLite database per test
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db import init_db
+from db.models import db, Activity, User, FamilyProfile, Child
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App with the activities blueprint on a fresh database"""
+    from app.auth.routes import auth_bp
+    from app.screen_free_activities.routes import screen_free_bp
+    from app.screen_free_activities.catalog import activity_catalog
+    from app.screen_free_activities.history import activity_history
+
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test',
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    init_db(app)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(screen_free_bp)
+    activity_catalog.init_app(app)
+    activity_history.init_app(app)
+
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def make_activity(title='Paper Boats', category='creative', age_range='3-5 years'):
+    """Add one activity and return its ID"""
+    activity = Activity(
+        title_en=title, title_ar='قوارب ورقية', description_en='Fold boats', description_ar='اطوِ قوارب',
+        age_range=age_range, duration='10-15 min', category=category
+    )
+    activity.set_materials([])
+    activity.set_steps_en(['Fold'])
+    activity.set_steps_ar(['اطوِ'])
+    activity.set_home_requirements([])
+    db.session.add(activity)
+    db.session.commit()
+    return activity.id
+
+
+def make_family(email='parent@example.com', child_name='Sara'):
+    """Add a user with a family profile and one child; returns (user_id, child_id)"""
+    user = User(name='Parent', email=email)
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.flush()
+    profile = FamilyProfile(user_id=user.id)
+    db.session.add(profile)
+    db.session.flush()
+    child = Child(family_profile_id=profile.id, name=child_name, birthdate=date(2020, 5, 1))
+    db.session.add(child)
+    db.session.commit()
+    return user.id, child.id
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def log_in(client, user_id):
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
@@ -0,0 +1,107 @@
+"""
+Activity completions: request validation, insert-or-ignore and the write-behind queue
+"""
+
+import pytest
+
+from db.models import db, ActivityCompletion, ActivityStats
+from app.screen_free_activities.completions import CompletionQueue, completion_queue, completion_row
+from conftest import make_activity, make_family, log_in
+
+
+@pytest.fixture
+def family(client):
+    user_id, child_id = make_family()
+    log_in(client, user_id)
+    return user_id, child_id
+
+
+def complete(client, **body):
+    return client.post('/activities/api/complete', json=body).get_json()
+
+
+def test_same_activity_same_day_is_already_completed(client, family):
+    user_id, child_id = family
+    activity_id = make_activity()
+
+    assert complete(client, activity_id=activity_id, child_id=child_id, rating=4)['message'] == 'Activity completed!'
+    assert complete(client, activity_id=activity_id, child_id=child_id, rating=4)['message'] == 'Already completed'
+
+    assert ActivityCompletion.query.count() == 1
+    stats = db.session.get(ActivityStats, activity_id)
+    assert (stats.completion_count, stats.rating_sum, stats.rating_count) == (1, 4, 1)
+
+
+def test_other_child_same_day_is_a_new_completion(client, family):
+    user_id, child_id = family
+    activity_id = make_activity()
+
+    complete(client, activity_id=activity_id, child_id=child_id)
+    assert complete(client, activity_id=activity_id)['message'] == 'Activity completed!'
+    assert ActivityCompletion.query.count() == 2
+
+
+@pytest.mark.parametrize('activity_id', [None, 'abc', True, 0, -3, 1.5, 999])
+def test_rejects_bad_activity_ids(client, family, activity_id):
+    make_activity()
+    assert complete(client, activity_id=activity_id)['success'] is False
+    assert ActivityCompletion.query.count() == 0
+
+
+@pytest.mark.parametrize('rating', [True, False, 0, 6, '5', 2.5])
+def test_rejects_bad_ratings(client, family, rating):
+    activity_id = make_activity()
+    assert complete(client, activity_id=activity_id, rating=rating)['error'] == 'Rating must be 1-5'
+
+
+def test_rejects_another_familys_child(client, family):
+    activity_id = make_activity()
+    _, other_child_id = make_family(email='other@example.com', child_name='Omar')
+
+    assert complete(client, activity_id=activity_id, child_id=other_child_id)['error'] == 'Child not found'
+    assert complete(client, activity_id=activity_id, child_id='x')['error'] == 'Child not found'
+    assert ActivityCompletion.query.count() == 0
+
+
+def test_write_behind_validates_before_acknowledging(app, client, family, monkeypatch):
+    monkeypatch.setattr(completion_queue, 'enabled', True)
+    monkeypatch.setattr(completion_queue, '_queue', CompletionQueue()._queue)
+
+    assert complete(client, activity_id='not-a-number')['success'] is False
+    assert complete(client, activity_id=424242)['success'] is False
+    assert len(completion_queue) == 0
+
+    assert complete(client, activity_id=make_activity())['success'] is True
+    assert len(completion_queue) == 1
+
+
+def test_queue_flush_writes_batch_and_skips_duplicates(app, family):
+    user_id, child_id = family
+    first, second = make_activity('Paper Boats'), make_activity('Sock Puppets')
+    queue = CompletionQueue()
+    queue.init_app(app)
+
+    for activity_id in (first, second, first):
+        queue.submit(user_id, activity_id, child_id, rating=5)
+
+    assert queue.flush() == 2
+    assert queue.flushed == 2
+    assert ActivityCompletion.query.count() == 2
+    assert db.session.get(ActivityStats, first).completion_count == 1
+
+
+def test_queue_retries_failed_batch_row_by_row(app, family, monkeypatch):
+    user_id, child_id = family
+    good = [make_activity('Paper Boats'), make_activity('Sock Puppets'), make_activity('Sand Castles')]
+    queue = CompletionQueue()
+    queue.init_app(app)
+
+    for activity_id in good:
+        queue.submit(user_id, activity_id, child_id)
+    # A row that cannot be written (NOT NULL user_id) fails the whole batch
+    bad = completion_row(None, good[0])
+    queue._queue.put(bad)
+
+    assert queue.flush() == 3
+    assert sorted(row.activity_id for row in ActivityCompletion.query) == sorted(good)
+    assert len(queue) == 0
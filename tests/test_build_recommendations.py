@@ -0,0 +1,77 @@
+"""
+Item-item collaborative filtering on small, hand-checked matrices
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'utils')))
+
+from build_recommendations import (
+    IMPLICIT_WEIGHT, build_matrix, item_similarities, rating_weights, top_n_per_row, user_activity_scores
+)
+
+
+def recommend(interactions, n=5):
+    """(user, activity, rating) triples -> {user_id: [activity_id, ...]}"""
+    user_ids, activity_ids, ratings = (np.array(column) for column in zip(*interactions))
+    matrix, completed, user_index, activity_index = build_matrix(
+        user_ids, activity_ids, rating_weights(ratings.astype(np.float32))
+    )
+    scores = user_activity_scores(matrix, item_similarities(matrix))
+    return {
+        int(user_index[row]): [int(activity_index[column]) for column in columns]
+        for row, columns, _ in top_n_per_row(scores, n, exclude=completed)
+    }
+
+
+def test_rating_weights_are_centred_on_three_stars():
+    weights = rating_weights(np.array([5, 4, 3, 2, 1, 0], dtype=np.float32))
+    assert weights.tolist() == pytest.approx([1.0, 0.5, 0.0, -0.5, -1.0, IMPLICIT_WEIGHT])
+
+
+def test_cosine_similarity_of_known_matrix():
+    # Columns (activities 10, 20, 30): [1, 1, -1], [1, 1, 0], [0, 0, 0.6]
+    matrix, _, _, activity_index = build_matrix(
+        np.array([1, 1, 2, 2, 3, 3]),
+        np.array([10, 20, 10, 20, 10, 30]),
+        np.array([1.0, 1.0, 1.0, 1.0, -1.0, IMPLICIT_WEIGHT], dtype=np.float32)
+    )
+    similarity = item_similarities(matrix).toarray()
+
+    assert activity_index.tolist() == [10, 20, 30]
+    assert similarity[0, 1] == pytest.approx(2 / np.sqrt(6))
+    assert similarity[0, 2] == pytest.approx(-1 / np.sqrt(3))
+    assert similarity[1, 2] == 0
+    assert np.diag(similarity).tolist() == [0, 0, 0]
+
+
+def test_one_star_does_not_recommend_similar_activities():
+    recommendations = recommend([
+        (1, 10, 5), (1, 20, 5),
+        (2, 10, 5), (2, 20, 5),
+        (3, 10, 1),
+    ])
+    # Users 1 and 2 liked 10 and 20 together; user 3 disliked 10
+    assert recommendations[3] == []
+
+
+def test_high_rating_recommends_similar_activities():
+    recommendations = recommend([
+        (1, 10, 5), (1, 20, 5),
+        (2, 10, 5), (2, 20, 4),
+        (3, 10, 5),
+    ])
+    assert recommendations[3] == [20]
+
+
+def test_completed_activities_are_never_recommended():
+    # A 3-star rating weighs nothing but still counts as done
+    recommendations = recommend([
+        (1, 10, 5), (1, 20, 5),
+        (2, 10, 4), (2, 20, 3),
+    ])
+    assert recommendations[2] == []
@@ -0,0 +1,100 @@
+"""
+Meal generation cache: request fingerprints and LRU/TTL eviction
+"""
+
+import pytest
+
+from app.meal_recommender import generation_cache
+from app.meal_recommender.generation_cache import MealGenerationCache, meal_fingerprint
+
+
+CHILDREN = [{'name': 'Sara', 'age_range': '4-6 years', 'special_needs': 'picky eater'}]
+
+
+def fingerprint(**overrides):
+    request = {
+        'selected_ingredients': ['Chicken', 'Rice (Basmati)', 'Carrot'],
+        'meal_type': 'lunch',
+        'cuisine_type': 'arabic',
+        'child_profiles': CHILDREN,
+        'dietary_restrictions': ['nuts'],
+        'language': 'en',
+    }
+    request.update(overrides)
+    return meal_fingerprint(**request)
+
+
+def test_fingerprint_ignores_ingredient_order_case_and_repeats():
+    assert fingerprint(selected_ingredients=['carrot', ' RICE (basmati)', 'Chicken', 'chicken']) == fingerprint()
+
+
+def test_fingerprint_ignores_child_names():
+    renamed = [{**CHILDREN[0], 'name': 'Omar'}]
+    assert fingerprint(child_profiles=renamed) == fingerprint()
+
+
+@pytest.mark.parametrize('change', [
+    {'language': 'ar'},
+    {'dietary_restrictions': ['nuts', 'dairy']},
+    {'dietary_restrictions': []},
+    {'meal_type': 'dinner'},
+    {'cuisine_type': 'international'},
+    {'selected_ingredients': ['Chicken', 'Rice (Basmati)']},
+    {'child_profiles': [{**CHILDREN[0], 'age_range': '1-3 years'}]},
+    {'child_profiles': [{**CHILDREN[0], 'special_needs': 'diabetic'}]},
+])
+def test_fingerprint_changes_with_what_shapes_the_prompt(change):
+    assert fingerprint(**change) != fingerprint()
+
+
+def test_restriction_order_and_case_do_not_matter():
+    assert fingerprint(dietary_restrictions=['Dairy', 'nuts']) == fingerprint(dietary_restrictions=['nuts', 'dairy'])
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = MealGenerationCache(size=2)
+    cache.put('a', {'name': 'A'})
+    cache.put('b', {'name': 'B'})
+    assert cache.get('a') == {'name': 'A'}  # 'b' is now the oldest
+
+    cache.put('c', {'name': 'C'})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'name': 'A'}
+    assert cache.get('c') == {'name': 'C'}
+    assert cache.evictions == 1
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(generation_cache.time, 'monotonic', lambda: now[0])
+    cache = MealGenerationCache(size=10, ttl_seconds=60)
+    cache.put('a', {'name': 'A'})
+
+    now[0] += 60
+    assert cache.get('a') == {'name': 'A'}
+    now[0] += 1
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_returned_meals_are_copies():
+    cache = MealGenerationCache()
+    cache.put('a', {'ingredients': ['Rice']})
+    cache.get('a')['ingredients'].append('Salt')
+    assert cache.get('a') == {'ingredients': ['Rice']}
+
+
+def test_get_or_generate_and_force_fresh():
+    cache = MealGenerationCache()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return {'version': len(calls)}
+
+    assert cache.get_or_generate('a', generate) == ({'version': 1}, False)
+    assert cache.get_or_generate('a', generate) == ({'version': 1}, True)
+    assert cache.get_or_generate('a', generate, force_fresh=True) == ({'version': 2}, False)
+    assert cache.get_or_generate('a', generate) == ({'version': 2}, True)
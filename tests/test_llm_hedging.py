@@ -0,0 +1,151 @@
+"""
+Hedged LLM calls raced between two local stub servers
+"""
+
+import json
+import time
+
+import pytest
+
+from app.llm.client import LLMClient, LLMError
+from app.llm.providers import OpenAICompatibleProvider
+from app.llm.stub_server import StubServer
+from app.meal_recommender.meal_generator import check_meal_response
+
+
+MEAL_JSON = json.dumps({
+    'name_en': 'Lentil Soup', 'name_ar': 'شوربة عدس',
+    'ingredients': [{'name_en': 'Lentils', 'name_ar': 'عدس', 'amount': '200g', 'icon': '🥣'}],
+    'instructions_en': 'Step 1: Say Bismillah and boil the lentils', 'instructions_ar': 'الخطوة 1: قل بسم الله',
+    'prep_time': '10 minutes', 'cook_time': '30 minutes',
+}, ensure_ascii=False)
+
+# Hedge after this long until the primary has a latency history
+BUDGET = 0.3
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**options):
+        server = StubServer(**options).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+def hedging_client(primary, secondary):
+    """Client whose 'openai' backend hedges to 'backup', each on its own stub server"""
+    client = LLMClient()
+    client.hedge_targets = {'openai': ('backup', 'stub-model')}
+    client.hedge_after = BUDGET
+    client.backend_override = None
+    client.register_provider('openai', OpenAICompatibleProvider(primary.base_url, 'test', timeout=10))
+    client.register_provider('backup', OpenAICompatibleProvider(secondary.base_url, 'test', timeout=10))
+    return client
+
+
+def hedged_call(client, validate=check_meal_response):
+    started = time.monotonic()
+    response = client.complete(prompt='Lentil soup please', provider='openai', model='stub-model',
+                               json_mode=True, hedge=True, validate=validate, deadline=10)
+    return response, time.monotonic() - started
+
+
+def wait_for(condition, seconds=5):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_fast_primary_is_not_hedged(servers):
+    primary = servers(reply=MEAL_JSON)
+    secondary = servers(reply=MEAL_JSON)
+    client = hedging_client(primary, secondary)
+
+    response, _ = hedged_call(client)
+
+    assert response.provider == 'openai'
+    assert secondary.stats['requests'] == 0
+    assert client.hedge_stats == {'hedged_calls': 1, 'hedges_sent': 0, 'secondary_wins': 0}
+
+
+def test_slow_primary_is_hedged_after_the_budget_and_cancelled(servers):
+    primary = servers(reply=MEAL_JSON, delay=1.5, chunk_delay=0.05)
+    secondary = servers(reply=MEAL_JSON, delay=0.05)
+    client = hedging_client(primary, secondary)
+
+    response, elapsed = hedged_call(client)
+
+    # The secondary was only asked once the budget had passed, and answered first
+    assert response.provider == 'backup'
+    assert json.loads(response.text) == json.loads(MEAL_JSON)
+    assert BUDGET <= elapsed < 1.0
+    assert secondary.stats['requests'] == 1
+    assert client.hedge_stats == {'hedged_calls': 1, 'hedges_sent': 1, 'secondary_wins': 1}
+
+    # The losing primary call is dropped at its first chunk, never read to the end
+    assert wait_for(lambda: primary.stats['cancelled'] == 1)
+    assert primary.stats['completed'] == 0
+
+    # Both backends' latencies are recorded: the winner's, and the loser's as a lower bound
+    assert client.latency('backup').count == 1
+    assert wait_for(lambda: client.latency('openai').count == 1)
+    assert client.latency('openai').percentile(50) >= 1.5 / 1.2
+
+
+def test_invalid_response_falls_through_to_the_other_backend(servers):
+    primary = servers(reply=MEAL_JSON, delay=0.8)
+    secondary = servers(reply='{"name_en": "Half a recipe"}', delay=0.0)
+    client = hedging_client(primary, secondary)
+
+    response, elapsed = hedged_call(client)
+
+    # The secondary answered first, but its meal failed check_meal_response
+    assert response.provider == 'openai'
+    check_meal_response(response)
+    assert elapsed >= 0.8
+    assert client.hedge_stats['secondary_wins'] == 0
+    assert secondary.stats['completed'] == 1
+
+    assert client.latency('openai').count == 1
+    assert client.latency('backup').failures == 1
+
+
+def test_failing_primary_is_hedged_at_once(servers):
+    primary = servers(status=503)
+    secondary = servers(reply=MEAL_JSON)
+    client = hedging_client(primary, secondary)
+
+    response, elapsed = hedged_call(client)
+
+    assert response.provider == 'backup'
+    assert elapsed < BUDGET
+    assert client.latency('openai').failures == 1
+
+
+def test_both_invalid_raises(servers):
+    primary = servers(reply='not json')
+    secondary = servers(reply='not json either')
+    client = hedging_client(primary, secondary)
+
+    with pytest.raises(LLMError):
+        hedged_call(client)
+
+
+def test_budget_follows_the_primary_latency_percentile(servers):
+    primary = servers(reply=MEAL_JSON)
+    secondary = servers(reply=MEAL_JSON)
+    client = hedging_client(primary, secondary)
+    histogram = client.latency('openai')
+
+    assert client.hedge_budget('openai') == BUDGET
+    for _ in range(30):
+        histogram.record(0.1)
+    assert client.hedge_budget('openai') == pytest.approx(0.1, rel=0.2)
@@ -0,0 +1,129 @@
+"""
+Offline meal composer: dietary restrictions and the AI fallback
+"""
+
+import pytest
+
+from app.llm import LLMError
+from app.meal_recommender import meal_generator
+from app.meal_recommender.meal_composer import (
+    MEAL_TEMPLATES, UnsupportedRestriction, compose_meal, meal_composer, restricted_ingredients
+)
+from conftest import make_family
+
+
+def ingredient_names(meal_data):
+    return {item['name_en'] for item in meal_data['ingredients']}
+
+
+@pytest.mark.parametrize('restriction, excluded', [
+    ('nuts', {'Nuts (Mixed)'}),
+    ('Peanut allergy', {'Nuts (Mixed)'}),
+    ('nut-free', {'Nuts (Mixed)'}),
+    ('chickpea', {'Chickpeas'}),
+    ('Chickpeas', {'Chickpeas'}),
+    ('strawberry', {'Strawberries'}),
+    ('tomatoes', {'Tomato'}),
+    ('bay leaf', {'Bay Leaves'}),
+    ('eggs', {'Eggs'}),
+    ('eggplant', {'Eggplant'}),
+    ('lactose intolerant', {'Milk', 'Yogurt (Laban)', 'Cheese (White)', 'Labneh', 'Butter'}),
+    ('legumes', {'Lentils', 'Chickpeas', 'Fava Beans', 'Nuts (Mixed)'}),
+    ('citrus', {'Orange', 'Lemon', 'Dried Lemon'}),
+    ('vegetarian', {'Chicken', 'Beef', 'Lamb', 'Fish', 'Shrimp'}),
+    ('halal', set()),
+    ('حساسية من المكسرات', {'Nuts (Mixed)'}),
+    ('حساسية الفول السوداني', {'Nuts (Mixed)'}),
+])
+def test_restrictions_map_onto_ingredients(restriction, excluded):
+    assert restricted_ingredients([restriction]) == excluded
+
+
+def test_vegan_rules_out_every_animal_product():
+    excluded = restricted_ingredients(['vegan'])
+
+    assert {'Chicken', 'Fish', 'Eggs', 'Milk', 'Yogurt (Laban)', 'Honey'} <= excluded
+    assert 'Chickpeas' not in excluded
+
+
+@pytest.mark.parametrize('restriction', ['soy', 'kiwi', 'low sugar', 'allergy', 'pepper', 'no nuts except almonds'])
+def test_restrictions_it_cannot_read_are_refused(restriction):
+    with pytest.raises(UnsupportedRestriction):
+        restricted_ingredients(['nuts', restriction])
+
+    with pytest.raises(ValueError):
+        compose_meal(['Chicken'], 'lunch', 'arabic', [], [restriction])
+
+
+@pytest.mark.parametrize('restrictions, forbidden', [
+    (['chickpea'], {'Chickpeas'}),
+    (['vegetarian'], {'Chicken', 'Beef', 'Lamb', 'Fish', 'Shrimp'}),
+    (['vegan'], {'Chicken', 'Beef', 'Lamb', 'Fish', 'Shrimp', 'Milk', 'Yogurt (Laban)', 'Eggs', 'Honey'}),
+    (['legumes', 'citrus'], {'Chickpeas', 'Lentils', 'Fava Beans', 'Lemon', 'Dried Lemon', 'Orange'}),
+])
+def test_composed_meals_leave_out_restricted_ingredients(restrictions, forbidden):
+    for meal_type in ('breakfast', 'lunch', 'dinner', 'snack', 'dessert'):
+        try:
+            meal_data = compose_meal(['Chickpeas', 'Chicken', 'Yogurt (Laban)'], meal_type, 'arabic', [], restrictions)
+        except ValueError:
+            continue
+        assert not ingredient_names(meal_data) & forbidden, meal_type
+
+
+def test_templates_needing_a_restricted_pantry_item_are_skipped():
+    lemon_templates = {template['key'] for template in MEAL_TEMPLATES
+                       if any(name == 'Lemon' for name, _ in template['pantry'])}
+    assert lemon_templates
+
+    meal_data = compose_meal(['Lentils'], 'lunch', 'arabic', [], ['lemon'])
+
+    assert 'Lemon' not in ingredient_names(meal_data)
+    assert 'lemon' not in meal_data['instructions_en'].lower()
+
+
+def test_composed_meals_are_marked():
+    assert compose_meal(['Chicken'], 'lunch', 'arabic', [], [])['source'] == 'composer'
+
+
+def generation(dietary_restrictions):
+    return dict(selected_ingredients=['Chicken'], meal_type='lunch', cuisine_type='arabic',
+                child_profiles=[], dietary_restrictions=dietary_restrictions, language='en')
+
+
+@pytest.fixture
+def failing_ai(monkeypatch):
+    def stream_meal_events(generation, cache_key, budget_seconds=None):
+        raise LLMError("Model unavailable", provider='openai')
+        yield
+
+    monkeypatch.setattr(meal_generator, 'stream_meal_events', stream_meal_events)
+    monkeypatch.setattr(meal_composer, 'fallback', True)
+
+
+def test_fallback_composes_when_the_ai_fails(failing_ai):
+    events = list(meal_generator.meal_events_with_fallback(generation(['nuts']), 'key'))
+
+    assert events[-1][0] == 'meal'
+    assert events[-1][2]['source'] == 'composer'
+
+
+def test_fallback_surfaces_the_ai_error_for_unreadable_restrictions(failing_ai):
+    with pytest.raises(LLMError, match="Model unavailable"):
+        list(meal_generator.meal_events_with_fallback(generation(['soy']), 'key'))
+
+
+def test_composed_meals_are_saved_as_composed(app):
+    from app.meal_recommender.routes import save_meal_to_database
+    from db.models import db, FamilyProfile, Meal
+
+    user_id, _ = make_family()
+    family_profile = FamilyProfile.query.filter_by(user_id=user_id).one()
+    composed = compose_meal(['Chicken'], 'lunch', 'arabic', [], [])
+    written = {'name_en': 'Lentil Soup', 'name_ar': 'شوربة عدس', 'ingredients': [],
+               'instructions_en': 'Step 1: Boil', 'instructions_ar': 'الخطوة 1: اغلِ'}
+
+    composed_id = save_meal_to_database(family_profile, composed, 'lunch', ['Chicken']).id
+    written_id = save_meal_to_database(family_profile, written, 'lunch', ['Lentils']).id
+
+    assert db.session.get(Meal, composed_id).to_dict()['source'] == 'composer'
+    assert db.session.get(Meal, written_id).source == 'ai'
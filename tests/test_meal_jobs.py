@@ -0,0 +1,91 @@
+"""
+Meal job queue: workers start lazily and recovery leaves live jobs alone
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.models import db, MealJob
+from app.meal_recommender.jobs import MealJobQueue
+from conftest import make_family
+
+
+@pytest.fixture
+def jobs(app):
+    app.config['MEAL_JOB_WORKERS'] = 1
+    queue = MealJobQueue()
+    queue.init_app(app)
+    queue.ran = []
+
+    def handler(job, payload, report):
+        queue.ran.append(job.id)
+        return None
+
+    queue.register('generate', handler)
+    return queue
+
+
+def add_job(job_id, status, owner=None, started_minutes_ago=None):
+    family_profile_id = make_family(email=f'{job_id}@example.com')[0]
+    job = MealJob(id=job_id, family_profile_id=family_profile_id, kind='generate', status=status, owner=owner)
+    if started_minutes_ago is not None:
+        job.started_at = datetime.utcnow() - timedelta(minutes=started_minutes_ago)
+    job.set_payload({})
+    db.session.add(job)
+    db.session.commit()
+
+
+def wait_for(jobs, count):
+    """Until `count` jobs have run and been marked done"""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        if len(jobs.ran) >= count and MealJob.query.filter_by(status=MealJob.DONE).count() >= count:
+            return
+        time.sleep(0.01)
+
+
+def status(job_id):
+    db.session.expire_all()
+    return db.session.get(MealJob, job_id).status
+
+
+def test_workers_do_not_start_on_init(app, jobs):
+    add_job('queued', MealJob.QUEUED)
+    assert jobs.stats()['workers'] == 0
+    assert status('queued') == MealJob.QUEUED
+    assert jobs.ran == []
+
+
+def test_first_request_starts_workers_and_runs_queued_jobs(app, jobs, client):
+    add_job('queued', MealJob.QUEUED)
+    client.get('/activities/api/stats')
+    wait_for(jobs, 1)
+
+    assert jobs.stats()['workers'] == 1
+    assert jobs.ran == ['queued']
+    assert status('queued') == MealJob.DONE
+
+
+def test_running_job_of_a_live_process_is_left_alone(app, jobs):
+    add_job('live', MealJob.RUNNING, owner='other-host:42', started_minutes_ago=1)
+    add_job('expired', MealJob.RUNNING, owner='other-host:43', started_minutes_ago=11)
+    add_job('mine', MealJob.RUNNING, owner=jobs.owner, started_minutes_ago=1)
+    jobs.start()
+    wait_for(jobs, 2)
+
+    assert sorted(jobs.ran) == ['expired', 'mine']
+    assert status('live') == MealJob.RUNNING
+
+
+def test_periodic_sweep_only_takes_expired_jobs(app, jobs):
+    add_job('fresh-queued', MealJob.QUEUED)
+    add_job('running-here', MealJob.RUNNING, owner=jobs.owner, started_minutes_ago=1)
+    add_job('expired', MealJob.RUNNING, owner='other-host:43', started_minutes_ago=11)
+
+    assert jobs._recover(startup=False) == 1
+    assert status('running-here') == MealJob.RUNNING
+    assert status('fresh-queued') == MealJob.QUEUED
+    assert status('expired') == MealJob.QUEUED
@@ -0,0 +1,122 @@
+"""
+Incremental meal JSON parser: every split of real responses must parse
+exactly like json.loads and produce the same events
+"""
+
+import json
+
+import pytest
+
+from app.meal_recommender.meal_stream import PartialMealParser, meal_events, sse_event
+
+
+MEAL = {
+    "name_en": "Chicken Machboos with \"Loomi\" 🍗",
+    "name_ar": "مجبوس دجاج باللومي",
+    "ingredients": [
+        {"name_en": "Chicken", "name_ar": "دجاج", "amount": "500g", "icon": "🍗"},
+        {"name_en": "Rice (Basmati)", "name_ar": "أرز بسمتي", "amount": "2 cups", "icon": "🍚"},
+        {"name_en": "Dried Lemon", "name_ar": "لومي", "amount": "2 pieces", "icon": "🍋"},
+        {"name_en": "Salt \\ pepper", "name_ar": "ملح", "amount": "to taste", "icon": "🧂"},
+    ],
+    "instructions_en": "Step 1: Say Bismillah and wash the rice 🍚\nStep 2: Brown the chicken, add \"loomi\"\n"
+                       "Step 3: Cook 20 min\tthen rest\nStep 4: Serve with C:\\u-shaped spoon 😋",
+    "instructions_ar": "الخطوة 1: قل بسم الله واغسل الأرز\nالخطوة 2: حمّر الدجاج 🍗\nالخطوة 3: قدّمه ساخنًا",
+    "prep_time": "15 minutes",
+    "cook_time": "45 minutes",
+    "servings": 4,
+    "tips": ["Soak the rice", "Use less salt for toddlers", 3, None, True],
+    "nutrition": {"per_serving": {"energy_kcal": 512.5, "protein_g": 31}, "flags": []},
+    "empty": [],
+    "ready": False,
+}
+
+RESPONSES = {
+    'compact': json.dumps(MEAL, ensure_ascii=False),
+    'escaped': json.dumps(MEAL),  # every non-ASCII character as \uXXXX (emoji as surrogate pairs)
+    'indented': json.dumps(MEAL, ensure_ascii=False, indent=4),
+    'fenced': "```json\n" + json.dumps(MEAL, indent=2) + "\n```",
+    'chatty': "Here is your recipe:\n" + json.dumps(MEAL, ensure_ascii=False, separators=(' , ', ' : ')) + "\nEnjoy!",
+}
+
+
+def expected_events(meal):
+    """The item and field events of a finished meal, in order"""
+    return list(meal_events(meal))
+
+
+def parse(chunks):
+    """Feed chunks; returns (parser, item/field events, partial events)"""
+    parser = PartialMealParser()
+    events = []
+    for chunk in chunks:
+        events += parser.feed(chunk)
+    return parser, [event for event in events if event[0] != 'partial'], [event for event in events if event[0] == 'partial']
+
+
+def check_partials(partials, meal):
+    """Partial texts only grow, and each is a prefix of the finished string"""
+    previous = {}
+    for _, key, text in partials:
+        assert meal[key].startswith(text), (key, text)
+        assert len(text) > len(previous.get(key, ''))
+        previous[key] = text
+
+
+@pytest.mark.parametrize('name', RESPONSES)
+def test_every_two_way_split(name):
+    text = RESPONSES[name]
+    for index in range(len(text) + 1):
+        parser, events, partials = parse([text[:index], text[index:]])
+        assert parser.complete
+        assert parser.result() == MEAL
+        assert events == expected_events(MEAL), index
+        check_partials(partials, MEAL)
+
+
+@pytest.mark.parametrize('name', RESPONSES)
+def test_one_character_at_a_time(name):
+    text = RESPONSES[name]
+    parser, events, partials = parse(text)
+    assert parser.result() == MEAL
+    assert events == expected_events(MEAL)
+    check_partials(partials, MEAL)
+    # Streamed character by character, the last partial is the whole text but the final quote
+    assert [text for _, key, text in partials if key == 'instructions_en'][-1] == MEAL['instructions_en']
+    assert [text for _, key, text in partials if key == 'instructions_ar'][-1] == MEAL['instructions_ar']
+
+
+def test_splits_inside_unicode_escapes_never_send_half_characters():
+    text = RESPONSES['escaped']
+    start = text.index('"instructions_en"')
+    for index in range(start, text.index('"prep_time"')):
+        parser, _, partials = parse([text[:index], text[index:]])
+        check_partials(partials, MEAL)
+        for _, _, partial in partials:
+            partial.encode('utf-8')  # a lone surrogate would raise here
+            sse_event('partial', partial).encode('utf-8')
+
+
+def test_events_arrive_as_soon_as_values_complete():
+    text = RESPONSES['compact']
+    first_item_end = text.index('}', text.index('"ingredients"')) + 1
+    parser = PartialMealParser()
+
+    events = parser.feed(text[:first_item_end])
+    assert ('field', 'name_ar', MEAL['name_ar']) in events
+    assert events[-1] == ('item', 'ingredients', MEAL['ingredients'][0])
+    assert not parser.complete
+
+
+def test_cut_off_response_raises():
+    text = RESPONSES['compact']
+    parser, _, _ = parse([text[:-1]])
+    assert not parser.complete
+    with pytest.raises(ValueError):
+        parser.result()
+
+
+def test_text_after_the_object_is_ignored():
+    parser, events, _ = parse([RESPONSES['compact'], '\n{"second": "object"}'])
+    assert parser.result() == MEAL
+    assert events == expected_events(MEAL)
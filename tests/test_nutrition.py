@@ -0,0 +1,106 @@
+"""
+Meal nutrition: amount parsing, food matching, age bands and child flags
+"""
+
+import pytest
+
+from app.meal_recommender.nutrition import (
+    TO_TASTE_GRAMS, age_band, calculate_meal_nutrition, calculate_nutrition_batch, match_food, parse_amount,
+    parse_servings
+)
+
+
+@pytest.mark.parametrize('amount, food, grams', [
+    ('200g', 'Chicken', 200),
+    ('200 grams', 'Chicken', 200),
+    ('1.5 kg', 'Lamb', 1500),
+    ('1 cup', 'Milk', 240),
+    ('1 cup', 'Rice (Basmati)', 240 * 0.78),
+    ('2 tbsp', 'Olive Oil', 30 * 0.92),
+    ('1 1/2 cups', 'Milk', 360),
+    ('1/2 cup', 'Lentils', 120 * 0.8),
+    ('½ tsp', 'Salt', 2.5 * 1.2),
+    ('¾ cup', 'Yogurt (Laban)', 180 * 1.03),
+    ('2-3 medium', 'Tomato', 2.5 * 120),
+    ('3 cloves', 'Garlic', 15),
+    ('2 large', 'Eggs', 2 * 1.3 * 50),
+    ('a pinch', 'Salt', 0.4),
+    ('2', 'Eggs', 100),
+])
+def test_parse_amount(amount, food, grams):
+    parsed, estimated = parse_amount(amount, food)
+    assert parsed == pytest.approx(grams)
+    assert estimated is False
+
+
+@pytest.mark.parametrize('amount, food, grams', [
+    ('to taste', 'Salt', TO_TASTE_GRAMS),
+    ('as needed', 'Vegetable Oil', TO_TASTE_GRAMS),
+    ('some', 'Carrot', 60),
+    (None, 'Cheese (White)', 100),
+])
+def test_unreadable_amounts_are_estimated(amount, food, grams):
+    assert parse_amount(amount, food) == (pytest.approx(grams), True)
+
+
+@pytest.mark.parametrize('value, servings', [(4, 4), ('6', 6), ('4-6 servings', 4), (None, 4), ('lots', 4), ('0', 1)])
+def test_parse_servings(value, servings):
+    assert parse_servings(value) == servings
+
+
+@pytest.mark.parametrize('name, food', [
+    ('Sweet potatoes', 'Sweet Potato'),
+    ('Potatoes', 'Potato'),
+    ('Basmati rice', 'Rice (Basmati)'),
+    ('Cherry tomatoes', 'Tomato'),
+    ('Greek yoghurt', 'Yogurt (Laban)'),
+    ('Unicorn dust', None),
+])
+def test_match_food(name, food):
+    assert match_food(name) == food
+
+
+@pytest.mark.parametrize('age, band', [(0, '0-1'), (0.5, '0-1'), (1, '1-3'), (3, '1-3'), (3.9, '1-3'), (4, '4-8'),
+                                       (8, '4-8'), (9, '9-13'), (13, '9-13'), (None, '4-8')])
+def test_age_band(age, band):
+    assert age_band(age)[0] == band
+
+
+def flag_codes(nutrition):
+    return {(flag['code'], flag['age_band']) for flag in nutrition['flags']}
+
+
+def test_honey_grapes_snack_flags_per_age_band():
+    nutrition = calculate_meal_nutrition(
+        [{'name_en': 'Honey', 'amount': '1 tbsp'}, {'name_en': 'Grapes', 'amount': '1 cup'}],
+        'snack', child_ages=[0.5, 2, 6]
+    )
+    assert flag_codes(nutrition) == {
+        ('honey_under_1', '0-1'), ('added_sugar_under_2', '0-1'), ('choking_risk', '0-1'),
+        ('high_added_sugar', '1-3'), ('choking_risk', '1-3'),
+        ('high_added_sugar', '4-8'),
+    }
+    assert nutrition['added_sugar_g'] == pytest.approx(15 * 1.42 * 0.821 / 4, abs=0.1)
+
+
+def test_salty_protein_lunch_flags():
+    nutrition = calculate_meal_nutrition(
+        [{'name_en': 'Chicken breast', 'amount': '500g'}, {'name_en': 'Salt', 'amount': '2 tsp'},
+         {'name_en': 'Lentils', 'amount': '2 cups'}],
+        'lunch', child_ages=[5, 6], servings=4
+    )
+    assert flag_codes(nutrition) == {('good_protein', '4-8'), ('good_fibre', '4-8'), ('high_sodium', '4-8')}
+    assert nutrition['per_serving']['protein_g'] == pytest.approx((500 * 0.196 + 384 * 0.246) / 4, abs=0.1)
+
+
+def test_batch_reports_coverage_and_unmatched():
+    first, second = calculate_nutrition_batch([
+        {'ingredients': [{'name_en': 'Banana', 'amount': '2'}, {'name_en': 'Unicorn dust', 'amount': '1 tsp'}],
+         'meal_type': 'snack', 'child_ages': [3]},
+        {'ingredients': [], 'meal_type': 'dinner'},
+    ])
+    assert first['coverage'] == 0.5
+    assert first['unmatched'] == ['Unicorn dust']
+    assert first['per_serving']['energy_kcal'] == pytest.approx(2 * 118 * 0.89 / 4, abs=0.1)
+    assert second['coverage'] == 0.0
+    assert second['per_serving']['energy_kcal'] == 0
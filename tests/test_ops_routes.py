@@ -0,0 +1,78 @@
+"""
+Operations endpoints: bearer token only, never a family login
+"""
+
+import pytest
+
+from app.ops.routes import ops_bp
+from db.models import db, LLMUsage
+from conftest import make_family, log_in
+
+
+TOKEN = 'ops-secret'
+
+
+@pytest.fixture
+def ops_client(app):
+    app.register_blueprint(ops_bp)
+    app.config['OPS_API_TOKEN'] = TOKEN
+    return app.test_client()
+
+
+def bearer(token=TOKEN):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_latency_needs_the_token(ops_client):
+    assert ops_client.get('/ops/llm-latency').status_code == 401
+    assert ops_client.get('/ops/llm-latency', headers=bearer('wrong')).status_code == 401
+    assert ops_client.get('/ops/llm-latency', headers={'Authorization': TOKEN}).status_code == 401
+
+    response = ops_client.get('/ops/llm-latency', headers=bearer())
+    assert response.status_code == 200
+    assert isinstance(response.get_json(), dict)
+
+
+def test_family_login_is_not_enough(ops_client):
+    user_id, _ = make_family()
+    log_in(ops_client, user_id)
+
+    assert ops_client.get('/ops/llm-latency').status_code == 401
+
+
+def test_routes_are_hidden_without_a_configured_token(app, ops_client):
+    app.config['OPS_API_TOKEN'] = ''
+
+    assert ops_client.get('/ops/llm-latency').status_code == 404
+    assert ops_client.get('/ops/llm-latency', headers={'Authorization': 'Bearer '}).status_code == 404
+
+
+def test_breakers_need_the_token(ops_client):
+    assert ops_client.get('/ops/llm-breakers').status_code == 401
+    assert ops_client.get('/meals/api/llm-breakers').status_code == 404
+
+    response = ops_client.get('/ops/llm-breakers', headers=bearer())
+    assert response.status_code == 200
+    assert isinstance(response.get_json(), dict)
+
+
+def test_usage_needs_the_token_and_filters_by_user(ops_client):
+    user_id, _ = make_family()
+    other_id, _ = make_family(email='other@example.com')
+    for owner in (user_id, user_id, other_id):
+        db.session.add(LLMUsage(user_id=owner, feature='meal', provider='stub', duration_ms=100,
+                                input_tokens=10, output_tokens=20))
+    db.session.commit()
+
+    log_in(ops_client, user_id)
+    assert ops_client.get('/ops/llm-usage').status_code == 401
+    assert ops_client.get('/meals/api/llm-usage').status_code == 404
+
+    everyone = ops_client.get('/ops/llm-usage', headers=bearer()).get_json()
+    assert everyone['days'] == 30 and everyone['user_id'] is None
+    assert [(row['feature'], row['calls']) for row in everyone['features']] == [('meal', 3)]
+    assert 'process' in everyone
+
+    one_user = ops_client.get(f'/ops/llm-usage?user_id={user_id}&days=7', headers=bearer()).get_json()
+    assert one_user['days'] == 7 and one_user['user_id'] == user_id
+    assert [(row['feature'], row['calls']) for row in one_user['features']] == [('meal', 2)]
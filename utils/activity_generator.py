@@ -4,25 +4,62 @@ Uses Gemini AI to generate bilingual (Arabic/English) activities
 Cultural context: UAE/Islamic values
 """
 
-from google import genai
-from google.genai import types
+import sys
 import os
 import json
+import random
 from dotenv import load_dotenv
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Add parent directory to path (for the shared LLM client)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from constants import HOME_AREAS, ACTIVITY_CATEGORIES, AGE_RANGES
 from prompts import get_batch_activity_generation_prompt
+from rate_limiter import TokenBucket
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini
-client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
+from app.llm import llm, CircuitOpenError
+
+# Backend and model used for activity generation
+ACTIVITY_PROVIDER = 'gemini'
+ACTIVITY_MODEL = "gemini-2.5-pro"
+
+# Rate limiting defaults (Gemini Free Tier: 50 requests/minute)
+DEFAULT_RPM = 40
+MAX_RETRIES = 2
+MAX_RATE_LIMIT_RETRIES = 6
+
+
+def is_rate_limit_error(error):
+    """Check whether an API error means we hit the provider's quota"""
+    if getattr(error, 'code', None) == 429 or getattr(error, 'status_code', None) == 429:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'resource_exhausted' in message or 'rate limit' in message
+
+
+def retry_delay(retry_count, rate_limited=False):
+    """
+    Exponential backoff with jitter
+    
+    Args:
+        retry_count: Number of retries already attempted
+        rate_limited: Back off longer after a rate-limit error
+    
+    Returns:
+        Seconds to wait before the next attempt
+    """
+    base = 5 if rate_limited else 2
+    delay = min(base * (2 ** retry_count), 120)
+    return delay * random.uniform(0.5, 1.0)
 
 
 
-def generate_activities_batch(home_area, category, age_range, num_activities, retry_count=0):
+def generate_activities_batch(home_area, category, age_range, num_activities, retry_count=0, rate_limiter=None):
     """
     Generate a single bilingual activity using Gemini AI
     
@@ -31,6 +68,7 @@ def generate_activities_batch(home_area, category, age_range, num_activities, re
         category: Key from ACTIVITY_CATEGORIES (e.g., "cooking")
         age_range: Age range string (e.g., "3-5 years")
         retry_count: Number of retries attempted (internal use)
+        rate_limiter: Optional TokenBucket shared by all workers
     
     Returns:
         dict: Activity data with bilingual content, or None if failed
@@ -39,13 +77,22 @@ def generate_activities_batch(home_area, category, age_range, num_activities, re
     # Get the prompt
     prompt = get_batch_activity_generation_prompt(home_area, category, age_range, num_activities)
     
+    result_text = ''
     try:
+        # Wait for our turn within the requests-per-minute quota
+        if rate_limiter:
+            rate_limiter.acquire()
+        
         # Generate content with Gemini
-        print("Generating {num_activities} activities...")
-        response = client.models.generate_content(
-            model="gemini-2.5-pro",
-            contents=prompt,
-            config = types.GenerateContentConfig(temperature=1.8)
+        print(f"Generating {num_activities} activities...")
+        # Retries stay here, where rate limits can back off the shared bucket
+        response = llm.complete(
+            prompt=prompt,
+            provider=ACTIVITY_PROVIDER,
+            model=ACTIVITY_MODEL,
+            temperature=1.8,
+            retries=0,
+            purpose='activity-batch'
         )
         result_text = response.text.strip()
         
@@ -105,40 +152,74 @@ def generate_activities_batch(home_area, category, age_range, num_activities, re
         print(f"  Response preview: {result_text[:300]}...")
         
         # Retry logic
-        if retry_count < 2:
+        if retry_count < MAX_RETRIES:
             print(f"  🔄 Retrying... (attempt {retry_count + 1})")
-            time.sleep(3)
-            return generate_activities_batch(home_area, category, age_range, num_activities, retry_count + 1)
+            time.sleep(retry_delay(retry_count))
+            return generate_activities_batch(home_area, category, age_range, num_activities, retry_count + 1, rate_limiter)
         
         return []
         
     except Exception as e:
         print(f"  ❌ Generation Error: {e}")
         
+        # Provider is down: wait until its circuit lets a trial call through
+        if isinstance(e, CircuitOpenError):
+            if retry_count < MAX_RATE_LIMIT_RETRIES:
+                print(f"  ⏸️  {e.provider} unavailable, waiting {e.retry_after:.0f}s... (attempt {retry_count + 1})")
+                time.sleep(e.retry_after + random.uniform(0, 1))
+                return generate_activities_batch(home_area, category, age_range, num_activities, retry_count + 1, rate_limiter)
+            return []
+        
+        # Rate limited: back off (all workers, if sharing a bucket) and retry longer
+        if is_rate_limit_error(e):
+            if retry_count < MAX_RATE_LIMIT_RETRIES:
+                delay = retry_delay(retry_count, rate_limited=True)
+                print(f"  ⏸️  Rate limited, backing off {delay:.0f}s... (attempt {retry_count + 1})")
+                if rate_limiter:
+                    rate_limiter.penalize(delay)
+                else:
+                    time.sleep(delay)
+                return generate_activities_batch(home_area, category, age_range, num_activities, retry_count + 1, rate_limiter)
+            return []
+        
         # Retry logic
-        if retry_count < 2:
+        if retry_count < MAX_RETRIES:
             print(f"  🔄 Retrying... (attempt {retry_count + 1})")
-            time.sleep(3)
-            return generate_activities_batch(home_area, category, age_range, num_activities, retry_count + 1)
+            time.sleep(retry_delay(retry_count))
+            return generate_activities_batch(home_area, category, age_range, num_activities, retry_count + 1, rate_limiter)
         
         return []
 
 
-def generate_all_activities(activities_per_combination=5):
+def all_combinations():
+    """Every HOME_AREAS x ACTIVITY_CATEGORIES x AGE_RANGES combination"""
+    return [
+        (home_area, category, age_range)
+        for home_area in HOME_AREAS.keys()
+        for category in ACTIVITY_CATEGORIES.keys()
+        for age_range in AGE_RANGES
+    ]
+
+
+def generate_activity_batches(activities_per_combination=5, concurrency=1, rpm=DEFAULT_RPM, skip_combinations=None):
     """
-    Generate all activities for all combinations
-    Now generates in batches for better variety and speed
+    Generate activities combination by combination, yielding each batch as it finishes
+    Nothing is kept after a batch is yielded, so memory stays flat
     
     Args:
         activities_per_combination: Number of activities per combination (default: 5)
+        concurrency: Number of combinations generated in parallel (default: 1)
+        rpm: Requests per minute allowed by the provider quota
+        skip_combinations: Set of (home_area, category, age_range) already done
     
-    Returns:
-        list: List of all successfully generated activity dictionaries
+    Yields:
+        ((home_area, category, age_range), list of activity dictionaries)
     """
-    all_activities = []
+    skip_combinations = skip_combinations or set()
+    combinations = [combination for combination in all_combinations() if combination not in skip_combinations]
     
     # Calculate totals
-    total_combinations = len(HOME_AREAS) * len(ACTIVITY_CATEGORIES) * len(AGE_RANGES)
+    total_combinations = len(combinations)
     total_to_generate = total_combinations * activities_per_combination
     
     # Statistics
@@ -146,57 +227,81 @@ def generate_all_activities(activities_per_combination=5):
     total_successful = 0
     total_failed_combinations = 0
     
+    # Shared rate limiter: tokens refill at the provider quota, bursting up to one per worker
+    rate_limiter = TokenBucket(rpm=rpm, burst=concurrency)
+    
     # Header
     print("=" * 70)
     print("  🌟 HEALTH HEROES - BATCH ACTIVITY GENERATION 🌟")
     print("=" * 70)
     print(f"📊 Total combinations: {total_combinations}")
+    if skip_combinations:
+        print(f"⏭️  Already done (skipped): {len(skip_combinations)}")
     print(f"📊 Activities per combination: {activities_per_combination}")
     print(f"📊 Total activities to generate: {total_to_generate}")
     print(f"🌍 Languages: Arabic (العربية) + English")
     print(f"🇦🇪 Cultural context: UAE/Islamic values")
-    print(f"⚡ Method: Batch generation (faster & better variety)")
+    print(f"⚡ Method: Batch generation, {concurrency} worker(s) at up to {rpm} requests/minute")
     print("=" * 70)
     
     start_time = time.time()
     
-    # Generate for each combination
-    for home_area in HOME_AREAS.keys():
-        for category in ACTIVITY_CATEGORIES.keys():
-            for age_range in AGE_RANGES:
+    def generate_combination(combination):
+        home_area, category, age_range = combination
+        return generate_activities_batch(
+            home_area,
+            category,
+            age_range,
+            num_activities=activities_per_combination,
+            rate_limiter=rate_limiter
+        )
+    
+    # Bounded worker pool; at most two combinations per worker are in flight,
+    # so finished-but-unconsumed batches never pile up in memory
+    pending_combinations = iter(combinations)
+    max_in_flight = max(1, concurrency) * 2
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    futures = {}
+    
+    try:
+        while True:
+            for combination in pending_combinations:
+                futures[executor.submit(generate_combination, combination)] = combination
+                if len(futures) >= max_in_flight:
+                    break
+            
+            if not futures:
+                break
+            
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                combination = futures.pop(future)
+                home_area, category, age_range = combination
                 current += 1
                 
-                # Display current combination
+                # Display finished combination
                 location_en = HOME_AREAS[home_area]["en"]
                 category_en = ACTIVITY_CATEGORIES[category]["en"]
                 
                 print(f"\n[{current}/{total_combinations}] 📍 {location_en} | 🎯 {category_en} | 👶 {age_range}")
                 print("-" * 70)
                 
-                # Generate batch of activities
-                activities_batch = generate_activities_batch(
-                    home_area, 
-                    category, 
-                    age_range,
-                    num_activities=activities_per_combination
-                )
+                try:
+                    activities_batch = future.result()
+                except Exception as e:
+                    print(f"  ❌ Worker error: {e}")
+                    activities_batch = []
                 
                 if activities_batch:
-                    all_activities.extend(activities_batch)
                     total_successful += len(activities_batch)
                     print(f"  ✅ Successfully generated {len(activities_batch)} activities")
+                    yield combination, activities_batch
                 else:
                     total_failed_combinations += 1
                     print(f"  ❌ Failed to generate activities for this combination")
-                
-                # Delay to avoid rate limiting
-                time.sleep(1.5)
-
-                # Every 40 requests, wait extra time
-                if current % 40 == 0:
-                    print(f"\n⏸️  Rate limit protection: Pausing for 70 seconds...")
-                    print(f"   (Gemini Free Tier: 50 requests/minute)")
-                    time.sleep(70)
+    finally:
+        # On interruption, don't start any combination that hasn't begun yet
+        executor.shutdown(wait=True, cancel_futures=True)
     
     # Calculate elapsed time
     elapsed_time = time.time() - start_time
@@ -209,15 +314,125 @@ def generate_all_activities(activities_per_combination=5):
     print("=" * 70)
     print(f"✅ Successfully generated: {total_successful} activities")
     print(f"❌ Failed combinations: {total_failed_combinations}")
-    print(f"📈 Success rate: {(total_successful/total_to_generate)*100:.1f}%")
+    if total_to_generate:
+        print(f"📈 Success rate: {(total_successful/total_to_generate)*100:.1f}%")
+        print(f"⚡ Average: {elapsed_time/total_combinations:.1f} seconds per combination")
     print(f"⏱️  Time taken: {minutes} minutes {seconds} seconds")
-    print(f"⚡ Average: {elapsed_time/total_combinations:.1f} seconds per combination")
-    print(f"💾 Ready to save to database!")
     print("=" * 70)
+
+
+def generate_all_activities(activities_per_combination=5, concurrency=1, rpm=DEFAULT_RPM):
+    """
+    Generate all activities for all combinations
+    Now generates in batches for better variety and speed
+    
+    Args:
+        activities_per_combination: Number of activities per combination (default: 5)
+        concurrency: Number of combinations generated in parallel (default: 1)
+        rpm: Requests per minute allowed by the provider quota
+    
+    Returns:
+        list: List of all successfully generated activity dictionaries
+    """
+    all_activities = []
+    
+    for _, activities_batch in generate_activity_batches(activities_per_combination, concurrency, rpm):
+        all_activities.extend(activities_batch)
+    
+    print(f"💾 Ready to save to database!")
     
     return all_activities
 
 
+# ============================================
+# STREAMING / CHECKPOINTED GENERATION
+# ============================================
+
+def read_checkpoint(checkpoint_path):
+    """
+    Read a JSONL checkpoint, one finished combination per line
+    A torn last line (crash mid-write) is ignored
+    
+    Args:
+        checkpoint_path: Path to the .jsonl checkpoint file
+    
+    Yields:
+        dict: {"home_area", "category", "age_range", "activities": [...]}
+    """
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return
+    
+    with open(checkpoint_path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️  Skipping unreadable checkpoint line {line_number}")
+
+
+def completed_combinations(checkpoint_path):
+    """Get the set of (home_area, category, age_range) already in a checkpoint"""
+    return {
+        (entry['home_area'], entry['category'], entry['age_range'])
+        for entry in read_checkpoint(checkpoint_path)
+    }
+
+
+def stream_all_activities(checkpoint_path, activities_per_combination=5, concurrency=1, rpm=DEFAULT_RPM, on_batch=None):
+    """
+    Generate all activities, appending each finished batch to a JSONL checkpoint
+    
+    A restarted run skips every combination already in the checkpoint, so an
+    interrupted run only loses the batches that were in flight.
+    
+    Args:
+        checkpoint_path: Path to the .jsonl checkpoint file (created if missing)
+        activities_per_combination: Number of activities per combination (default: 5)
+        concurrency: Number of combinations generated in parallel (default: 1)
+        rpm: Requests per minute allowed by the provider quota
+        on_batch: Optional callback(activities_batch), e.g. to commit straight
+                  to the database; called after the batch is checkpointed
+    
+    Returns:
+        int: Number of activities generated in this run
+    """
+    done = completed_combinations(checkpoint_path)
+    generated = 0
+    
+    # Make sure a torn last line doesn't swallow the next entry
+    if os.path.exists(checkpoint_path) and os.path.getsize(checkpoint_path) > 0:
+        with open(checkpoint_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+        if torn:
+            with open(checkpoint_path, 'a', encoding='utf-8') as f:
+                f.write("\n")
+    
+    with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        batches = generate_activity_batches(activities_per_combination, concurrency, rpm, skip_combinations=done)
+        
+        for (home_area, category, age_range), activities_batch in batches:
+            entry = {
+                'home_area': home_area,
+                'category': category,
+                'age_range': age_range,
+                'activities': activities_batch
+            }
+            checkpoint.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+            
+            if on_batch:
+                on_batch(activities_batch)
+            
+            generated += len(activities_batch)
+    
+    return generated
+
+
 def test_batch_generation():
     """
     Test generating a batch of activities
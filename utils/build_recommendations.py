@@ -0,0 +1,261 @@
+"""
+Recommendation Builder
+Offline item-item collaborative filtering over activity completions and ratings;
+saves top-N similar activities per activity and top-N recommendations per user
+"""
+
+import sys
+import os
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import insert
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.models import db, Activity, ActivityCatalogVersion, ActivityCompletion, ActivitySimilarity, UserRecommendation
+from app.screen_free_activities.catalog_versions import counterparts_in_version
+
+
+# Rows kept per activity / per user
+DEFAULT_TOP_N = 20
+
+# Weight of a completion without a rating
+IMPLICIT_WEIGHT = 0.6
+
+# Rated completions are centred on this rating: 5 stars weigh +1, 3 stars
+# nothing and 1 star -1, so a disliked activity pushes its neighbours down
+NEUTRAL_RATING = 3
+
+
+def load_interactions():
+    """
+    Read every completion as a (user, activity, weight) triple
+    (see rating_weights); repeated completions of the same activity add up
+
+    Returns:
+        (user_ids, activity_ids, weights) numpy arrays
+    """
+    rows = db.session.query(
+        ActivityCompletion.user_id,
+        ActivityCompletion.activity_id,
+        ActivityCompletion.rating
+    ).all()
+
+    if not rows:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+    user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    activity_ids = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    ratings = np.fromiter((row[2] or 0 for row in rows), dtype=np.float32, count=len(rows))
+    return user_ids, activity_ids, rating_weights(ratings)
+
+
+def rating_weights(ratings):
+    """
+    Interaction weights for ratings: (rating - NEUTRAL_RATING) / 2, so 1-2
+    stars count against an activity; unrated completions (0) get IMPLICIT_WEIGHT
+
+    Args:
+        ratings: numpy array of 1-5 ratings, 0 where there is none
+
+    Returns:
+        float32 numpy array
+    """
+    centred = (ratings - NEUTRAL_RATING) / 2.0
+    return np.where(ratings > 0, centred, IMPLICIT_WEIGHT).astype(np.float32)
+
+
+def map_to_live(activity_ids):
+    """
+    Point completions of earlier catalog versions at the same activities in
+    the live one (each build gives every activity a new ID), so what users
+    did before a catalog swap still counts
+
+    Args:
+        activity_ids: numpy array of completed activity IDs
+
+    Returns:
+        numpy array of the same length; activities with no live counterpart keep their ID
+    """
+    unique_ids = np.unique(activity_ids)
+    counterparts = counterparts_in_version(unique_ids.tolist(), ActivityCatalogVersion.live_id())
+    mapped = np.array([counterparts.get(int(activity_id), activity_id) for activity_id in unique_ids], dtype=np.int64)
+    return mapped[np.searchsorted(unique_ids, activity_ids)]
+
+
+def build_matrix(user_ids, activity_ids, weights):
+    """
+    Build the sparse user x activity matrix
+
+    Returns:
+        (csr_matrix, completed csr_matrix, user index array, activity index array);
+        `completed` marks every pair with a completion (also ones whose weights
+        cancel out), the index arrays map matrix rows / columns back to database IDs
+    """
+    user_index, rows = np.unique(user_ids, return_inverse=True)
+    activity_index, cols = np.unique(activity_ids, return_inverse=True)
+    shape = (len(user_index), len(activity_index))
+
+    # Duplicate (row, col) pairs are summed when converting to CSR
+    matrix = sparse.coo_matrix((weights, (rows, cols)), shape=shape, dtype=np.float32).tocsr()
+    matrix.eliminate_zeros()
+    completed = sparse.coo_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape).tocsr()
+    return matrix, completed, user_index, activity_index
+
+
+def item_similarities(matrix):
+    """
+    Cosine similarity between activity columns
+
+    Args:
+        matrix: csr user x activity matrix
+
+    Returns:
+        csr activity x activity similarity matrix (diagonal removed)
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = matrix @ sparse.diags(1.0 / norms)
+
+    similarity = (normalized.T @ normalized).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def user_activity_scores(matrix, similarity):
+    """
+    Score every activity for every user: the user's weighted interactions
+    times item similarity
+
+    Returns:
+        csr user x activity matrix of scores
+    """
+    return (matrix @ similarity).tocsr()
+
+
+def top_n_per_row(matrix, n, allowed_columns=None, exclude=None):
+    """
+    Highest-scoring columns of every row of a sparse matrix
+
+    Args:
+        matrix: csr matrix of scores
+        n: Entries kept per row
+        allowed_columns: Boolean mask of columns that may be returned
+        exclude: csr matrix whose non-zero entries are skipped (e.g. already completed)
+
+    Yields:
+        (row, columns, scores) with columns sorted by score, best first
+    """
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        columns = matrix.indices[start:end]
+        scores = matrix.data[start:end]
+
+        keep = scores > 0
+        if allowed_columns is not None:
+            keep &= allowed_columns[columns]
+        if exclude is not None:
+            keep &= ~np.isin(columns, exclude.indices[exclude.indptr[row]:exclude.indptr[row + 1]])
+        columns, scores = columns[keep], scores[keep]
+
+        if len(columns) > n:
+            best = np.argpartition(-scores, n - 1)[:n]
+            columns, scores = columns[best], scores[best]
+
+        order = np.argsort(-scores, kind='stable')
+        yield row, columns[order], scores[order]
+
+
+def build_recommendations(top_n=DEFAULT_TOP_N):
+    """
+    Recompute both top-N tables from the current completions
+    The tables are swapped in one transaction, so readers see either the
+    old or the new lists
+
+    Returns:
+        (number of activity rows, number of user rows)
+    """
+    user_ids, activity_ids, weights = load_interactions()
+    if len(user_ids) == 0:
+        print("\n📭 No completions yet, nothing to learn from")
+        return 0, 0
+    activity_ids = map_to_live(activity_ids)
+
+    matrix, completed, user_index, activity_index = build_matrix(user_ids, activity_ids, weights)
+    print(f"\n🧮 Matrix: {matrix.shape[0]} users x {matrix.shape[1]} activities, {completed.nnz} interactions")
+
+    # Only recommend activities that are still in the live catalog
+    live_ids = {row[0] for row in db.session.query(Activity.id).filter(Activity.live_filter())}
+    live_mask = np.isin(activity_index, list(live_ids))
+
+    similarity = item_similarities(matrix)
+    similarity_rows = [
+        {
+            'activity_id': int(activity_index[row]),
+            'rank': rank,
+            'similar_activity_id': int(activity_index[column]),
+            'score': float(score)
+        }
+        for row, columns, scores in top_n_per_row(similarity, top_n, allowed_columns=live_mask)
+        for rank, (column, score) in enumerate(zip(columns, scores))
+    ]
+
+    # A user's score for an activity: their interactions weighted by item similarity
+    # (low ratings subtract; only positive scores are kept)
+    user_scores = user_activity_scores(matrix, similarity)
+    user_rows = [
+        {
+            'user_id': int(user_index[row]),
+            'rank': rank,
+            'activity_id': int(activity_index[column]),
+            'score': float(score)
+        }
+        for row, columns, scores in top_n_per_row(user_scores, top_n, allowed_columns=live_mask, exclude=completed)
+        for rank, (column, score) in enumerate(zip(columns, scores))
+    ]
+
+    try:
+        ActivitySimilarity.query.delete()
+        UserRecommendation.query.delete()
+        if similarity_rows:
+            db.session.execute(insert(ActivitySimilarity.__table__), similarity_rows)
+        if user_rows:
+            db.session.execute(insert(UserRecommendation.__table__), user_rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(similarity_rows), len(user_rows)
+
+
+def parse_args():
+    """Command line flags for the recommendation build"""
+    parser = argparse.ArgumentParser(description="Build activity recommendations from completions")
+    parser.add_argument('--top-n', type=int, default=DEFAULT_TOP_N,
+                        help=f"Recommendations kept per activity and per user (default: {DEFAULT_TOP_N})")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("\n" + "=" * 70)
+    print("  🤝 HEALTH HEROES - RECOMMENDATION BUILDER")
+    print("=" * 70)
+
+    # Imported here so the helpers above can be used without starting the app
+    from main import app
+
+    started = time.time()
+    with app.app_context():
+        activity_rows, user_rows = build_recommendations(top_n=args.top_n)
+
+    print(f"\n✅ Saved {activity_rows} similar-activity rows and {user_rows} user recommendation rows")
+    print(f"⏱️  Time taken: {time.time() - started:.1f} seconds")
+    print("=" * 70)
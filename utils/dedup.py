@@ -0,0 +1,241 @@
+"""
+Near-Duplicate Activity Detection
+MinHash signatures over word shingles + an LSH band index,
+so each new activity is only compared against a handful of candidates
+"""
+
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+
+# Signature length and LSH banding (32 bands x 4 rows)
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 32
+
+# Estimated Jaccard similarity at which two activities count as duplicates
+DEFAULT_THRESHOLD = 0.6
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Largest prime below 2^32 for the universal hash family (a * h + b) mod p;
+# with a, b < p and 32-bit shingle hashes, a * h + b still fits in uint64
+_PRIME = 4294967291
+_MAX_HASH = (1 << 32) - 1
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def activity_text(activity_data):
+    """Text used to compare activities: English title, description and steps"""
+    steps = activity_data.get('steps_en') or []
+    return " ".join([
+        activity_data.get('title_en') or '',
+        activity_data.get('description_en') or '',
+        *[str(step) for step in steps]
+    ])
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Split text into overlapping word n-grams
+
+    Args:
+        text: Free text
+        size: Words per shingle
+
+    Returns:
+        set of shingle strings
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Builds fixed-length MinHash signatures from shingle sets"""
+
+    def __init__(self, num_permutations=NUM_PERMUTATIONS, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_permutations = num_permutations
+        # Drawn once, so signatures are comparable for the whole run
+        self._a = rng.randint(1, _PRIME, size=num_permutations, dtype=np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_permutations, dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        """
+        Args:
+            shingle_set: set of shingle strings
+
+        Returns:
+            numpy uint64 array of length num_permutations
+        """
+        if not shingle_set:
+            return np.full(self.num_permutations, _MAX_HASH, dtype=np.uint64)
+
+        # crc32 is stable across processes, unlike hash()
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_set),
+            dtype=np.uint64, count=len(shingle_set)
+        )
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+
+class LSHIndex:
+    """
+    Banded locality-sensitive hash index over MinHash signatures
+
+    Signatures that agree on every row of at least one band end up in the
+    same bucket; only those are compared.
+    """
+
+    def __init__(self, num_permutations=NUM_PERMUTATIONS, num_bands=NUM_BANDS):
+        if num_permutations % num_bands:
+            raise ValueError("num_permutations must be divisible by num_bands")
+
+        self.rows = num_permutations // num_bands
+        self.num_bands = num_bands
+        self._buckets = [defaultdict(list) for _ in range(num_bands)]
+        self._signatures = []
+
+    def _band_keys(self, signature):
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.num_bands)
+        ]
+
+    def query(self, signature, threshold):
+        """
+        Find the best stored match at or above threshold
+
+        Returns:
+            (key, similarity) or (None, 0.0)
+        """
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(band_key, ()))
+
+        best_key, best_similarity = None, 0.0
+        for position in candidates:
+            key, stored = self._signatures[position]
+            similarity = float(np.mean(stored == signature))
+            if similarity >= threshold and similarity > best_similarity:
+                best_key, best_similarity = key, similarity
+
+        return best_key, best_similarity
+
+    def add(self, key, signature):
+        """Store a signature under a caller-chosen key"""
+        position = len(self._signatures)
+        self._signatures.append((key, signature))
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band][band_key].append(position)
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+class ActivityDeduplicator:
+    """
+    Drops near-duplicate activities as batches stream in
+
+    Activities are only compared within the same (category, age_range),
+    since those are the buckets users browse. Duplicates are dropped rather
+    than merged: merging would add home areas to the kept activity, and
+    every home requirement has to be available for it to be shown.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_permutations=NUM_PERMUTATIONS, num_bands=NUM_BANDS):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_permutations)
+        self._num_permutations = num_permutations
+        self._num_bands = num_bands
+        self._indexes = {}
+
+        # (home_area, category, age_range) -> [seen, duplicates]
+        self.stats = defaultdict(lambda: [0, 0])
+
+    def _index_for(self, category, age_range):
+        key = (category, age_range)
+        if key not in self._indexes:
+            self._indexes[key] = LSHIndex(self._num_permutations, self._num_bands)
+        return self._indexes[key]
+
+    def filter(self, activities_data):
+        """
+        Keep only activities that are not near-duplicates of one already kept
+
+        Args:
+            activities_data: List of activity dictionaries
+
+        Returns:
+            list of kept activity dictionaries
+        """
+        kept = []
+        for activity_data in activities_data:
+            if not isinstance(activity_data, dict):
+                # Let the ingest validation report it
+                kept.append(activity_data)
+                continue
+
+            combination = (
+                activity_data.get('home_area'),
+                activity_data.get('category'),
+                activity_data.get('age_range')
+            )
+            combination_stats = self.stats[combination]
+            combination_stats[0] += 1
+
+            index = self._index_for(activity_data.get('category'), activity_data.get('age_range'))
+            signature = self.hasher.signature(shingles(activity_text(activity_data)))
+
+            duplicate_of, _similarity = index.query(signature, self.threshold)
+            if duplicate_of is not None:
+                combination_stats[1] += 1
+                continue
+
+            index.add(activity_data.get('title_en'), signature)
+            kept.append(activity_data)
+
+        return kept
+
+    @property
+    def seen(self):
+        return sum(seen for seen, _ in self.stats.values())
+
+    @property
+    def duplicates(self):
+        return sum(duplicates for _, duplicates in self.stats.values())
+
+    def duplicate_rates(self):
+        """
+        Returns:
+            list of (combination, seen, duplicates, rate), highest rate first
+        """
+        rates = [
+            (combination, seen, duplicates, duplicates / seen if seen else 0.0)
+            for combination, (seen, duplicates) in self.stats.items()
+        ]
+        return sorted(rates, key=lambda item: item[3], reverse=True)
+
+    def print_report(self, top=10):
+        """Print overall and per-combination duplicate rates"""
+        if not self.seen:
+            return
+
+        print("\n🔁 Near-duplicate report")
+        print("-" * 70)
+        print(f"Checked: {self.seen}  |  Dropped: {self.duplicates}  "
+              f"({self.duplicates / self.seen:.0%})")
+
+        worst = [item for item in self.duplicate_rates() if item[2]][:top]
+        if worst:
+            print("\nMost repetitive combinations:")
+            for (home_area, category, age_range), seen, duplicates, rate in worst:
+                print(f"  - {home_area} / {category} / {age_range}: {duplicates}/{seen} ({rate:.0%})")
+        print("-" * 70)
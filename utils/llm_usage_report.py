@@ -0,0 +1,152 @@
+"""
+LLM Usage Report
+Reads the llm_usage ledger: tokens, failures and latency per feature,
+the heaviest users and backends, and the prompt sections that cost the
+most tokens (where trimming a prompt pays off)
+
+    python utils/llm_usage_report.py --days 7 --top 15
+"""
+
+import sys
+import os
+import argparse
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import app
+from db.models import db, LLMUsage
+from app.llm.usage import usage_totals
+
+
+# Defaults
+DEFAULT_DAYS = 7
+DEFAULT_TOP = 10
+
+
+def load_calls(since, user_id=None):
+    """
+    Per-feature latencies and per-section prompt tokens of the ledger rows
+
+    Args:
+        since: Only calls from this datetime on
+        user_id: Only this user's calls (None: everyone's)
+
+    Returns:
+        (latencies, sections, prompt_tokens): feature -> list of ms,
+        (feature, section) -> {'calls', 'tokens'} and feature -> prompt tokens
+    """
+    query = db.session.query(LLMUsage.feature, LLMUsage.duration_ms, LLMUsage.prompt_sections) \
+        .filter(LLMUsage.created_at >= since)
+    if user_id is not None:
+        query = query.filter(LLMUsage.user_id == user_id)
+
+    latencies = defaultdict(list)
+    sections = defaultdict(lambda: {'calls': 0, 'tokens': 0})
+    prompt_tokens = defaultdict(int)
+    for row in query.yield_per(1000):
+        latencies[row.feature].append(row.duration_ms)
+        for section, tokens in json.loads(row.prompt_sections or '{}').items():
+            totals = sections[(row.feature, section)]
+            totals['calls'] += 1
+            totals['tokens'] += tokens
+            prompt_tokens[row.feature] += tokens
+    return latencies, sections, prompt_tokens
+
+
+def print_table(title, headers, rows):
+    """Print rows under a title as aligned columns"""
+    print(f"\n{title}")
+    if not rows:
+        print("   (no calls)")
+        return
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print("   " + "  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+
+def totals_rows(totals, keys, latencies=None):
+    """Table rows for usage_totals entries"""
+    rows = []
+    for entry in totals:
+        row = [entry[key] if entry[key] is not None else '-' for key in keys]
+        row += [entry['calls'], entry['failures'], entry['input_tokens'], entry['output_tokens'],
+                f"{100 * entry['estimated'] / entry['calls']:.0f}%", entry['avg_ms']]
+        if latencies is not None:
+            ms = latencies.get(entry[keys[0]])
+            row.append(round(float(np.percentile(ms, 95))) if ms else '-')
+        rows.append(row)
+    return rows
+
+
+def print_report(days=DEFAULT_DAYS, top=DEFAULT_TOP, user_id=None):
+    """
+    Print the usage report for the last `days`
+
+    Args:
+        days: How far back to look
+        top: Rows shown for users and prompt sections
+        user_id: Only this user's calls (None: everyone's)
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    latencies, sections, prompt_tokens = load_calls(since, user_id)
+    columns = ['calls', 'failed', 'in tokens', 'out tokens', 'estimated', 'avg ms']
+
+    print_table(
+        "📊 By feature",
+        ['feature'] + columns + ['p95 ms'],
+        totals_rows(usage_totals(('feature',), since=since, user_id=user_id), ['feature'], latencies)
+    )
+    if user_id is None:
+        print_table(
+            f"👪 Heaviest users (top {top}, '-' is scripts and batch jobs)",
+            ['user'] + columns,
+            totals_rows(usage_totals(('user_id',), since=since)[:top], ['user_id'])
+        )
+    print_table(
+        "🔌 By backend",
+        ['provider', 'model'] + columns,
+        totals_rows(usage_totals(('provider', 'model'), since=since, user_id=user_id), ['provider', 'model'])
+    )
+
+    heaviest = sorted(sections.items(), key=lambda item: item[1]['tokens'], reverse=True)[:top]
+    print_table(
+        f"✂️  Heaviest prompt sections (top {top}, estimated tokens)",
+        ['feature', 'section', 'calls', 'tokens', 'per call', 'of prompt'],
+        [
+            [feature, section, totals['calls'], totals['tokens'], round(totals['tokens'] / totals['calls']),
+             f"{100 * totals['tokens'] / prompt_tokens[feature]:.0f}%"]
+            for (feature, section), totals in heaviest
+        ]
+    )
+
+
+def parse_args():
+    """Command line flags for the usage report"""
+    parser = argparse.ArgumentParser(description="Report LLM token usage and the heaviest prompt sections")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS,
+                        help=f"Look back this many days (default: {DEFAULT_DAYS})")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP,
+                        help=f"Users and prompt sections listed (default: {DEFAULT_TOP})")
+    parser.add_argument('--user', type=int, help="Only this user's calls")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("\n" + "=" * 70)
+    print("  🤝 HEALTH HEROES - LLM USAGE REPORT")
+    print("=" * 70)
+    scope = f"user {args.user}" if args.user is not None else "all users"
+    print(f"Last {args.days} days, {scope}")
+
+    with app.app_context():
+        print_report(days=args.days, top=args.top, user_id=args.user)
+
+    print("=" * 70)
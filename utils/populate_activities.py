@@ -5,21 +5,156 @@ Generate activities with AI and save to database
 
 import sys
 import os
+import json
+import argparse
+from datetime import datetime
+
+from sqlalchemy import func, insert
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from main import app
-from db.models import db, Activity
-from utils.activity_generator import generate_all_activities
+from db.models import db, Activity, ActivityCatalogVersion, ActivityHomeRequirement, ActivityMaterial
+from db.migrations import activity_resource_rows
+from db.activity_search import fts_row, index_activity_rows
+from utils.constants import HOME_AREAS, ACTIVITY_CATEGORIES, AGE_RANGES
+from utils.activity_generator import generate_all_activities, stream_all_activities, read_checkpoint, DEFAULT_RPM
+from utils.dedup import ActivityDeduplicator, DEFAULT_THRESHOLD
+from app.screen_free_activities.catalog import activity_catalog
+from app.screen_free_activities.catalog_versions import (
+    start_catalog_version,
+    delete_version_activities,
+    activate_catalog_version,
+    rollback_catalog_version,
+    prune_catalog_versions
+)
+
+
+# Rows per INSERT executemany / transaction
+BULK_CHUNK_SIZE = 1000
+
+REQUIRED_TEXT_FIELDS = {
+    'title_en': 200,
+    'title_ar': 200,
+    'age_range': 50,
+    'duration': 20,
+    'category': 50,
+}
+
+
+def prepare_activity_row(activity_data, catalog_version_id=None):
+    """
+    Validate one generated activity and serialize it into an activities row
+    
+    Args:
+        activity_data: Activity dictionary from the generator or a checkpoint
+        catalog_version_id: Catalog version the activity belongs to
+    
+    Returns:
+        Row dict ready for a core INSERT
+    
+    Raises:
+        ValueError: If the activity is missing fields or has bad values
+    """
+    if not isinstance(activity_data, dict):
+        raise ValueError("activity is not an object")
+    
+    for field, max_length in REQUIRED_TEXT_FIELDS.items():
+        value = activity_data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"missing '{field}'")
+        if len(value) > max_length:
+            raise ValueError(f"'{field}' longer than {max_length} characters")
+    
+    if activity_data['category'] not in ACTIVITY_CATEGORIES:
+        raise ValueError(f"unknown category '{activity_data['category']}'")
+    if activity_data['age_range'] not in AGE_RANGES:
+        raise ValueError(f"unknown age range '{activity_data['age_range']}'")
+    if activity_data.get('home_area') not in HOME_AREAS:
+        raise ValueError(f"unknown home area '{activity_data.get('home_area')}'")
+    
+    for field in ('materials', 'steps_en', 'steps_ar'):
+        if not isinstance(activity_data.get(field), list):
+            raise ValueError(f"'{field}' must be a list")
+    
+    return {
+        'title_en': activity_data['title_en'],
+        'title_ar': activity_data['title_ar'],
+        'description_en': activity_data.get('description_en'),
+        'description_ar': activity_data.get('description_ar'),
+        'age_range': activity_data['age_range'],
+        'duration': activity_data['duration'],
+        'category': activity_data['category'],
+        'catalog_version_id': catalog_version_id,
+        'materials': json.dumps(activity_data['materials'], ensure_ascii=False),
+        'steps_en': json.dumps(activity_data['steps_en'], ensure_ascii=False),
+        'steps_ar': json.dumps(activity_data['steps_ar'], ensure_ascii=False),
+        'home_requirements': json.dumps([activity_data['home_area']]),
+        'created_at': datetime.utcnow(),
+    }
+
+
+def insert_activity_rows(rows):
+    """
+    Insert prepared activity rows plus their normalized resource rows
+    and search index entries
+    One executemany per table; the caller owns the transaction
+    
+    Args:
+        rows: Row dicts from prepare_activity_row
+    """
+    activity_ids = db.session.execute(
+        insert(Activity.__table__).returning(Activity.__table__.c.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    
+    material_rows, requirement_rows, search_rows = [], [], []
+    for activity_id, row in zip(activity_ids, rows):
+        materials, requirements = activity_resource_rows(activity_id, row['materials'], row['home_requirements'])
+        material_rows.extend(materials)
+        requirement_rows.extend(requirements)
+        search_rows.append(fts_row(activity_id, row))
+    
+    if material_rows:
+        db.session.execute(insert(ActivityMaterial.__table__), material_rows)
+    if requirement_rows:
+        db.session.execute(insert(ActivityHomeRequirement.__table__), requirement_rows)
+    index_activity_rows(search_rows)
+
+
+def save_rows_individually(rows):
+    """
+    Fallback for a chunk the database rejected: insert row by row
+    so one bad row only costs itself
+    
+    Returns:
+        Number of saved rows
+    """
+    saved_count = 0
+    for row in rows:
+        try:
+            insert_activity_rows([row])
+            db.session.commit()
+            saved_count += 1
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error saving activity '{row['title_en']}': {e}")
+    return saved_count
 
 
-def save_activities_to_database(activities_data):
+def save_activities_to_database(activities_data, catalog_version_id=None, chunk_size=BULK_CHUNK_SIZE):
     """
     Save generated activities to database
     
+    Rows are validated and serialized up front; bad rows are reported and
+    skipped without affecting the rest. Valid rows go in with one INSERT
+    executemany per table and one transaction per chunk.
+    
     Args:
         activities_data: List of activity dictionaries
+        catalog_version_id: Catalog version the activities belong to
+        chunk_size: Rows per transaction
     
     Returns:
         Number of successfully saved activities
@@ -27,93 +162,168 @@ def save_activities_to_database(activities_data):
     print(f"\nSaving {len(activities_data)} activities to database...")
     print("-" * 70)
     
-    saved_count = 0
-    
+    rows = []
+    errors = []
     for idx, activity_data in enumerate(activities_data, 1):
         try:
-            # Create Activity object
-            activity = Activity(
-                title_en=activity_data['title_en'],
-                title_ar=activity_data['title_ar'],
-                description_en=activity_data['description_en'],
-                description_ar=activity_data['description_ar'],
-                age_range=activity_data['age_range'],
-                duration=activity_data['duration'],
-                category=activity_data['category']
-            )
-            
-            # Set JSON fields
-            activity.set_materials(activity_data['materials'])
-            activity.set_steps_en(activity_data['steps_en'])
-            activity.set_steps_ar(activity_data['steps_ar'])
-            activity.set_home_requirements([activity_data['home_area']])
-            
-            db.session.add(activity)
-            saved_count += 1
-            
-            # Commit in batches of 10
-            if saved_count % 10 == 0:
-                db.session.commit()
-                print(f"Saved {saved_count} activities...")
-                
+            rows.append(prepare_activity_row(activity_data, catalog_version_id))
+        except ValueError as e:
+            errors.append((idx, str(e)))
+    
+    for idx, error in errors:
+        print(f"Error saving activity {idx}: {error}")
+    
+    saved_count = 0
+    for offset in range(0, len(rows), chunk_size):
+        chunk = rows[offset:offset + chunk_size]
+        try:
+            insert_activity_rows(chunk)
+            db.session.commit()
+            saved_count += len(chunk)
         except Exception as e:
-            print(f"Error saving activity {idx}: {e}")
             db.session.rollback()
-            continue
-    
-    # Final commit
-    db.session.commit()
+            print(f"Chunk {offset + 1}-{offset + len(chunk)} failed ({e}), retrying row by row...")
+            saved_count += save_rows_individually(chunk)
+        
+        if len(rows) > chunk_size:
+            print(f"Saved {saved_count} activities...")
     
     print("-" * 70)
     print(f"Successfully saved: {saved_count} activities")
+    if errors:
+        print(f"Skipped invalid: {len(errors)} activities")
     
     return saved_count
 
 
-def populate_database(activities_per_combination=5):
+def populate_database(activities_per_combination=5, concurrency=1, rpm=DEFAULT_RPM, checkpoint_path=None,
+                      dedup_threshold=DEFAULT_THRESHOLD):
     """
     Main function: Generate and save activities
+    
+    The new catalog is built as a separate 'building' version while the live
+    one keeps serving, then switched live in one transaction. The previous
+    version is kept for rollback, and older activities that completions
+    still point to are never deleted.
+    
+    Args:
+        activities_per_combination: Number of activities per combination
+        concurrency: Number of combinations generated in parallel
+        rpm: Requests per minute allowed by the provider quota
+        checkpoint_path: Optional JSONL checkpoint; enables streaming mode,
+                         where every batch is checkpointed and committed as it
+                         finishes and a restarted run resumes where it stopped
+        dedup_threshold: Similarity at which an activity counts as a near-duplicate
     """
+    deduplicator = ActivityDeduplicator(threshold=dedup_threshold)
+    
     with app.app_context():
         print("=" * 70)
         print("HEALTH HEROES - ACTIVITY GENERATION")
         print("=" * 70)
         
-        # Clear old activities
-        print("\nClearing old activities...")
-        old_count = Activity.query.count()
-        if old_count > 0:
-            Activity.query.delete()
-            db.session.commit()
-            print(f"Cleared {old_count} old activities")
+        # Build into a staging catalog version; the live catalog keeps serving
+        version = start_catalog_version(resume=bool(checkpoint_path))
+        print(f"\nBuilding catalog version {version.id} (live catalog stays online)")
+        
+        # Streaming mode: checkpoint + commit each batch, resume from the checkpoint
+        if checkpoint_path:
+            saved_count = stream_to_database(version.id, activities_per_combination, concurrency, rpm, checkpoint_path,
+                                             deduplicator)
         else:
-            print("Database is empty")
+            # Generate activities with AI
+            print("\nStarting AI generation...")
+            print("=" * 70)
+            activities_data = generate_all_activities(
+                activities_per_combination,
+                concurrency=concurrency,
+                rpm=rpm
+            )
+            
+            # Drop near-duplicates, then save to database
+            activities_data = deduplicator.filter(activities_data)
+            print("\n" + "=" * 70)
+            saved_count = save_activities_to_database(activities_data, catalog_version_id=version.id) if activities_data else 0
         
-        # Generate activities with AI
-        print("\nStarting AI generation...")
-        print("=" * 70)
-        activities_data = generate_all_activities(activities_per_combination)
+        deduplicator.print_report()
         
-        if not activities_data:
-            print("\nNo activities generated! Aborting...")
+        if not saved_count:
+            print("\nNo activities generated! Live catalog left unchanged.")
             return
         
-        # Save to database
-        print("\n" + "=" * 70)
-        saved_count = save_activities_to_database(activities_data)
+        # Atomic switch, then drop versions older than live + previous
+        activate_catalog_version(version.id)
+        pruned = prune_catalog_versions(keep=2)
+        
+        # Rebuild the in-memory activity catalog
+        activity_catalog.rebuild()
         
         # Final summary
         print("\n" + "=" * 70)
         print("  🎉 COMPLETE!")
         print("=" * 70)
-        print(f"Total activities in database: {Activity.query.count()}")
+        print(f"Catalog version {version.id} is live with {saved_count} activities")
+        if pruned:
+            print(f"Pruned {pruned} activities from old catalog versions")
         print("=" * 70)
 
 
+def stream_to_database(catalog_version_id, activities_per_combination, concurrency, rpm, checkpoint_path,
+                       deduplicator):
+    """
+    Streaming generation: reload what an earlier run already checkpointed,
+    then generate the remaining combinations and commit each batch as it lands
+    
+    The checkpoint keeps every generated activity; near-duplicates are dropped
+    on the way into the database, so a resumed run dedups the same way
+    
+    Returns:
+        Number of activities in the staging catalog version
+    """
+    # The checkpoint is the source of truth for a resumed build
+    delete_version_activities(catalog_version_id, keep_referenced=False)
+    
+    def save_batch(batch):
+        return save_activities_to_database(deduplicator.filter(batch), catalog_version_id=catalog_version_id)
+    
+    resumed_count = 0
+    for entry in read_checkpoint(checkpoint_path):
+        resumed_count += save_batch(entry['activities'])
+    if resumed_count:
+        print(f"\n⏯️  Resumed {resumed_count} activities from {checkpoint_path}")
+    
+    print("\nStarting AI generation (streaming)...")
+    print("=" * 70)
+    generated_count = stream_all_activities(
+        checkpoint_path,
+        activities_per_combination,
+        concurrency=concurrency,
+        rpm=rpm,
+        on_batch=save_batch
+    )
+    
+    print(f"\nGenerated this run: {generated_count} activities")
+    return db.session.query(func.count(Activity.id)) \
+        .filter(Activity.catalog_version_id == catalog_version_id).scalar()
+
+
+def rollback_catalog():
+    """Switch back to the previously live activity catalog"""
+    with app.app_context():
+        version = rollback_catalog_version()
+        if version is None:
+            print("\n⚠️  No previous catalog version to roll back to")
+            return
+        
+        activity_catalog.rebuild()
+        print(f"\n↩️  Catalog version {version.id} is live again ({version.activity_count} activities)")
+
+
 def show_statistics():
     """Show database statistics"""
     with app.app_context():
-        total = Activity.query.count()
+        live_activities = Activity.query.filter(Activity.live_filter())
+        total = live_activities.count()
         
         if total == 0:
             print("\n📊 Database is empty. Run generation first!")
@@ -122,13 +332,16 @@ def show_statistics():
         print("\n" + "=" * 70)
         print("  📊 DATABASE STATISTICS")
         print("=" * 70)
+        live = ActivityCatalogVersion.live()
+        if live:
+            print(f"📦 Live catalog version: {live.id} (activated {live.activated_at:%Y-%m-%d %H:%M})")
         print(f"📊 Total activities: {total}")
         
         # Count by category
         from utils.constants import ACTIVITY_CATEGORIES
         print("\n📁 By Category:")
         for category in ACTIVITY_CATEGORIES.keys():
-            count = Activity.query.filter_by(category=category).count()
+            count = live_activities.filter_by(category=category).count()
             category_name = ACTIVITY_CATEGORIES[category]['en']
             print(f"  - {category_name}: {count}")
         
@@ -136,22 +349,45 @@ def show_statistics():
         from utils.constants import AGE_RANGES
         print("\n👶 By Age Range:")
         for age_range in AGE_RANGES:
-            count = Activity.query.filter_by(age_range=age_range).count()
+            count = live_activities.filter_by(age_range=age_range).count()
             print(f"  - {age_range}: {count}")
         
         print("=" * 70)
 
 
+def parse_args():
+    """Command line flags for the generation run"""
+    parser = argparse.ArgumentParser(description="Health Heroes activity database manager")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="Combinations generated in parallel (default: 1)")
+    parser.add_argument('--rpm', type=int, default=DEFAULT_RPM,
+                        help=f"Provider requests-per-minute quota (default: {DEFAULT_RPM})")
+    parser.add_argument('--checkpoint', default=None,
+                        help="JSONL checkpoint file; streams batches to the database and resumes interrupted runs")
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Similarity at which activities count as near-duplicates (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--rollback', action='store_true',
+                        help="Switch back to the previously live activity catalog and exit")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    
+    if args.rollback:
+        rollback_catalog()
+        sys.exit(0)
+    
     print("\n" + "=" * 70)
     print("  🌟 HEALTH HEROES - ACTIVITY DATABASE MANAGER")
     print("=" * 70)
     print("\nOptions:")
     print("1. Generate and save activities")
     print("2. Show statistics")
-    print("3. Exit")
+    print("3. Roll back to the previous catalog")
+    print("4. Exit")
     
-    choice = input("\nEnter choice (1-3): ").strip()
+    choice = input("\nEnter choice (1-4): ").strip()
     
     if choice == "1":
         try:
@@ -167,7 +403,7 @@ if __name__ == "__main__":
         from utils.constants import HOME_AREAS, ACTIVITY_CATEGORIES, AGE_RANGES
         total_combinations = len(HOME_AREAS) * len(ACTIVITY_CATEGORIES) * len(AGE_RANGES)
         total_activities = total_combinations * num
-        estimated_time = total_combinations * 3 // 60
+        estimated_time = max(1, total_combinations // args.rpm)
         
         print(f"\n🎯 Will generate: {total_activities} activities")
         print(f"⏱️  Estimated time: ~{estimated_time} minutes")
@@ -175,12 +411,21 @@ if __name__ == "__main__":
         confirm = input("\nProceed? (yes/no): ").strip().lower()
         
         if confirm in ['yes', 'y']:
-            populate_database(activities_per_combination=num)
+            populate_database(
+                activities_per_combination=num,
+                concurrency=args.concurrency,
+                rpm=args.rpm,
+                checkpoint_path=args.checkpoint,
+                dedup_threshold=args.dedup_threshold
+            )
         else:
             print("❌ Cancelled")
     
     elif choice == "2":
         show_statistics()
     
+    elif choice == "3":
+        rollback_catalog()
+    
     else:
         print("👋 Goodbye!")
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Token Bucket Rate Limiter
+Keeps concurrent AI calls within a provider's requests-per-minute quota
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Tokens refill continuously at rpm / 60 per second, up to `burst`.
+    Each request takes one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rpm, burst=None):
+        """
+        Args:
+            rpm: Requests per minute allowed
+            burst: Maximum tokens saved up (default: 1, i.e. evenly spaced requests)
+        """
+        if rpm <= 0:
+            raise ValueError("rpm must be positive")
+
+        self.rate = rpm / 60.0
+        self.capacity = float(burst or 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Take one token, blocking until one is available
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self, seconds):
+        """
+        Drain the bucket after a rate-limit error so every worker backs off
+
+        Args:
+            seconds: How long no new request should start
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)